@@ -1,23 +1,52 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from app.core.security import create_access_token, verify_password
+from app.core.security import (
+    PasswordPoolBusy,
+    create_access_token,
+    hash_password_async,
+    verify_password_async,
+)
 from fastapi.security import OAuth2PasswordRequestForm
+from pydantic import EmailStr, TypeAdapter, ValidationError
+from app.core.auth import get_current_user
 from app.models.user import User
-from app.db.session import get_db
-from sqlalchemy.orm import Session
-from app.core.security import hash_password
+from app.schemas.user import RegisterOut, Token, UserOut
+from app.db.session import AsyncSessionLocal, get_async_db, get_async_read_db
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 router = APIRouter()
 
-@router.post("/login")
-def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    user = db.query(User).filter(
-        User.email == form_data.username
-    ).first()
-    if not user or not verify_password(form_data.password,user.password):
+email_address = TypeAdapter(EmailStr)
+
+def password_pool_busy():
+    return HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail="Too many authentication requests, please retry shortly",
+        headers={"Retry-After": "1"}
+    )
+
+@router.post("/login", response_model=Token)
+async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_async_read_db)):
+    user = (await db.execute(
+        select(User).where(User.email == form_data.username)
+    )).scalars().first()
+    verified, new_hash = False, None
+    if user:
+        try:
+            verified, new_hash = await verify_password_async(form_data.password, user.password)
+        except PasswordPoolBusy:
+            raise password_pool_busy()
+    if not verified:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
             headers={"WWW-Authenticate": "Bearer"}
         )
+    if new_hash:
+        # Stored hash used an outdated cost factor; upgrade it while we have the plaintext
+        # (db may be a replica, so the write goes through a primary session)
+        async with AsyncSessionLocal() as primary:
+            await primary.execute(update(User).where(User.id == user.id).values(password=new_hash))
+            await primary.commit()
     token = create_access_token(
         data={"sub": user.email}
     )
@@ -26,26 +55,39 @@ def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depend
         "token_type": "bearer"
     }
 
-@router.post("/register")
-def register(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    existing_user = db.query(User).filter(
-        User.email == form_data.username
-    ).first()
+@router.post("/register", response_model=RegisterOut)
+async def register(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_async_db)):
+    # Checked before the insert, or the row is written and UserOut fails on the way out
+    try:
+        email_address.validate_python(form_data.username)
+    except ValidationError:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Username must be a valid email address"
+        )
+    existing_user = (await db.execute(
+        select(User.id).where(User.email == form_data.username)
+    )).first()
     if existing_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Email already registered"
         )
-    
+
+    try:
+        hashed_password = await hash_password_async(form_data.password)
+    except PasswordPoolBusy:
+        raise password_pool_busy()
+
     new_user = User(
         email=form_data.username,
-        password=hash_password(form_data.password)  # Ensure password is hashed in the User model
+        password=hashed_password
     )
-    
+
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
-    
+    await db.commit()
+    await db.refresh(new_user)
+
     token = create_access_token(
         data={"sub": new_user.email}
     )
@@ -54,4 +96,8 @@ def register(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Dep
         "message": "User registered successfully",
         "user": new_user,
         "token": token,
-    }
\ No newline at end of file
+    }
+
+@router.get("/me", response_model=UserOut)
+async def read_current_user(user: UserOut = Depends(get_current_user)):
+    return user
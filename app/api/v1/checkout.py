@@ -1,24 +1,46 @@
-from fastapi import APIRouter, HTTPException, status, Depends
-from app.core.config import settings as Settings
-import requests
+from fastapi import APIRouter, HTTPException, Header, Query, Request, Response, status, Depends
+from fastapi.responses import StreamingResponse
+import asyncio
+import base64
+import hashlib
+import httpx
+import json
+import logging
+from datetime import datetime
+from typing import Optional
 from uuid import uuid4
-from app.schemas.checkout import CheckoutSession
+from sqlalchemy import select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.cache import SingleFlight, create_cache
+from app.core.config import settings
+from app.core.paymongo import PayMongoClient, get_paymongo, error_detail
+from app.core.ratelimit import client_key
+from app.db.session import AsyncSessionLocal, get_async_read_db
+from app.models.checkout_session import CheckoutSessionRecord, upsert_checkout_session
+from app.schemas.checkout import CheckoutSession, CheckoutSessionPage, CheckoutSessionResult
+from app.schemas.paymongo import PayMongoResource
 router = APIRouter()
-BASE_URL = "https://api.paymongo.com/v1/checkout_sessions"
+BASE_URL = "/checkout_sessions"
+logger = logging.getLogger(__name__)
 
-@router.post("/create")
-def create_checkout_session(form_data: CheckoutSession):
-    """
-    Create a checkout session for the user.
-    This endpoint is used to initiate a payment process.
-    """
-    url = f"{BASE_URL}"
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": f"Basic {Settings.PAYMONGO_TOKEN}",
-        "accept": "application/json"
-    }
-    payload = {
+# Concurrent refreshes of one session share a single upstream call
+refresh_flight = SingleFlight()
+
+# Create responses keyed by Idempotency-Key, stored as b'<request fingerprint>\n<body>'
+idempotency_cache = create_cache(
+    "checkout_idempotency",
+    ttl=settings.CHECKOUT_IDEMPOTENCY_TTL,
+    maxsize=settings.CHECKOUT_IDEMPOTENCY_MAXSIZE,
+)
+MAX_IDEMPOTENCY_KEY_LENGTH = 255
+
+
+def result_body(message: str, upstream: bytes) -> bytes:
+    """{"message": ..., "response": <PayMongo body>} with the upstream bytes spliced in, not re-encoded."""
+    return b'{"message":%s,"response":%s}' % (json.dumps(message).encode(), upstream)
+
+def checkout_payload(form_data: CheckoutSession, reference_number: str) -> dict:
+    return {
     "data": {
         "attributes": {
         "send_email_receipt": False,
@@ -41,101 +63,287 @@ def create_checkout_session(form_data: CheckoutSession):
             "qrph"
         ],
         "description": "Test Checkout",
-        "reference_number": f"Ref-{uuid4().hex[:10]}",  # Replace with a unique reference number
+        "reference_number": reference_number,
         "success_url": "https://example.com/success", # Replace with your success URL
         "cancel_url": "https://example.com/cancel", # Replace with your cancel URL
         "statement_descriptor": "Test Payment",
         }
     }
     }
-    try:
-        response = requests.post(url, json=payload, headers=headers)
-        status = response.raise_for_status()
-        print(f"Response status code: {response.status_code}")
 
-        if response.status_code is 200:
-            print(f"Response status: {status}")
 
-            ## Check if the response is valid JSON
-            try:
-                response_data = response.json()
-                print(f"Response data: {response_data}")
+async def store_session(resource: dict | None, payload: bytes | None = None):
+    """
+    Write a PayMongo checkout_session to the local store. Failures are only
+    logged: the caller's PayMongo call already succeeded, and a missing row
+    is re-fetched on the next retrieve.
+    """
+    if not resource or "id" not in resource:
+        return
+    try:
+        async with AsyncSessionLocal() as db:
+            await upsert_checkout_session(db, resource, payload)
+            await db.commit()
+    except Exception:
+        logger.exception("Storing checkout session failed", extra={"session_id": resource["id"]})
 
-                # Handle the response data as needed
 
+def encode_cursor(record: CheckoutSessionRecord) -> str:
+    raw = f"{record.created_at.isoformat()}|{record.id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
 
 
-            except ValueError as e:
-                print(f"Error parsing JSON response: {e}")
-                raise HTTPException(
-                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                    detail="Invalid JSON response from payment gateway"
-                )
+def decode_cursor(cursor: str) -> tuple[datetime, str]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, session_id = raw.split("|", 1)
+        return datetime.fromisoformat(created_at), session_id
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
 
 
-        return {"message": "Checkout session created successfully", "response": response.json()}
-    
-    except requests.exceptions.HTTPError as http_err:
+def check_idempotency_key(idempotency_key: Optional[str]):
+    if idempotency_key is not None and not 0 < len(idempotency_key) <= MAX_IDEMPOTENCY_KEY_LENGTH:
         raise HTTPException(
-            status_code=response.status_code,
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Idempotency-Key must be 1-{MAX_IDEMPOTENCY_KEY_LENGTH} characters"
+        )
+
+
+def scoped_idempotency_key(request: Request, idempotency_key: Optional[str]) -> Optional[str]:
+    """
+    The caller's Idempotency-Key combined with who the caller is (as the rate
+    limiter identifies them), so two clients picking the same key neither
+    replay each other's sessions nor collide at PayMongo.
+    """
+    if not idempotency_key:
+        return None
+    caller = client_key(request.scope)
+    return hashlib.blake2b(f"{caller}\n{idempotency_key}".encode(), digest_size=16).hexdigest()
+
+
+def gateway_error(exc: Exception) -> HTTPException:
+    """Map a failed PayMongo call (httpx error or unparseable body) to the HTTPException we return."""
+    if isinstance(exc, httpx.HTTPStatusError):
+        return HTTPException(
+            status_code=exc.response.status_code,
             detail={
-                "error": str(http_err),
-                "response": response.json()  # Or response.json() if you're confident it's valid JSON
+                "error": str(exc),
+                "response": error_detail(exc.response)
             }
         )
+    if isinstance(exc, ValueError):
+        return HTTPException(
+            status_code=status.HTTP_502_BAD_GATEWAY,
+            detail=f"Invalid JSON response from payment gateway: {exc}"
+        )
+    return HTTPException(
+        status_code=status.HTTP_502_BAD_GATEWAY,
+        detail=f"Payment gateway unreachable: {exc}"
+    )
 
 
-@router.get("/retrieve/{session_id}")
-def retrieve_checkout_session(session_id: str):
+async def create_session(
+    client: PayMongoClient,
+    form_data: CheckoutSession,
+    idempotency_key: Optional[str] = None,
+) -> tuple[bytes, bool]:
     """
-    Retrieve a checkout session by its ID.
-    This endpoint is used to get the details of a specific checkout session.
+    Create one PayMongo checkout session and return (response body, replayed).
+    Raises httpx errors or ValueError for gateway failures.
     """
-    url = f"{BASE_URL}/{session_id}"
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": f"Basic {Settings.PAYMONGO_TOKEN}",
-        "accept": "application/json"
-    }
-    
-    try:
-        response = requests.get(url, headers=headers)
+    if idempotency_key:
+        # Stable per key, so PayMongo sees the same reference on a retried create
+        reference_number = f"Ref-{hashlib.blake2b(idempotency_key.encode(), digest_size=5).hexdigest()}"
+    else:
+        reference_number = f"Ref-{uuid4().hex[:10]}"
+    payload = checkout_payload(form_data, reference_number)
+
+    async def create() -> bytes:
+        headers = {"Idempotency-Key": idempotency_key} if idempotency_key else None
+        response = await client.post(BASE_URL, json=payload, endpoint="checkout.create", headers=headers)
         response.raise_for_status()
-        return response.json()
-    
-    except requests.exceptions.HTTPError as http_err:
+        await store_session(response.json().get("data"), response.content)
+        return result_body("Checkout session created successfully", response.content)
+
+    if not idempotency_key:
+        return await create(), False
+
+    fingerprint = hashlib.blake2b(form_data.model_dump_json().encode(), digest_size=16).hexdigest().encode()
+
+    async def load() -> bytes:
+        return fingerprint + b"\n" + await create()
+
+    # Only successful creates are stored; errors are shared with concurrent callers, then retried
+    packed, hit = await idempotency_cache.get_or_load(idempotency_key, load)
+    stored_fingerprint, _, body = packed.partition(b"\n")
+    if stored_fingerprint != fingerprint:
         raise HTTPException(
-            status_code=response.status_code,
-            detail={
-                "error": str(http_err),
-                "response": response.json()  # Or response.json() if you're confident it's valid JSON
-            }
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Idempotency-Key was already used with a different request body"
         )
-    
+    return body, hit
+
 
-@router.post("/expire/{session_id}")
-def expire_checkout_session(session_id: str):
+@router.post("/create", response_model=CheckoutSessionResult)
+async def create_checkout_session(
+    form_data: CheckoutSession,
+    request: Request,
+    idempotency_key: Optional[str] = Header(default=None, alias="Idempotency-Key"),
+    client: PayMongoClient = Depends(get_paymongo),
+):
+    """
+    Create a checkout session for the user.
+    This endpoint is used to initiate a payment process.
+    With an Idempotency-Key header, concurrent and repeated requests from
+    the same caller using the same key share one PayMongo session and get
+    the same response.
+    """
+    check_idempotency_key(idempotency_key)
+    try:
+        body, replayed = await create_session(client, form_data, scoped_idempotency_key(request, idempotency_key))
+    except (httpx.HTTPError, ValueError) as e:
+        raise gateway_error(e)
+    headers = {"Idempotent-Replayed": "true" if replayed else "false"} if idempotency_key else None
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+@router.post("/batch")
+async def create_checkout_sessions_batch(
+    items: list[CheckoutSession],
+    request: Request,
+    idempotency_key: Optional[str] = Header(default=None, alias="Idempotency-Key"),
+    client: PayMongoClient = Depends(get_paymongo),
+):
+    """
+    Create many checkout sessions in one request.
+    Items are sent to PayMongo with bounded concurrency and results are
+    streamed back as NDJSON in completion order, one line per item tagged
+    with its index, followed by a summary line. A failed item does not
+    fail the batch. With an Idempotency-Key header, item i is created
+    under the key "<key>:<i>", so a retried batch replays finished items.
+    """
+    check_idempotency_key(idempotency_key)
+    if not items:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="Batch is empty")
+    if len(items) > settings.CHECKOUT_BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"A batch can hold at most {settings.CHECKOUT_BATCH_MAX_ITEMS} items"
+        )
+    slots = asyncio.Semaphore(settings.CHECKOUT_BATCH_CONCURRENCY)
+    batch_key = scoped_idempotency_key(request, idempotency_key)
+
+    async def create_item(index: int, item: CheckoutSession) -> tuple[bool, bytes]:
+        key = f"{batch_key}:{index}" if batch_key else None
+        async with slots:
+            try:
+                body, _ = await create_session(client, item, key)
+            except (httpx.HTTPError, ValueError, HTTPException) as e:
+                error = e if isinstance(e, HTTPException) else gateway_error(e)
+                return False, json.dumps({
+                    "index": index,
+                    "status": "failed",
+                    "status_code": error.status_code,
+                    "detail": error.detail,
+                }).encode() + b"\n"
+        # The stored body is already JSON, so it is spliced in rather than re-encoded
+        return True, b'{"index":%d,"status":"succeeded","result":%s}\n' % (index, body)
+
+    async def results():
+        tasks = [asyncio.create_task(create_item(index, item)) for index, item in enumerate(items)]
+        succeeded = 0
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                ok, line = await next_done
+                succeeded += ok
+                yield line
+            yield json.dumps({
+                "summary": {"total": len(items), "succeeded": succeeded, "failed": len(items) - succeeded}
+            }).encode() + b"\n"
+        finally:
+            # No-op after a full run; stops outstanding PayMongo calls if the client disconnects
+            for task in tasks:
+                task.cancel()
+
+    return StreamingResponse(results(), media_type="application/x-ndjson")
+
+
+@router.get("/sessions", response_model=CheckoutSessionPage)
+async def list_checkout_sessions(
+    status_filter: Optional[str] = Query(default=None, alias="status"),
+    limit: int = Query(default=50, ge=1, le=200),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    """
+    List locally stored checkout sessions, newest first.
+    Pages are keyset-paginated: pass the returned next_cursor to get the
+    next page, which costs the same index range scan however deep it is.
+    """
+    query = (
+        select(CheckoutSessionRecord)
+        .order_by(CheckoutSessionRecord.created_at.desc(), CheckoutSessionRecord.id.desc())
+        .limit(limit + 1)
+    )
+    if status_filter:
+        query = query.where(CheckoutSessionRecord.status == status_filter)
+    if cursor:
+        created_at, session_id = decode_cursor(cursor)
+        query = query.where(
+            tuple_(CheckoutSessionRecord.created_at, CheckoutSessionRecord.id) < tuple_(created_at, session_id)
+        )
+    records = (await db.execute(query)).scalars().all()
+    next_cursor = encode_cursor(records[limit - 1]) if len(records) > limit else None
+    return {"data": records[:limit], "next_cursor": next_cursor}
+
+
+@router.get("/retrieve/{session_id}", response_model=PayMongoResource)
+async def retrieve_checkout_session(
+    session_id: str,
+    refresh: bool = False,
+    db: AsyncSession = Depends(get_async_read_db),
+    client: PayMongoClient = Depends(get_paymongo),
+):
+    """
+    Retrieve a checkout session by its ID.
+    This endpoint is used to get the details of a specific checkout session.
+    Sessions are served from the local store, which webhooks keep current;
+    ?refresh=true, or a session not stored yet, fetches it from PayMongo.
+    """
+    if not refresh:
+        payload = await db.scalar(
+            select(CheckoutSessionRecord.payload).where(CheckoutSessionRecord.id == session_id)
+        )
+        if payload is not None:
+            return Response(content=payload, media_type="application/json", headers={"X-Cache": "HIT"})
+
+    async def load():
+        response = await client.get(f"{BASE_URL}/{session_id}", endpoint="checkout.retrieve", hedge=True)
+        response.raise_for_status()
+        await store_session(response.json().get("data"), response.content)
+        return response.content
+
+    try:
+        body = await refresh_flight.do(session_id, load)
+    except (httpx.HTTPError, ValueError) as e:
+        raise gateway_error(e)
+    return Response(content=body, media_type="application/json", headers={"X-Cache": "MISS"})
+
+
+@router.post("/expire/{session_id}", response_model=CheckoutSessionResult)
+async def expire_checkout_session(session_id: str, client: PayMongoClient = Depends(get_paymongo)):
     """
     Expire a checkout session by its ID.
     This endpoint is used to mark a checkout session as expired.
     """
-    url = f"{BASE_URL}/{session_id}/expire"
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": f"Basic {Settings.PAYMONGO_TOKEN}",
-        "accept": "application/json"
-    }
-    
     try:
-        response = requests.post(url, headers=headers)
+        response = await client.post(f"{BASE_URL}/{session_id}/expire", endpoint="checkout.expire")
         response.raise_for_status()
-        return {"message": "Checkout session expired successfully", "response": response.json()}
-    
-    except requests.exceptions.HTTPError as http_err:
-        raise HTTPException(
-            status_code=response.status_code,
-            detail={
-                "error": str(http_err),
-                "response": response.json()  # Or response.json() if you're confident it's valid JSON
-            }
-        )
\ No newline at end of file
+        await store_session(response.json().get("data"), response.content)
+        return Response(
+            content=result_body("Checkout session expired successfully", response.content),
+            media_type="application/json",
+        )
+    except (httpx.HTTPError, ValueError) as e:
+        raise gateway_error(e)
@@ -0,0 +1,82 @@
+import os
+import re
+from datetime import date, datetime, timedelta
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import FileResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.auth import get_current_operator
+from app.core.invoices import pdf_path
+from app.db.session import get_async_read_db
+from app.models.invoice_job import InvoiceJob
+from app.schemas.invoice import InvoiceJobCreate, InvoiceJobOut
+from app.workers.invoices import invoice_generator
+
+router = APIRouter(dependencies=[Depends(get_current_operator)])
+
+INVOICE_NUMBER = re.compile(r"INV-\d{6}-[A-Za-z0-9_-]+")
+
+
+def previous_month(today: date) -> tuple[date, date]:
+    end = today.replace(day=1)
+    return (end - timedelta(days=1)).replace(day=1), end
+
+
+async def get_job(db: AsyncSession, job_id: str) -> InvoiceJob:
+    job = await db.get(InvoiceJob, job_id)
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Invoice job not found")
+    return job
+
+
+def finished_job(job: InvoiceJob) -> InvoiceJob:
+    if job.status != "done":
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=f"Invoice job is {job.status}")
+    return job
+
+
+@router.post("/jobs", response_model=InvoiceJobOut, status_code=status.HTTP_202_ACCEPTED)
+async def create_invoice_job(data: InvoiceJobCreate):
+    """
+    Start invoicing paid checkout sessions and subscription renewals for a
+    period; whatever an earlier run invoiced is skipped. The run happens in
+    the background; poll the job for progress.
+    """
+    default_start, default_end = previous_month(datetime.utcnow().date())
+    period_start = data.period_start or default_start
+    period_end = data.period_end or default_end
+    if period_start >= period_end:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="period_start must be before period_end")
+    return await invoice_generator.submit(
+        datetime.combine(period_start, datetime.min.time()),
+        datetime.combine(period_end, datetime.min.time()),
+    )
+
+
+@router.get("/jobs", response_model=list[InvoiceJobOut])
+async def list_invoice_jobs(
+    limit: int = Query(default=20, ge=1, le=100),
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    return (await db.execute(select(InvoiceJob).order_by(InvoiceJob.created_at.desc()).limit(limit))).scalars().all()
+
+
+@router.get("/jobs/{job_id}", response_model=InvoiceJobOut)
+async def get_invoice_job(job_id: str, db: AsyncSession = Depends(get_async_read_db)):
+    return await get_job(db, job_id)
+
+
+@router.get("/jobs/{job_id}/invoices.csv")
+async def download_invoice_export(job_id: str, db: AsyncSession = Depends(get_async_read_db)):
+    # FileResponse streams the file in chunks, however many invoices it holds
+    job = finished_job(await get_job(db, job_id))
+    return FileResponse(job.csv_path, media_type="text/csv", filename=f"invoices-{job.period_start:%Y%m}.csv")
+
+
+@router.get("/jobs/{job_id}/invoices/{number}.pdf")
+async def download_invoice_pdf(job_id: str, number: str, db: AsyncSession = Depends(get_async_read_db)):
+    job = finished_job(await get_job(db, job_id))
+    path = pdf_path(job.pdf_dir, number) if job.pdf_dir and INVOICE_NUMBER.fullmatch(number) else None
+    if path is None or not os.path.exists(path):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Invoice not found")
+    return FileResponse(path, media_type="application/pdf", filename=f"{number}.pdf")
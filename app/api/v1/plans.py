@@ -1,87 +1,146 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from app.db.session import get_db
-from sqlalchemy.orm import Session
-from app.models.pricing_plan import PricingPlan
+import hashlib
+import logging
+import time
+from dataclasses import dataclass
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from pydantic import TypeAdapter
+import orjson
+from app.db.session import get_async_db, read_session
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.plan_outbox import PlanOutbox
+from app.models.pricing_plan import PricingPlan, paymongo_plan_payload
 from app.models.user import User
 from app.schemas.pricing_plan import PricingPlanCreate, PricingPlanOut
+from app.core.cache import create_cache
 from app.core.config import settings
-import requests
-import json
+from app.workers.plans import plan_outbox_worker
 
 router = APIRouter()
-BASE_URL = "https://api.paymongo.com/v1/subscriptions/plans"
+logger = logging.getLogger(__name__)
 
-@router.post("/create")
-def create_pricing_plan(
+# Serialized catalog responses keyed by "list" or plan id
+plan_cache = create_cache(
+    "plans",
+    ttl=settings.PLAN_CACHE_TTL,
+    maxsize=settings.PLAN_CACHE_MAXSIZE,
+    enabled=settings.PLAN_CACHE_ENABLED,
+)
+PLAN_LIST_KEY = "list"
+plan_adapter = TypeAdapter(PricingPlanOut)
+plan_list_adapter = TypeAdapter(list[PricingPlanOut])
+
+
+@dataclass(frozen=True)
+class CachedBody:
+    body: bytes
+    etag: str
+
+    @classmethod
+    def from_bytes(cls, body: bytes) -> "CachedBody":
+        return cls(body, '"%s"' % hashlib.blake2b(body, digest_size=16).hexdigest())
+
+    # Stored in the cache as b'<etag>\n<body>' so the ETag is not recomputed per hit
+    def pack(self) -> bytes:
+        return self.etag.encode() + b"\n" + self.body
+
+    @classmethod
+    def unpack(cls, packed: bytes) -> "CachedBody":
+        etag, _, body = packed.partition(b"\n")
+        return cls(body, etag.decode())
+
+
+_plans_changed_at = float("-inf")
+
+
+async def invalidate_plan_cache(*plan_ids: int):
+    global _plans_changed_at
+    _plans_changed_at = time.monotonic()
+    await plan_cache.delete(PLAN_LIST_KEY, *plan_ids)
+
+
+def plan_read_session():
+    # A replica that has not replayed a plan change yet would refill the cache with the old rows
+    return read_session(primary=time.monotonic() - _plans_changed_at < settings.DB_READ_YOUR_WRITES_SECONDS)
+
+
+def cached_json_response(request: Request, entry: CachedBody, cache_status: str) -> Response:
+    headers = {"ETag": entry.etag, "X-Cache": cache_status}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        if entry.etag in tags or "*" in tags:
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=entry.body, media_type="application/json", headers=headers)
+
+@router.post("/create", response_model=PricingPlanOut, status_code=status.HTTP_202_ACCEPTED)
+async def create_pricing_plan(
     plan: PricingPlanCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db),
 ):
+    """
+    Store the plan and queue its creation on PayMongo in one transaction.
+    The plan outbox worker makes the PayMongo call afterwards, so the
+    request does not wait on PayMongo; sync_status reports its progress.
+    """
+    existing_plan = (await db.execute(
+        select(PricingPlan.id).where(PricingPlan.name == plan.name)
+    )).first()
+    if existing_plan:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Pricing plan with this name already exists"
+        )
+    new_plan = PricingPlan(**plan.model_dump(exclude={"billing_cycle"}), billing_cycle=str(plan.billing_cycle))
+    db.add(new_plan)
     try:
-        existing_plan = db.query(PricingPlan).filter(
-            PricingPlan.name == plan.name
-        ).first()
-        if existing_plan:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Pricing plan with this name already exists"
-            )
-        
-        url = "https://api.paymongo.com/v1/subscriptions/plans"
-
-        payload = { "data": { "attributes": {
-                    "amount": 2000,
-                    "currency": "2",
-                    "cycle_count": 1,
-                    "description": "s",
-                    "interval": "1"
-                } } }
-        headers = {
-            "accept": "application/json",
-            "content-type": "application/json",
-            "authorization": f"Basic {settings.PAYMONGO_TOKEN}"
-        }
-
-
-        response = requests.post(url, json=payload, headers=headers)
-        print(f"PayMongo response: {response.text}")
-        if response.status_code != 200:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Failed to create plan on PayMongo: {response.text}"
-            )
-
-
-        new_plan = PricingPlan(**plan.dict())
-        db.add(new_plan)
-        db.commit()
-        db.refresh(new_plan)
-        
-        return new_plan
-        
-    except Exception as e:
+        await db.flush()
+        db.add(PlanOutbox(
+            plan_id=new_plan.id, operation="create", payload=orjson.dumps(paymongo_plan_payload(new_plan))
+        ))
+        await db.commit()
+    except IntegrityError:
+        # Lost a race with a concurrent create of the same name
+        await db.rollback()
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"An error occurred while checking existing plans: {str(e)}"
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Pricing plan with this name already exists"
         )
+    await invalidate_plan_cache()
+    plan_outbox_worker.notify()
+    return new_plan
 
-    
 
 @router.get("/", response_model=list[PricingPlanOut])
-def get_pricing_plans(
-    db: Session = Depends(get_db),
-):
-    plans = db.query(PricingPlan).all()
-    return plans
+async def get_pricing_plans(request: Request):
+    # Loaders open their own session: a coalesced load outlives the request that started it
+    async def load():
+        async with plan_read_session() as db:
+            plans = (await db.execute(select(PricingPlan))).scalars().all()
+            return CachedBody.from_bytes(
+                plan_list_adapter.dump_json(plan_list_adapter.validate_python(plans, from_attributes=True))
+            ).pack()
+
+    packed, hit = await plan_cache.get_or_load(PLAN_LIST_KEY, load)
+    return cached_json_response(request, CachedBody.unpack(packed), "HIT" if hit else "MISS")
 
 @router.get("/{plan_id}", response_model=PricingPlanOut)
-def get_pricing_plan(
+async def get_pricing_plan(
     plan_id: int,
-    db: Session = Depends(get_db),
+    request: Request,
 ):
-    plan = db.query(PricingPlan).filter(PricingPlan.id == plan_id).first()
-    if not plan:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Pricing plan not found"
-        )
-    return plan
\ No newline at end of file
+    async def load():
+        async with plan_read_session() as db:
+            plan = await db.get(PricingPlan, plan_id)
+            if not plan:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail="Pricing plan not found"
+                )
+            return CachedBody.from_bytes(
+                plan_adapter.dump_json(plan_adapter.validate_python(plan, from_attributes=True))
+            ).pack()
+
+    packed, hit = await plan_cache.get_or_load(plan_id, load)
+    return cached_json_response(request, CachedBody.unpack(packed), "HIT" if hit else "MISS")
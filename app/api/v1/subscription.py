@@ -0,0 +1,108 @@
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
+from app.core.auth import get_current_user
+from app.core.config import settings
+from app.db.session import get_async_db, get_async_read_db
+from app.models.pricing_plan import PricingPlan
+from app.models.subscription import Subscription, add_months, cycle_months
+from app.models.usage import usage_totals
+from app.schemas.subscription import SubscriptionCreate, SubscriptionLimits, SubscriptionOut, UsageLimit
+from app.schemas.user import UserOut
+
+router = APIRouter()
+
+
+async def get_owned_subscription(db: AsyncSession, subscription_id: int, user: UserOut, *options) -> Subscription:
+    """The caller's subscription, or 404; `options` are loader options such as joinedload(Subscription.plan)."""
+    subscription = await db.get(Subscription, subscription_id, options=options)
+    if subscription is None or subscription.user_id != user.id:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Subscription not found")
+    return subscription
+
+
+async def subscription_limits(db: AsyncSession, subscription: Subscription, plan: PricingPlan) -> list[UsageLimit]:
+    """
+    Usage of each metric in USAGE_PLAN_LIMITS against the plan's limit.
+    These metrics are running totals (seats: +1 when a member is added, -1
+    when one is removed), read from the rollup, so a worker's latest usage
+    shows up after its next flush.
+    """
+    totals = await usage_totals(db, subscription.id, settings.USAGE_PLAN_LIMITS)
+    limits = []
+    for metric, column in settings.USAGE_PLAN_LIMITS.items():
+        limit = getattr(plan, column)
+        limits.append(UsageLimit(metric=metric, used=totals[metric], limit=limit, exceeded=totals[metric] > limit))
+    return limits
+
+
+@router.post("", response_model=SubscriptionOut, status_code=status.HTTP_201_CREATED)
+async def create_subscription(
+    data: SubscriptionCreate,
+    db: AsyncSession = Depends(get_async_db),
+    user: UserOut = Depends(get_current_user),
+):
+    plan = await db.get(PricingPlan, data.plan_id)
+    if plan is None or not plan.is_active:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Pricing plan not found")
+    now = datetime.utcnow()
+    subscription = Subscription(
+        user_id=user.id,
+        plan_id=plan.id,
+        status="active",
+        current_period_start=now,
+        current_period_end=add_months(now, cycle_months(plan.billing_cycle)),
+        created_at=now,
+    )
+    db.add(subscription)
+    await db.commit()
+    return subscription
+
+
+@router.get("", response_model=list[SubscriptionOut])
+async def list_subscriptions(
+    db: AsyncSession = Depends(get_async_read_db),
+    user: UserOut = Depends(get_current_user),
+):
+    return (await db.execute(
+        select(Subscription).where(Subscription.user_id == user.id).order_by(Subscription.id)
+    )).scalars().all()
+
+
+@router.get("/{subscription_id}", response_model=SubscriptionOut)
+async def get_subscription(
+    subscription_id: int,
+    db: AsyncSession = Depends(get_async_read_db),
+    user: UserOut = Depends(get_current_user),
+):
+    return await get_owned_subscription(db, subscription_id, user)
+
+
+@router.post("/{subscription_id}/cancel", response_model=SubscriptionOut)
+async def cancel_subscription(
+    subscription_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    user: UserOut = Depends(get_current_user),
+):
+    subscription = await get_owned_subscription(db, subscription_id, user)
+    if subscription.status != "canceled":
+        subscription.status = "canceled"
+        subscription.canceled_at = datetime.utcnow()
+        await db.commit()
+    return subscription
+
+
+@router.get("/{subscription_id}/limits", response_model=SubscriptionLimits)
+async def get_subscription_limits(
+    subscription_id: int,
+    db: AsyncSession = Depends(get_async_read_db),
+    user: UserOut = Depends(get_current_user),
+):
+    subscription = await get_owned_subscription(db, subscription_id, user, joinedload(Subscription.plan))
+    return {
+        "subscription_id": subscription.id,
+        "plan_id": subscription.plan_id,
+        "limits": await subscription_limits(db, subscription, subscription.plan),
+    }
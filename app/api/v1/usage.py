@@ -0,0 +1,155 @@
+import time
+from datetime import datetime, timezone
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.exceptions import RequestValidationError
+from pydantic import TypeAdapter, ValidationError
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.api.v1.subscription import get_owned_subscription
+from app.core.auth import get_current_user
+from app.core.config import settings
+from app.db.session import get_async_read_db, read_session
+from app.models.pricing_plan import PricingPlan
+from app.models.subscription import Subscription
+from app.models.usage import UsageRollup, usage_totals_by_subscription
+from app.schemas.usage import UsageAccepted, UsageEvent, UsageReport
+from app.schemas.user import UserOut
+from app.workers.usage import usage_aggregator
+
+router = APIRouter()
+usage_batch_adapter = TypeAdapter(list[UsageEvent])
+
+
+def unix_time(moment: Optional[datetime], now: float) -> float:
+    if moment is None:
+        return now
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.timestamp()
+
+
+def limited_increases(events: list[UsageEvent]) -> dict[tuple[int, str], int]:
+    """Net quantity per (subscription_id, metric) the batch adds to USAGE_PLAN_LIMITS metrics, where positive."""
+    deltas: dict[tuple[int, str], int] = {}
+    for event in events:
+        if event.metric in settings.USAGE_PLAN_LIMITS:
+            key = (event.subscription_id, event.metric)
+            deltas[key] = deltas.get(key, 0) + event.quantity
+    return {key: delta for key, delta in deltas.items() if delta > 0}
+
+
+async def check_plan_limits(db: AsyncSession, increases: dict[tuple[int, str], int]):
+    """
+    409 if any increase would take a metric above its plan limit. Totals are
+    the flushed rollup plus this process's unflushed sums, so the check is
+    exact for one worker; concurrent workers can each admit a batch within
+    a flush interval of each other.
+    """
+    subscription_ids = {subscription_id for subscription_id, _ in increases}
+    metrics = {metric for _, metric in increases}
+    plans = dict((await db.execute(
+        select(Subscription.id, PricingPlan).join(PricingPlan, Subscription.plan_id == PricingPlan.id)
+        .where(Subscription.id.in_(subscription_ids))
+    )).all())
+    flushed = await usage_totals_by_subscription(db, subscription_ids, metrics)
+    pending = usage_aggregator.pending_totals(subscription_ids, metrics)
+    for (subscription_id, metric), delta in sorted(increases.items()):
+        limit = getattr(plans[subscription_id], settings.USAGE_PLAN_LIMITS[metric])
+        used = flushed.get((subscription_id, metric), 0) + pending.get((subscription_id, metric), 0)
+        if used + delta > limit:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=f"Subscription {subscription_id} would use {used + delta} {metric}; its plan allows {limit}"
+            )
+
+
+@router.post(
+    "/events",
+    response_model=UsageAccepted,
+    status_code=status.HTTP_202_ACCEPTED,
+    openapi_extra={"requestBody": {"required": True, "content": {"application/json": {
+        "schema": {"type": "array", "items": UsageEvent.model_json_schema()}
+    }}}},
+)
+async def ingest_usage_events(request: Request, user: UserOut = Depends(get_current_user)):
+    """
+    Record a batch of usage events against the caller's active subscriptions.
+    Events are summed in memory and written to the rollup table by the next
+    flush, so they show up in reports and limit checks within
+    USAGE_FLUSH_INTERVAL. The batch is accepted or rejected as a whole: it is
+    refused with 409 if it would raise a USAGE_PLAN_LIMITS metric above the
+    plan's limit, counting flushed and still pending usage. Batches that
+    lower a metric are always accepted.
+    """
+    # Validated straight from the raw body, skipping the intermediate dicts a typed body parameter builds
+    try:
+        events = usage_batch_adapter.validate_json(await request.body())
+    except ValidationError as e:
+        raise RequestValidationError([{**error, "loc": ("body", *error["loc"])} for error in e.errors(include_url=False)])
+    if not events:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="Batch is empty")
+    if len(events) > settings.USAGE_BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"A batch can hold at most {settings.USAGE_BATCH_MAX_ITEMS} events"
+        )
+    subscription_ids = {event.subscription_id for event in events}
+    # Own short session: the connection is not held while add() waits for a flush
+    async with read_session() as db:
+        active = set((await db.execute(
+            select(Subscription.id).where(
+                Subscription.id.in_(subscription_ids),
+                Subscription.user_id == user.id,
+                Subscription.status == "active",
+            )
+        )).scalars())
+        unknown = subscription_ids - active
+        if unknown:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"No active subscription with id {', '.join(map(str, sorted(unknown)[:10]))}"
+            )
+        increases = limited_increases(events)
+        if increases:
+            await check_plan_limits(db, increases)
+    now = time.time()
+    try:
+        accepted = await usage_aggregator.add(
+            (event.subscription_id, event.metric, event.quantity, unix_time(event.timestamp, now)) for event in events
+        )
+    except Exception:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Usage metering is backlogged, please retry shortly",
+            headers={"Retry-After": "1"}
+        )
+    return {"accepted": accepted}
+
+
+@router.get("/{subscription_id}", response_model=UsageReport)
+async def get_usage(
+    subscription_id: int,
+    metric: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    limit: int = Query(default=1000, ge=1, le=10_000),
+    db: AsyncSession = Depends(get_async_read_db),
+    user: UserOut = Depends(get_current_user),
+):
+    """Flushed usage per metric and time bucket, oldest first."""
+    await get_owned_subscription(db, subscription_id, user)
+    query = (
+        select(UsageRollup)
+        .where(UsageRollup.subscription_id == subscription_id)
+        .order_by(UsageRollup.bucket_start, UsageRollup.metric)
+        .limit(limit)
+    )
+    if metric:
+        query = query.where(UsageRollup.metric == metric)
+    if since:
+        query = query.where(UsageRollup.bucket_start >= since)
+    if until:
+        query = query.where(UsageRollup.bucket_start < until)
+    rows = (await db.execute(query)).scalars().all()
+    return {"subscription_id": subscription_id, "data": rows}
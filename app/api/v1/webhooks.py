@@ -1,66 +1,205 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Request
-from fastapi.responses import JSONResponse
-from app.db.session import get_db
-import requests
-from app.schemas.webhook import WebhookCreate
-from app.core.config import Settings
+from datetime import datetime
+from typing import Literal, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status, Request
+from fastapi.responses import StreamingResponse
+import httpx
+import orjson
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.dedup import event_deduplicator
+from app.core.webhook_signature import SIGNATURE_HEADER, InvalidSignature, signature_rejections, webhook_verifier
+from app.db.session import get_async_read_db, read_session
+from app.models.webhook_event import WebhookEvent
+from app.workers.webhooks import inbox_writer, webhook_worker
+from app.core.paymongo import PayMongoClient, get_paymongo
+from app.schemas.paymongo import PayMongoList, PayMongoResource
+from app.schemas.webhook import EventAggregate, StatusMessage, WebhookCreate
 
 router = APIRouter()
+BASE_URL = "/webhooks"
+
+# Rows fetched per round trip when streaming stored events
+EVENT_STREAM_CHUNK = 1000
+EVENT_COLUMNS = (
+    WebhookEvent.id,
+    WebhookEvent.event_id,
+    WebhookEvent.event_type,
+    WebhookEvent.status,
+    WebhookEvent.amount,
+    WebhookEvent.received_at,
+    WebhookEvent.processed_at,
+)
+
+# Acknowledgements are constant, so they are encoded once
+WEBHOOK_RECEIVED = orjson.dumps({"status": "success", "message": "Webhook received successfully"})
+WEBHOOK_DUPLICATE = orjson.dumps({"status": "success", "message": "Duplicate webhook ignored"})
 
 # Handle incoming webhooks from PayMongo
-@router.post("/payment-webhooks")
-async def handle_webhook(request: Request, db=Depends(get_db)):
-    try:
-        # Get the raw body
+@router.post("/payment-webhooks", response_model=StatusMessage)
+async def handle_webhook(request: Request):
+    """
+    Acknowledge a PayMongo event as soon as it is durably stored.
+    The Paymongo-Signature header is checked first, so unsigned or forged
+    requests are rejected before the body is parsed. The raw body is then
+    parsed once for validation and written to the webhook_events inbox;
+    the webhook worker processes it afterwards. Redeliveries of an event
+    id already seen are acknowledged without being stored again.
+    """
+    if webhook_verifier.enabled:
+        try:
+            signed = webhook_verifier.check_header(request.headers.get(SIGNATURE_HEADER))
+            body = await request.body()
+            webhook_verifier.check_body(signed, body)
+        except InvalidSignature as e:
+            signature_rejections.inc(e.reason)
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid webhook signature")
+    else:
         body = await request.body()
-        print(f"Received webhook body: {body.decode('utf-8')}")
-        
-        # Parse the JSON data
-        webhook_data = await request.json()
-        
-        # Extract payment information
+    try:
+        webhook_data = orjson.loads(body)
         event_type = webhook_data["data"]["attributes"]["type"]
-        payment_data = webhook_data["data"]["attributes"]["data"]
-        
-        if event_type == "payment.paid":
-            # Handle successful payment
-            payment_id = payment_data["id"]
-            amount = payment_data["attributes"]["amount"]
-            status = payment_data["attributes"]["status"]
-            customer_email = payment_data["attributes"]["billing"]["email"]
-            
-            print(f"Payment successful: {payment_id}, Amount: {amount}, Email: {customer_email}")
-            
-            try:
-                # Here you can add your logic to handle the payment, e.g., update database, send email, etc.
-                # Example: await update_payment_status(db, payment_id, status)
-                pass
-
-            except Exception as e:
-                print(f"Error processing payment: {str(e)}")
-                raise HTTPException(status_code=500, detail="Internal server error while processing payment")
-        
-        # Return JSON response (FastAPI way)
-        return JSONResponse(
-            content={
-                "status": "success", 
-                "message": "Webhook received successfully"
-            },
-            status_code=200
-        )
-        
-    except Exception as e:
-        print(f"Webhook error: {str(e)}")
+        event_id = webhook_data["data"].get("id")
+        resource = webhook_data["data"]["attributes"].get("data") or {}
+        amount = (resource.get("attributes") or {}).get("amount")
+    except (ValueError, KeyError, TypeError, AttributeError) as e:
         raise HTTPException(status_code=400, detail=f"Webhook processing failed: {str(e)}")
 
-# Create a webhook for payment events
-@router.post("/create-webhook")
-def create_webhook(form_data: WebhookCreate, db = Depends(get_db)):
-    url = "https://api.paymongo.com/v1/webhooks"
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": f"Basic {Settings.PAYMONGO_TOKEN}"
+    if event_id and await event_deduplicator.is_duplicate(event_id):
+        return Response(content=WEBHOOK_DUPLICATE, media_type="application/json")
+
+    await inbox_writer.write({
+        "event_id": event_id,
+        "event_type": event_type,
+        "payload": body,
+        "amount": amount if isinstance(amount, int) else None,
+    })
+    # Only remembered once stored, so a failed write is still retried by PayMongo
+    if event_id:
+        event_deduplicator.remember(event_id)
+    webhook_worker.notify()
+    return Response(content=WEBHOOK_RECEIVED, media_type="application/json")
+
+def event_filters(event_type: Optional[str], since: Optional[datetime], until: Optional[datetime]) -> list:
+    filters = []
+    if event_type:
+        filters.append(WebhookEvent.event_type == event_type)
+    if since:
+        filters.append(WebhookEvent.received_at >= since)
+    if until:
+        filters.append(WebhookEvent.received_at < until)
+    return filters
+
+
+def encode_event(row, payload: bytes | None = None) -> bytes:
+    event = {
+        "id": row.id,
+        "event_id": row.event_id,
+        "event_type": row.event_type,
+        "status": row.status,
+        "amount": row.amount,
+        "received_at": row.received_at.isoformat(),
+        "processed_at": row.processed_at.isoformat() if row.processed_at else None,
     }
+    encoded = orjson.dumps(event)
+    if payload is None:
+        return encoded
+    # The stored body is the JSON PayMongo sent, so it is spliced in as is
+    return encoded[:-1] + b',"payload":' + payload + b"}"
+
+
+# List locally stored webhook events
+@router.get("/events")
+async def list_stored_webhook_events(
+    event_type: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    cursor: Optional[int] = Query(default=None, description="id of the last event on the previous page"),
+    limit: Optional[int] = Query(default=None, ge=1, description="page size; omit to stream every match"),
+    output: Literal["json", "ndjson"] = Query(default="json", alias="format"),
+    include_payload: bool = False,
+):
+    """
+    Stream stored events newest first, filtered by type and received_at range.
+    Rows are read from a server-side cursor in chunks and written out as they
+    arrive, so memory stays flat however many events match. Pages continue
+    from the next_cursor of the previous page (an event id).
+    """
+    columns = (*EVENT_COLUMNS, WebhookEvent.payload) if include_payload else EVENT_COLUMNS
+    query = select(*columns).where(*event_filters(event_type, since, until)).order_by(WebhookEvent.id.desc())
+    if cursor is not None:
+        query = query.where(WebhookEvent.id < cursor)
+    if limit is not None:
+        query = query.limit(limit + 1)
+    query = query.execution_options(yield_per=EVENT_STREAM_CHUNK)
+
+    async def chunks():
+        sent = 0
+        last_id = None
+        more = False
+        separator = b"\n" if output == "ndjson" else b","
+        if output == "json":
+            yield b'{"data":['
+        # The session lives in the generator: it must stay open until the body is sent
+        async with read_session() as db:
+            result = await db.stream(query)
+            async for partition in result.partitions():
+                if limit is not None and sent + len(partition) > limit:
+                    more = True
+                    partition = partition[:limit - sent]
+                encoded = [encode_event(row, row.payload if include_payload else None) for row in partition]
+                if not encoded:
+                    break
+                prefix = b"," if output == "json" and sent else b""
+                yield prefix + separator.join(encoded) + (b"\n" if output == "ndjson" else b"")
+                sent += len(encoded)
+                last_id = partition[-1].id
+                if more:
+                    break
+        next_cursor = last_id if more else None
+        if output == "json":
+            yield b'],"next_cursor":' + orjson.dumps(next_cursor) + b"}"
+        elif next_cursor is not None:
+            yield b'{"next_cursor":' + orjson.dumps(next_cursor) + b"}\n"
+
+    media_type = "application/x-ndjson" if output == "ndjson" else "application/json"
+    return StreamingResponse(chunks(), media_type=media_type)
+
+
+# Count and sum stored webhook events per type and/or day
+@router.get("/events/aggregate", response_model=EventAggregate, response_model_exclude_unset=True)
+async def aggregate_stored_webhook_events(
+    group_by: Literal["type", "day", "type_day"] = "type_day",
+    event_type: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    """
+    Event counts and amount sums, grouped in SQL. Only event_type,
+    received_at and amount are read, all of which are in one index.
+    """
+    day = func.date(WebhookEvent.received_at).label("day")
+    keys = {
+        "type": [WebhookEvent.event_type],
+        "day": [day],
+        "type_day": [WebhookEvent.event_type, day],
+    }[group_by]
+    query = (
+        select(
+            *keys,
+            func.count().label("count"),
+            func.coalesce(func.sum(WebhookEvent.amount), 0).label("amount"),
+        )
+        .where(*event_filters(event_type, since, until))
+        .group_by(*keys)
+        .order_by(*keys)
+    )
+    rows = (await db.execute(query)).mappings().all()
+    return {"group_by": group_by, "data": [dict(row) for row in rows]}
+
+# Create a webhook for payment events
+@router.post("/create-webhook", response_model=StatusMessage)
+async def create_webhook(form_data: WebhookCreate, client: PayMongoClient = Depends(get_paymongo)):
     payload = {
         "data": {
             "attributes": {
@@ -71,102 +210,75 @@ def create_webhook(form_data: WebhookCreate, db = Depends(get_db)):
     }
 
     try:
-        response = requests.post(url, json=payload, headers=headers)
-        response.raise_for_status()  # Raises HTTPError for bad responses (4xx/5xx)
-    except requests.exceptions.RequestException as e:
+        response = await client.post(BASE_URL, json=payload, endpoint="webhooks.create")
+        response.raise_for_status()  # Raises HTTPStatusError for bad responses (4xx/5xx)
+    except httpx.HTTPError as e:
         raise HTTPException(
-            status_code=response.status_code if response else 500,
+            status_code=_error_status(e),
             detail=f"Webhook creation failed: {str(e)}"
         )
 
     return {"message": "Webhook created successfully", "status": "success"}
 
 # Retrieve all webhook events
-@router.get("/webhook-events")
-def get_webhook_events(db=Depends(get_db)):
-    url = "https://api.paymongo.com/v1/webhooks"
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": f"Basic {Settings.PAYMONGO_TOKEN}"
-    }
-
+@router.get("/webhook-events", response_model=PayMongoList)
+async def get_webhook_events(client: PayMongoClient = Depends(get_paymongo)):
     try:
-        response = requests.get(url, headers=headers)
+        response = await client.get(BASE_URL, endpoint="webhooks.list", hedge=True)
         response.raise_for_status()
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         raise HTTPException(
-            status_code=response.status_code if response else 500,
+            status_code=_error_status(e),
             detail=f"Failed to retrieve webhook events: {str(e)}"
         )
 
-    return response.json()
+    # Passed through as received; decoding and re-encoding it would only cost time
+    return Response(content=response.content, media_type="application/json")
 
 # Retrieve a specific webhook event by ID
-@router.get("/webhook-event/{webhook_id}")
-def get_webhook_event(webhook_id: str, db=Depends(get_db)):
-    url = f"https://api.paymongo.com/v1/webhooks/{webhook_id}"
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": f"Basic {Settings.PAYMONGO_TOKEN}"
-    }
-
+@router.get("/webhook-event/{webhook_id}", response_model=PayMongoResource)
+async def get_webhook_event(webhook_id: str, client: PayMongoClient = Depends(get_paymongo)):
     try:
-        response = requests.get(url, headers=headers)
+        response = await client.get(f"{BASE_URL}/{webhook_id}", endpoint="webhooks.retrieve", hedge=True)
         response.raise_for_status()
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         raise HTTPException(
-            status_code=response.status_code if response else 500,
+            status_code=_error_status(e),
             detail=f"Failed to retrieve webhook event: {str(e)}"
         )
 
-    return response.json()
+    return Response(content=response.content, media_type="application/json")
 
 # Disable a webhook event
-@router.post("/webhook-event/{webhook_id}")
-def disable_webhook_event(webhook_id: str, db=Depends(get_db)):
-    url = f"https://api.paymongo.com/v1/webhooks/{webhook_id}"
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": f"Basic {Settings.PAYMONGO_TOKEN}"
-    }
-
+@router.post("/webhook-event/{webhook_id}", response_model=StatusMessage)
+async def disable_webhook_event(webhook_id: str, client: PayMongoClient = Depends(get_paymongo)):
     try:
-        response = requests.post(url, headers=headers)
+        response = await client.post(f"{BASE_URL}/{webhook_id}", endpoint="webhooks.disable")
         response.raise_for_status()
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         raise HTTPException(
-            status_code=response.status_code if response else 500,
+            status_code=_error_status(e),
             detail=f"Failed to disable webhook event: {str(e)}"
         )
 
     return {"message": "Webhook event disabled successfully", "status": "success"}
 
 # Enable a webhook event
-@router.put("/webhook-event/{webhook_id}/enable")
-def enable_webhook_event(webhook_id: str, db=Depends(get_db)):
-    url = f"https://api.paymongo.com/v1/webhooks/{webhook_id}/enable"
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": f"Basic {Settings.PAYMONGO_TOKEN}"
-    }
+@router.put("/webhook-event/{webhook_id}/enable", response_model=StatusMessage)
+async def enable_webhook_event(webhook_id: str, client: PayMongoClient = Depends(get_paymongo)):
     try:
-        response = requests.put(url, headers=headers)
+        response = await client.put(f"{BASE_URL}/{webhook_id}/enable", endpoint="webhooks.enable")
         response.raise_for_status()
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         raise HTTPException(
-            status_code=response.status_code if response else 500,
+            status_code=_error_status(e),
             detail=f"Failed to enable webhook event: {str(e)}"
         )
     return {"message": "Webhook event enabled successfully", "status": "success"}
 
 # Update a webhook event
-@router.put("/webhook-event/{webhook_id}")
-def update_webhook_event(webhook_id: str, form_data: WebhookCreate, db=Depends(get_db)):
-    url = f"https://api.paymongo.com/v1/webhooks/{webhook_id}"
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": f"Basic {Settings.PAYMONGO_TOKEN}"
-    }
+@router.put("/webhook-event/{webhook_id}", response_model=StatusMessage)
+async def update_webhook_event(webhook_id: str, form_data: WebhookCreate, client: PayMongoClient = Depends(get_paymongo)):
     payload = {
         "data": {
             "attributes": {
@@ -177,13 +289,19 @@ def update_webhook_event(webhook_id: str, form_data: WebhookCreate, db=Depends(g
     }
 
     try:
-        response = requests.put(url, json=payload, headers=headers)
+        response = await client.put(f"{BASE_URL}/{webhook_id}", json=payload, endpoint="webhooks.update")
         response.raise_for_status()
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         raise HTTPException(
-            status_code=response.status_code if response else 500,
+            status_code=_error_status(e),
             detail=f"Webhook update failed: {str(e)}"
         )
 
     return {"message": "Webhook updated successfully", "status": "success"}
 
+
+def _error_status(exc: httpx.HTTPError) -> int:
+    # Upstream 4xx/5xx keep their status; transport failures map to 502
+    if isinstance(exc, httpx.HTTPStatusError):
+        return exc.response.status_code
+    return status.HTTP_502_BAD_GATEWAY
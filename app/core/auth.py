@@ -0,0 +1,104 @@
+import asyncio
+import json
+from fastapi import Depends, HTTPException, status
+from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy import event, inspect, select
+from sqlalchemy.orm import Session
+from app.core.cache import create_cache
+from app.core.config import settings
+from app.core.security import token_cache
+from app.db.session import read_session
+from app.models.user import User
+from app.schemas.user import UserOut
+
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login")
+
+# Serialized UserOut keyed by email (the token subject)
+user_cache = create_cache("auth_users", ttl=settings.AUTH_USER_CACHE_TTL, maxsize=settings.AUTH_USER_CACHE_SIZE)
+
+
+async def invalidate_user(email: str):
+    """Drop a cached user on every worker. Committed ORM changes to is_active or email do this automatically."""
+    await user_cache.delete(email)
+
+
+_invalidations: set[asyncio.Task] = set()
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_changed_users(session, flush_context):
+    for obj in (*session.dirty, *session.deleted):
+        if not isinstance(obj, User):
+            continue
+        state = inspect(obj)
+        email_history = state.attrs.email.history
+        if obj in session.deleted or email_history.has_changes() or state.attrs.is_active.history.has_changes():
+            emails = session.info.setdefault("changed_user_emails", set())
+            emails.update(e for e in (*email_history.deleted, obj.email) if e)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_changed_users(session):
+    emails = session.info.pop("changed_user_emails", None)
+    if not emails:
+        return
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        # Sync session outside the event loop; AUTH_USER_CACHE_TTL bounds the staleness
+        return
+    for email in emails:
+        task = loop.create_task(invalidate_user(email))
+        _invalidations.add(task)
+        task.add_done_callback(_invalidations.discard)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_changed_users(session):
+    session.info.pop("changed_user_emails", None)
+
+
+async def load_user(email: str) -> UserOut | None:
+    async def load():
+        async with read_session() as db:
+            user = (await db.execute(select(User).where(User.email == email))).scalars().first()
+            return UserOut.model_validate(user).model_dump_json().encode() if user else None
+
+    body, _ = await user_cache.get_or_load(email, load)
+    # Written by load() above, so it is trusted and not re-validated (EmailStr checks are slow)
+    return UserOut.model_construct(**json.loads(body)) if body else None
+
+
+def credentials_error(detail: str = "Could not validate credentials") -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail=detail,
+        headers={"WWW-Authenticate": "Bearer"}
+    )
+
+
+async def get_current_user(token: str = Depends(oauth2_scheme)) -> UserOut:
+    """
+    Resolve the bearer token to an active user. A token verified before is
+    answered from the token cache without re-checking its signature, and the
+    user row comes from the user cache, so a warm request costs two hash
+    lookups and no database query.
+    """
+    payload = token_cache.decode(token)
+    email = payload.get("sub") if payload else None
+    if not email:
+        raise credentials_error()
+    user = await load_user(email)
+    if user is None or not user.is_active:
+        raise credentials_error("Inactive or unknown user")
+    return user
+
+
+async def get_current_operator(user: UserOut = Depends(get_current_user)) -> UserOut:
+    """The current user, if listed in settings.OPERATOR_EMAILS; 403 otherwise."""
+    if user.email.lower() not in {email.lower() for email in settings.OPERATOR_EMAILS}:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Operator access required"
+        )
+    return user
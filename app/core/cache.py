@@ -0,0 +1,338 @@
+import asyncio
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Hashable
+from app.core.config import settings
+
+
+class TTLCache:
+    """
+    Size-bounded LRU cache whose entries expire after `ttl` seconds.
+    Meant for use from the event loop, so no locking is done.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 60.0, enabled: bool = True):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+
+    def get(self, key: Hashable) -> Any | None:
+        if not self.enabled:
+            return None
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: float | None = None):
+        if not self.enabled or self.maxsize <= 0:
+            return
+        self._data[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def delete(self, key: Hashable):
+        self._data.pop(key, None)
+
+    def clear(self):
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls for the same key onto one in-flight awaitable.
+    The shared call keeps running if the caller that started it is cancelled.
+    """
+
+    def __init__(self):
+        self.coalesced = 0
+        self._calls: dict[Hashable, asyncio.Future] = {}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        future = self._calls.get(key)
+        if future is None:
+            future = asyncio.ensure_future(fn())
+            self._calls[key] = future
+            future.add_done_callback(lambda done: self._finish(key, done))
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(future)
+
+    def _finish(self, key: Hashable, future: asyncio.Future):
+        if self._calls.get(key) is future:
+            del self._calls[key]
+        if not future.cancelled():
+            future.exception()  # mark retrieved when every waiter has gone away
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+
+class CacheBackend:
+    """
+    Async byte cache shared by the routers. Values are bytes so every backend
+    can hold them; callers own serialization.
+    """
+
+    def __init__(self, namespace: str, ttl: float, enabled: bool = True):
+        self.namespace = namespace
+        self.ttl = ttl
+        self.enabled = enabled
+        self.singleflight = SingleFlight()
+
+    async def get(self, key: Hashable) -> bytes | None:
+        raise NotImplementedError
+
+    async def set(self, key: Hashable, value: bytes, ttl: float | None = None):
+        raise NotImplementedError
+
+    async def delete(self, *keys: Hashable):
+        """Evict keys here and, for shared backends, on every other worker."""
+        raise NotImplementedError
+
+    async def start(self):
+        pass
+
+    async def close(self):
+        pass
+
+    def stats(self) -> dict:
+        return {"coalesced": self.singleflight.coalesced, "in_flight": len(self.singleflight)}
+
+    async def get_or_load(
+        self,
+        key: Hashable,
+        loader: Callable[[], Awaitable[bytes | None]],
+        ttl: float | None = None,
+    ) -> tuple[bytes | None, bool]:
+        """
+        Return (value, hit). Concurrent misses for one key share a single
+        loader call; a loader result of None is returned but not cached.
+        """
+        if not self.enabled:
+            return await loader(), False
+        value = await self.get(key)
+        if value is not None:
+            return value, True
+
+        async def load():
+            loaded = await loader()
+            if loaded is not None:
+                await self.set(key, loaded, ttl)
+            return loaded
+
+        return await self.singleflight.do(key, load), False
+
+
+class MemoryCache(CacheBackend):
+    """Per-process backend; entries are not shared between workers."""
+
+    def __init__(self, namespace: str, ttl: float, maxsize: int = 1024, enabled: bool = True):
+        super().__init__(namespace, ttl, enabled)
+        self.local = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    async def get(self, key: Hashable) -> bytes | None:
+        if not self.enabled:
+            return None
+        return self.local.get(key)
+
+    async def set(self, key: Hashable, value: bytes, ttl: float | None = None):
+        if self.enabled:
+            self.local.set(key, value, ttl)
+
+    async def delete(self, *keys: Hashable):
+        for key in keys:
+            self.local.delete(key)
+
+    def stats(self) -> dict:
+        return {**self.local.stats(), **super().stats()}
+
+
+class RedisCache(CacheBackend):
+    """
+    Shared backend over any Redis-protocol server. Values live in Redis
+    under `<namespace>:<key>`; a small near-cache in each worker absorbs hot
+    reads. Sets and deletes are published on `<namespace>:invalidate` and
+    every other worker's listener drops the key from its near-cache.
+    `local_ttl` bounds staleness if an invalidation message is missed.
+    """
+
+    def __init__(
+        self,
+        namespace: str,
+        ttl: float,
+        client,
+        local_maxsize: int = 1024,
+        local_ttl: float = 5.0,
+        enabled: bool = True,
+    ):
+        super().__init__(namespace, ttl, enabled)
+        self.redis = client
+        self.local = TTLCache(maxsize=local_maxsize, ttl=min(local_ttl, ttl))
+        self.channel = f"{namespace}:invalidate"
+        self.instance = uuid.uuid4().hex  # lets the listener skip this worker's own messages
+        self.hits = 0
+        self.misses = 0
+        self._listener: asyncio.Task | None = None
+
+    def _key(self, key: Hashable) -> str:
+        return f"{self.namespace}:{key}"
+
+    async def get(self, key: Hashable) -> bytes | None:
+        if not self.enabled:
+            return None
+        key = str(key)
+        value = self.local.get(key)
+        if value is None:
+            value = await self.redis.get(self._key(key))
+            if value is None:
+                self.misses += 1
+                return None
+            self.local.set(key, value)
+        self.hits += 1
+        return value
+
+    async def set(self, key: Hashable, value: bytes, ttl: float | None = None):
+        if not self.enabled:
+            return
+        key = str(key)
+        await self.redis.set(self._key(key), value, px=int((self.ttl if ttl is None else ttl) * 1000))
+        self.local.set(key, value)
+        await self._publish([key])
+
+    async def delete(self, *keys: Hashable):
+        if not keys:
+            return
+        keys = [str(key) for key in keys]
+        for key in keys:
+            self.local.delete(key)
+        await self.redis.delete(*(self._key(key) for key in keys))
+        await self._publish(keys)
+
+    async def _publish(self, keys: list[str]):
+        # First line is the sender, the rest are the keys to evict
+        await self.redis.publish(self.channel, "\n".join([self.instance, *keys]))
+
+    async def start(self):
+        if self._listener is None:
+            self._listener = asyncio.create_task(self._listen())
+
+    async def close(self):
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+
+    async def _listen(self):
+        while True:
+            pubsub = self.redis.pubsub()
+            try:
+                await pubsub.subscribe(self.channel)
+                # Anything cached before (re)subscribing may have missed an invalidation
+                self.local.clear()
+                async for message in pubsub.listen():
+                    if message["type"] != "message":
+                        continue
+                    data = message["data"]
+                    if isinstance(data, bytes):
+                        data = data.decode()
+                    sender, *keys = data.split("\n")
+                    if sender == self.instance:
+                        continue
+                    for key in keys:
+                        self.local.delete(key)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                self.local.clear()
+                await asyncio.sleep(1.0)
+            finally:
+                try:
+                    await pubsub.aclose()
+                except Exception:
+                    pass
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "local": self.local.stats(),
+            **super().stats(),
+        }
+
+
+_caches: list[CacheBackend] = []
+_redis_client = None
+
+
+def redis_client():
+    """The shared Redis connection pool for CACHE_URL, created on first use."""
+    global _redis_client
+    if _redis_client is None:
+        try:
+            import redis.asyncio as redis
+        except ImportError as exc:
+            raise RuntimeError("CACHE_URL is set but the 'redis' package is not installed") from exc
+        _redis_client = redis.from_url(settings.CACHE_URL)
+    return _redis_client
+
+
+def create_cache(namespace: str, ttl: float, maxsize: int = 1024, enabled: bool = True) -> CacheBackend:
+    """Build the configured backend for `namespace` and register it with the app lifespan."""
+    if settings.CACHE_URL:
+        cache = RedisCache(
+            f"{settings.CACHE_KEY_PREFIX}:{namespace}",
+            ttl,
+            redis_client(),
+            local_maxsize=maxsize,
+            local_ttl=settings.CACHE_LOCAL_TTL,
+            enabled=enabled,
+        )
+    else:
+        cache = MemoryCache(namespace, ttl, maxsize=maxsize, enabled=enabled)
+    _caches.append(cache)
+    return cache
+
+
+async def start_caches():
+    for cache in _caches:
+        await cache.start()
+
+
+async def close_caches():
+    global _redis_client
+    for cache in _caches:
+        await cache.close()
+    if _redis_client is not None:
+        await _redis_client.aclose()
+        _redis_client = None
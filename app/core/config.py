@@ -4,11 +4,174 @@ class Settings(BaseSettings):
     DATABASE_URL: str
     SECRET_KEY:str = "secretkey"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60
-    PAYMONGO_PUBLIC_KEY: str 
+
+    # Logging; records are written to stdout by a background thread
+    LOG_LEVEL: str = "INFO"
+    LOG_FORMAT: str = "json"  # json or text
+
+    # JWT signing keys by kid; defaults to {JWT_ACTIVE_KID: SECRET_KEY}
+    JWT_KEYS: dict[str, str] = {}
+    JWT_ACTIVE_KID: str = "default"
+    JWT_KEYS_FILE: str | None = None  # {"active_kid": ..., "keys": {...}}, re-read when it changes
+    JWT_KEYS_RELOAD_INTERVAL: float = 5.0
+    AUTH_TOKEN_CACHE_SIZE: int = 10_000
+    AUTH_USER_CACHE_TTL: float = 60.0
+    AUTH_USER_CACHE_SIZE: int = 10_000
+    # Accounts allowed on operator routes (invoice runs), by email; a JSON list in the environment
+    OPERATOR_EMAILS: list[str] = []
+    PAYMONGO_PUBLIC_KEY: str
     PAYMONGO_SECRET_KEY: str
     PAYMONGO_TOKEN: str
 
+    # Database pooling; sizing applies to server databases, not SQLite
+    ASYNC_DATABASE_URL: str | None = None  # derived from DATABASE_URL when unset
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30.0
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    DB_ECHO: bool = False
+    DB_CREATE_SCHEMA: bool = True  # apply pending migrations at startup
+    DB_SQLITE_WAL: bool = True  # WAL journal for SQLite files, so long reads do not block writes
+
+    # Read replicas (app.db.replicas), as sync URLs like DATABASE_URL; a JSON list in the environment.
+    # Locally, the primary's SQLite file opened read-only works: sqlite:///file:app.db?mode=ro&uri=true
+    DATABASE_REPLICA_URLS: list[str] = []
+    DB_REPLICA_BALANCING: str = "round_robin"  # or least_connections
+    DB_REPLICA_HEALTH_INTERVAL: float = 5.0
+    DB_REPLICA_HEALTH_TIMEOUT: float = 2.0
+    DB_READ_YOUR_WRITES_SECONDS: float = 5.0  # a client's reads stay on the primary this long after it writes
+    DB_READ_PIN_MAX_CLIENTS: int = 100_000
+
+    # Per-request statement budget (app.core.queryguard)
+    QUERY_GUARD_ENABLED: bool = True
+    QUERY_GUARD_MAX_STATEMENTS: int = 20
+    QUERY_GUARD_SLOW_STATEMENT: float = 0.25  # seconds
+    QUERY_GUARD_RAISE: bool = False  # fail the request instead of logging; meant for tests
+
+    # Password hashing; workers default to the CPU count
+    BCRYPT_ROUNDS: int = 12
+    PASSWORD_HASH_WORKERS: int | None = None
+    PASSWORD_HASH_QUEUE_SIZE: int = 32  # waiting jobs beyond busy workers before 429
+
+    # Shared cache; in-process per worker unless CACHE_URL points at Redis
+    CACHE_URL: str | None = None  # e.g. redis://localhost:6379/0
+    CACHE_KEY_PREFIX: str = "paymongo-fastapi"
+    CACHE_LOCAL_TTL: float = 5.0  # near-cache lifetime per worker for the Redis backend
+    CHECKOUT_IDEMPOTENCY_TTL: float = 86400.0  # how long an Idempotency-Key replays its session
+    CHECKOUT_IDEMPOTENCY_MAXSIZE: int = 10_000
+
+    # Per-client rate limits: path prefix -> (tokens per second, burst); the longest matching prefix
+    # applies. Clients are keyed by JWT subject, else RATE_LIMIT_KEY_HEADER, else client IP. Shared
+    # through Redis when CACHE_URL is set; behind a proxy, run uvicorn with --proxy-headers.
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMITS: dict[str, tuple[float, int]] = {
+        "/api/v1/auth/login": (0.2, 10),
+        "/api/v1/auth/register": (0.05, 5),
+        "/api/v1/checkout/create": (2.0, 20),
+        "/api/v1/checkout/batch": (0.1, 3),
+    }
+    RATE_LIMIT_KEY_HEADER: str | None = None  # e.g. "X-API-Key", only if a gateway authenticates it
+    RATE_LIMIT_MAX_KEYS: int = 100_000  # buckets kept by the in-process backend
+
+    # Batch checkout creation
+    CHECKOUT_BATCH_MAX_ITEMS: int = 500
+    CHECKOUT_BATCH_CONCURRENCY: int = 10  # in-flight PayMongo calls per batch
+
+    # Plan catalog cache
+    PLAN_CACHE_ENABLED: bool = True
+    PLAN_CACHE_TTL: float = 300.0
+    PLAN_CACHE_MAXSIZE: int = 1024
+
+    # Plan outbox: PayMongo plan calls queued with the plan change and delivered in the background
+    PLAN_OUTBOX_ENABLED: bool = True
+    PLAN_OUTBOX_CONCURRENCY: int = 4  # PayMongo calls in flight per batch
+    PLAN_OUTBOX_BATCH_SIZE: int = 20
+    PLAN_OUTBOX_POLL_INTERVAL: float = 5.0
+    PLAN_OUTBOX_LEASE_SECONDS: float = 60.0
+    PLAN_OUTBOX_MAX_ATTEMPTS: int = 8
+    PLAN_OUTBOX_RETRY_BASE_DELAY: float = 2.0
+    PLAN_OUTBOX_RETRY_MAX_DELAY: float = 600.0
+    PLAN_RECONCILE_INTERVAL: float | None = 900.0  # seconds between diffs against PayMongo's plan list; off when unset
+    PLAN_RECONCILE_PAGE_SIZE: int = 100
+    # Catalog sync: PayMongo plans changed since the last run are upserted into pricing_plans
+    PLAN_SYNC_INTERVAL: float | None = 300.0  # seconds between runs; off when unset (python -m app.db.sync_plans still works)
+    PLAN_SYNC_PAGE_SIZE: int = 100
+
+    # Usage metering; events are summed in memory per worker and flushed to usage_rollups
+    USAGE_BUCKET_SECONDS: int = 3600
+    USAGE_FLUSH_INTERVAL: float = 5.0  # also the most a worker's usage can lag in limit checks
+    USAGE_MAX_PENDING_KEYS: int = 100_000  # (subscription, metric, bucket) sums held before ingest waits for a flush
+    USAGE_BATCH_MAX_ITEMS: int = 10_000
+    # Usage metric -> PricingPlan column limiting its running total
+    USAGE_PLAN_LIMITS: dict[str, str] = {"seats": "max_users"}
+
+    # Invoice runs; files go to INVOICE_OUTPUT_DIR/<job id>/
+    INVOICE_OUTPUT_DIR: str = "./invoices"
+    INVOICE_RENDER_WORKERS: int | None = None  # render processes; defaults to the CPU count
+    INVOICE_CHUNK_SIZE: int = 1000  # rows fetched per round trip and rendered per task
+    INVOICE_PDF_ENABLED: bool = True
+    INVOICE_PROGRESS_INTERVAL: float = 1.0  # seconds between progress writes to the job row
+
+    # Webhook inbox workers
+    WEBHOOK_WORKER_ENABLED: bool = True
+    WEBHOOK_WORKER_CONCURRENCY: int = 8
+    WEBHOOK_BATCH_SIZE: int = 50
+    WEBHOOK_POLL_INTERVAL: float = 1.0
+    WEBHOOK_LEASE_SECONDS: float = 60.0
+    WEBHOOK_MAX_ATTEMPTS: int = 8
+    WEBHOOK_RETRY_BASE_DELAY: float = 2.0
+    WEBHOOK_RETRY_MAX_DELAY: float = 600.0
+
+    # Webhook signatures: the secret keys (whsk_...) of the registered webhooks; list old and
+    # new together while rotating. Deliveries older than the tolerance (seconds) are rejected.
+    PAYMONGO_WEBHOOK_SECRETS: list[str] = []
+    PAYMONGO_WEBHOOK_TOLERANCE: float = 300.0
+    WEBHOOK_VERIFY_SIGNATURES: bool = True  # turn off only for local experiments
+
+    # Webhook deduplication by PayMongo event id
+    DEDUP_LRU_SIZE: int = 100_000
+    DEDUP_BLOOM_CAPACITY: int = 1_000_000
+    DEDUP_BLOOM_ERROR_RATE: float = 0.001
+    DEDUP_RETENTION_HOURS: float = 72.0
+    DEDUP_PRUNE_INTERVAL: float = 3600.0
+
+    # PayMongo HTTP client
+    PAYMONGO_BASE_URL: str = "https://api.paymongo.com/v1"
+    PAYMONGO_HTTP2: bool = True
+    PAYMONGO_MAX_CONNECTIONS: int = 20
+    PAYMONGO_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    PAYMONGO_KEEPALIVE_EXPIRY: float = 30.0
+    PAYMONGO_CONNECT_TIMEOUT: float = 5.0
+    PAYMONGO_TIMEOUT: float = 10.0
+    PAYMONGO_RATE_LIMIT: float | None = None  # requests/second to the PayMongo host; unlimited when unset
+    PAYMONGO_RATE_BURST: int = 20
+    # Retries apply to idempotent calls and draw from a budget of RATIO x traffic + MIN_PER_SECOND
+    PAYMONGO_MAX_RETRIES: int = 2
+    PAYMONGO_RETRY_BASE_DELAY: float = 0.1
+    PAYMONGO_RETRY_MAX_DELAY: float = 2.0
+    PAYMONGO_RETRY_BUDGET_RATIO: float = 0.2
+    PAYMONGO_RETRY_BUDGET_MIN_PER_SECOND: float = 5.0
+    PAYMONGO_BREAKER_FAILURE_THRESHOLD: int = 5  # consecutive failures that open the circuit
+    PAYMONGO_BREAKER_RESET_TIMEOUT: float = 30.0
+    PAYMONGO_HEDGE_DELAY: float | None = None  # seconds before hedging a GET; hedging is off when unset
+    # Read timeouts per endpoint name, e.g. {"checkout.create": 20}
+    PAYMONGO_ENDPOINT_TIMEOUTS: dict[str, float] = {
+        "checkout.create": 15.0,
+        "checkout.retrieve": 5.0,
+        "checkout.expire": 10.0,
+        "plans.create": 15.0,
+        "plans.list": 10.0,
+        "plans.retrieve": 5.0,
+        "webhooks.create": 10.0,
+        "webhooks.list": 10.0,
+        "webhooks.retrieve": 5.0,
+        "webhooks.update": 10.0,
+        "webhooks.enable": 10.0,
+        "webhooks.disable": 10.0,
+    }
+
     class Config:
         env_file = '.env'
 
-settings = Settings()
\ No newline at end of file
+settings = Settings()
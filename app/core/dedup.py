@@ -0,0 +1,189 @@
+import asyncio
+import logging
+import math
+from datetime import datetime, timedelta
+from hashlib import blake2b
+from sqlalchemy import delete, select
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.db.session import AsyncSessionLocal
+from app.models.processed_event import ProcessedEvent
+
+logger = logging.getLogger(__name__)
+
+
+class BloomFilter:
+    """
+    Fixed-size bloom filter over strings. Sized for `capacity` items at
+    `error_rate` false positives; never returns a false negative.
+    """
+
+    def __init__(self, capacity: int, error_rate: float = 0.001):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.count = 0
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item: str):
+        # Double hashing (Kirsch-Mitzenmacher) from one 128-bit digest
+        digest = blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        size = self.size
+        return [(h1 + i * h2) % size for i in range(self.hashes)]
+
+    def add(self, item: str):
+        bits = self._bits
+        for position in self._positions(item):
+            bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        bits = self._bits
+        for position in self._positions(item):
+            if not bits[position >> 3] & (1 << (position & 7)):
+                return False
+        return True
+
+    def __len__(self) -> int:
+        return self.count
+
+
+class EventDeduplicator:
+    """
+    Answers "has this PayMongo event id been seen?" for webhook ingest.
+
+    Recently seen ids sit in an LRU, so a retry of a recent delivery is
+    rejected without touching the database. Every id known to this process
+    is also in a bloom filter, so a brand-new id (the common case) is let
+    through without a lookup either. Only a bloom positive that missed the
+    LRU costs a query against processed_events, whose unique key remains
+    the source of truth across processes. Rows older than the retention
+    window are pruned periodically and the bloom filter is rebuilt from
+    what is left, since bloom filters cannot forget. The first load runs in
+    the background so startup does not wait on it; until it finishes, ids
+    missing from the LRU are checked in the database.
+    """
+
+    def __init__(
+        self,
+        lru_size: int = 100_000,
+        bloom_capacity: int = 1_000_000,
+        error_rate: float = 0.001,
+        retention_hours: float = 72.0,
+        prune_interval: float = 3600.0,
+    ):
+        self.retention = timedelta(hours=retention_hours)
+        self.prune_interval = prune_interval
+        self.bloom_capacity = bloom_capacity
+        self.error_rate = error_rate
+        self.recent = TTLCache(maxsize=lru_size, ttl=self.retention.total_seconds())
+        self.bloom = BloomFilter(bloom_capacity, error_rate)
+        self.lru_hits = 0
+        self.bloom_negatives = 0
+        self.db_checks = 0
+        self.loaded = False
+        self._pruner: asyncio.Task | None = None
+
+    @classmethod
+    def from_settings(cls, settings) -> "EventDeduplicator":
+        return cls(
+            lru_size=settings.DEDUP_LRU_SIZE,
+            bloom_capacity=settings.DEDUP_BLOOM_CAPACITY,
+            error_rate=settings.DEDUP_BLOOM_ERROR_RATE,
+            retention_hours=settings.DEDUP_RETENTION_HOURS,
+            prune_interval=settings.DEDUP_PRUNE_INTERVAL,
+        )
+
+    async def start(self):
+        if self._pruner is None:
+            self._pruner = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._pruner is not None:
+            self._pruner.cancel()
+            try:
+                await self._pruner
+            except asyncio.CancelledError:
+                pass
+            self._pruner = None
+
+    def check_local(self, event_id: str) -> bool | None:
+        """True if known duplicate, False if certainly new, None if only the database can tell."""
+        if self.recent.get(event_id) is not None:
+            self.lru_hits += 1
+            return True
+        if self.loaded and event_id not in self.bloom:
+            self.bloom_negatives += 1
+            return False
+        return None
+
+    async def is_duplicate(self, event_id: str) -> bool:
+        seen = self.check_local(event_id)
+        if seen is not None:
+            return seen
+        self.db_checks += 1
+        async with AsyncSessionLocal() as db:
+            found = await db.scalar(select(ProcessedEvent.event_id).where(ProcessedEvent.event_id == event_id))
+        if found is not None:
+            self.recent.set(event_id, True)
+        return found is not None
+
+    def remember(self, event_id: str):
+        self.recent.set(event_id, True)
+        self.bloom.add(event_id)
+
+    async def rebuild(self):
+        """Reload the bloom filter from processed_events still inside the retention window."""
+        bloom = BloomFilter(self.bloom_capacity, self.error_rate)
+        cutoff = datetime.utcnow() - self.retention
+        async with AsyncSessionLocal() as db:
+            ids = await db.stream_scalars(
+                select(ProcessedEvent.event_id)
+                .where(ProcessedEvent.processed_at >= cutoff)
+                .execution_options(yield_per=10_000)
+            )
+            async for event_id in ids:
+                bloom.add(event_id)
+        # Ids remembered while loading are kept by carrying over the LRU
+        for event_id in list(self.recent._data):
+            bloom.add(event_id)
+        self.bloom = bloom
+        self.loaded = True
+
+    async def prune(self) -> int:
+        cutoff = datetime.utcnow() - self.retention
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(delete(ProcessedEvent).where(ProcessedEvent.processed_at < cutoff))
+            await db.commit()
+        await self.rebuild()
+        return result.rowcount
+
+    async def _run(self):
+        try:
+            await self.rebuild()
+        except Exception:
+            # Until a load succeeds every LRU miss is checked in the database, so no duplicate gets through
+            logger.exception("Loading the webhook dedup filter failed")
+        while True:
+            await asyncio.sleep(self.prune_interval)
+            try:
+                pruned = await self.prune()
+                logger.info("Pruned processed webhook events", extra={"pruned": pruned})
+            except Exception:
+                logger.exception("Pruning processed webhook events failed")
+
+    def stats(self) -> dict:
+        return {
+            "lru": self.recent.stats(),
+            "bloom_items": len(self.bloom),
+            "loaded": self.loaded,
+            "lru_hits": self.lru_hits,
+            "bloom_negatives": self.bloom_negatives,
+            "db_checks": self.db_checks,
+        }
+
+
+event_deduplicator = EventDeduplicator.from_settings(settings)
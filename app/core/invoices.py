@@ -0,0 +1,119 @@
+"""
+Invoice rendering. Runs in the invoice process pool, so it only uses the
+standard library and plain tuples in and bytes out.
+"""
+import csv
+import io
+import os
+from datetime import datetime
+from hashlib import blake2b
+
+CSV_COLUMNS = (
+    "number", "source", "source_id", "customer_email", "description",
+    "period_start", "period_end", "amount", "currency", "issued_at",
+)
+
+# Source row layouts, as selected by app.workers.invoices:
+#   checkout_session: (id, reference_number, description, amount, currency, created_at)
+#   subscription:     (id, user email, plan name, plan price, renewal billed, end of the cycle it pays for)
+
+
+def invoice_number(billed_at: datetime, source: str, source_id) -> str:
+    prefix = "SUB-" if source == "subscription" else ""
+    return f"INV-{billed_at:%Y%m}-{prefix}{source_id}"
+
+
+def pdf_path(pdf_dir: str, number: str) -> str:
+    # 256 subdirectories keep a million files from landing in one directory
+    shard = blake2b(number.encode(), digest_size=1).hexdigest()
+    return os.path.join(pdf_dir, shard, f"{number}.pdf")
+
+
+def format_amount(amount: int, currency: str) -> str:
+    units, cents = divmod(amount, 100)
+    return f"{currency} {units:,}.{cents:02d}"
+
+
+def _pdf_text(value: str) -> bytes:
+    text = value.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+    return text.encode("latin-1", "replace")
+
+
+def render_pdf(lines: list[str]) -> bytes:
+    """A one-page PDF of text lines in Helvetica; enough for an invoice without a PDF library."""
+    stream = b"BT /F1 11 Tf 14 TL 56 780 Td " + b" ".join(b"(%s) '" % _pdf_text(line) for line in lines) + b" ET"
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] /Resources << /Font << /F1 4 0 R >> >> /Contents 5 0 R >>",
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+        b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream),
+    ]
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(out)
+
+
+def invoice_fields(source: str, row: tuple) -> tuple:
+    """CSV_COLUMNS values, minus issued_at, for one source row."""
+    if source == "checkout_session":
+        session_id, reference_number, description, amount, currency, created_at = row
+        return (
+            invoice_number(created_at, source, session_id), source, session_id, "",
+            description or reference_number or "Checkout payment",
+            created_at, created_at, amount, currency,
+        )
+    subscription_id, email, plan_name, price, billed_at, cycle_end = row
+    return (
+        invoice_number(billed_at, source, subscription_id), source, subscription_id, email,
+        f"{plan_name} subscription", billed_at, cycle_end, round(price * 100), "PHP",
+    )
+
+
+def render_chunk(
+    source: str,
+    rows: list[tuple],
+    issued_at: datetime,
+    pdf_dir: str | None,
+) -> bytes:
+    """
+    Render one chunk of source rows: write each invoice's PDF under pdf_dir
+    (if given) and return the chunk's CSV lines, header not included.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    issued = issued_at.isoformat(timespec="seconds")
+    made_dirs = set()
+    for row in rows:
+        number, _, source_id, email, description, start, end, amount, currency = invoice_fields(source, row)
+        writer.writerow((
+            number, source, source_id, email, description,
+            start.date().isoformat(), end.date().isoformat(), amount, currency, issued,
+        ))
+        if pdf_dir is None:
+            continue
+        path = pdf_path(pdf_dir, number)
+        directory = os.path.dirname(path)
+        if directory not in made_dirs:
+            os.makedirs(directory, exist_ok=True)
+            made_dirs.add(directory)
+        lines = [
+            f"INVOICE {number}",
+            f"Issued {issued}",
+            "",
+            f"Bill to: {email}" if email else f"Reference: {source_id}",
+            f"Period: {start:%Y-%m-%d} to {end:%Y-%m-%d}",
+            "",
+            description,
+            f"Total due: {format_amount(amount, currency)}",
+        ]
+        with open(path, "wb") as fh:
+            fh.write(render_pdf(lines))
+    return buffer.getvalue().encode()
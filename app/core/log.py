@@ -0,0 +1,82 @@
+import json
+import logging
+import queue
+import sys
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from app.core.config import settings
+
+# LogRecord attributes that are not user-supplied `extra` fields
+_RESERVED = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: timestamp, level, logger, message and any `extra` fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED:
+                entry[key] = value
+        if record.exc_text:
+            entry["exc_info"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class _DeferredQueueHandler(QueueHandler):
+    """
+    Hands records to the listener thread. Only the message arguments and any
+    traceback are resolved here, since they may change after the call returns;
+    formatting and the stdout write happen off the event loop. The "app"
+    logger does not propagate, so the record is not shared and is updated
+    in place rather than copied.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+_listener: QueueListener | None = None
+
+
+def configure_logging(level: str = settings.LOG_LEVEL, fmt: str = settings.LOG_FORMAT):
+    """Send the "app" logger hierarchy to stdout through a background thread."""
+    global _listener
+    if _listener is not None:
+        return
+    handler = logging.StreamHandler(sys.stdout)
+    if fmt == "json":
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    _listener = QueueListener(log_queue, handler)
+    _listener.start()
+    logger = logging.getLogger("app")
+    logger.setLevel(level.upper())
+    logger.addHandler(_DeferredQueueHandler(log_queue))
+    logger.propagate = False
+
+
+def shutdown_logging():
+    """Flush queued records and stop the listener thread."""
+    global _listener
+    if _listener is None:
+        return
+    _listener.stop()
+    _listener = None
+    logger = logging.getLogger("app")
+    for handler in list(logger.handlers):
+        if isinstance(handler, _DeferredQueueHandler):
+            logger.removeHandler(handler)
+    logger.propagate = True
@@ -0,0 +1,207 @@
+import time
+from bisect import bisect_left
+from typing import Awaitable, Callable
+
+# Seconds; covers sub-millisecond cache hits up to slow upstream calls
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: tuple[str, ...], values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+
+    def samples(self) -> list[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+
+class _Simple(Metric):
+    """One value per label set, set directly or computed at scrape time by `callback` returning {labels: value}."""
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        callback: Callable[[], dict[tuple, float]] | None = None,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.values: dict[tuple, float] = {}
+        self.callback = callback
+
+    def samples(self) -> list[str]:
+        values = dict(self.values)
+        if self.callback is not None:
+            values.update(self.callback())
+        return [f"{self.name}{_labels(self.labelnames, key)} {value}" for key, value in values.items()]
+
+
+class Counter(_Simple):
+    kind = "counter"
+
+    def inc(self, *labels, amount: float = 1.0):
+        self.values[labels] = self.values.get(labels, 0.0) + amount
+
+
+class Gauge(_Simple):
+    kind = "gauge"
+
+    def set(self, value: float, *labels):
+        self.values[labels] = value
+
+
+class Histogram(Metric):
+    """
+    Per-label bucket counts. observe() is one bisect and two additions;
+    buckets are made cumulative only when rendered.
+    """
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self.series: dict[tuple, list] = {}
+
+    def observe(self, value: float, *labels):
+        series = self.series.get(labels)
+        if series is None:
+            # [per-bucket counts (+Inf last), sum]
+            series = self.series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+
+    def samples(self) -> list[str]:
+        lines = []
+        for key, (counts, total) in self.series.items():
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), counts):
+                cumulative += count
+                le = 'le="%s"' % bound
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {total}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics: list[Metric] = []
+        self.collectors: list[Callable[[], Awaitable[None]]] = []
+
+    def register(self, metric: Metric) -> Metric:
+        self.metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: tuple[str, ...] = (), callback=None) -> Counter:
+        return self.register(Counter(name, documentation, labelnames, callback))
+
+    def gauge(self, name: str, documentation: str, labelnames: tuple[str, ...] = (), callback=None) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames, callback))
+
+    def histogram(self, name: str, documentation: str, labelnames: tuple[str, ...] = (), buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def collector(self, func: Callable[[], Awaitable[None]]):
+        """Register a coroutine run before each scrape, for values that need I/O to compute."""
+        self.collectors.append(func)
+        return func
+
+    async def render(self) -> str:
+        for collect in self.collectors:
+            await collect()
+        return "\n".join(metric.render() for metric in self.metrics) + "\n"
+
+
+registry = Registry()
+
+http_request_duration = registry.histogram(
+    "http_request_duration_seconds", "Request latency by route template.", ("method", "route", "status")
+)
+paymongo_request_duration = registry.histogram(
+    "paymongo_request_duration_seconds", "PayMongo call latency per attempt.", ("endpoint", "status")
+)
+db_query_duration = registry.histogram(
+    "db_query_duration_seconds", "Database statement execution time.", ("operation",)
+)
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware timing each HTTP request. The route label is the
+    matched path template (e.g. /api/v1/plan/{plan_id}), so label
+    cardinality stays bounded.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        start = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            http_request_duration.observe(
+                time.perf_counter() - start,
+                scope["method"],
+                route.path if route is not None else "<unmatched>",
+                status_code,
+            )
+
+
+def instrument_engine(engine):
+    """Time every statement on a sync Engine (pass async_engine.sync_engine for async engines)."""
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _start(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _stop(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["query_start"].pop()
+        operation = statement.lstrip().split(None, 1)[0].upper() if statement else "UNKNOWN"
+        db_query_duration.observe(time.perf_counter() - started, operation)
+
+    @event.listens_for(engine, "handle_error")
+    def _error(exception_context):
+        connection = exception_context.connection
+        if connection is not None and connection.info.get("query_start"):
+            connection.info["query_start"].pop()
@@ -0,0 +1,286 @@
+import asyncio
+import time
+import httpx
+from app.core.config import settings
+from app.core.metrics import paymongo_request_duration, registry
+from app.core.ratelimit import TokenBucket
+from app.core.resilience import CircuitBreaker, CircuitOpenError, RetryBudget, backoff_delay
+
+# Upstream answers that count against the circuit and may be retried
+RETRYABLE_STATUSES = frozenset({429, 500, 502, 503, 504})
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "PUT", "DELETE"})
+
+
+class PayMongoClient:
+    """
+    Shared async client for the PayMongo REST API.
+    One pooled keep-alive (HTTP/2 when available) connection pool is opened
+    with the application lifespan and reused by every router. Callers beyond
+    max_connections wait on a semaphore rather than in httpcore's pool queue,
+    which rescans every connection for every queued request. An optional
+    token bucket caps the request rate to the PayMongo host.
+
+    Failures (transport errors, 429 and 5xx) feed a circuit breaker; while
+    it is open calls fail fast with CircuitOpenError (503). Idempotent calls,
+    meaning safe methods or POSTs carrying an Idempotency-Key, are retried
+    with jittered backoff, and connection failures are retried for any
+    method. Retries draw from a shared RetryBudget. GETs made with
+    hedge=True send a second request if the first has not answered within
+    hedge_delay, and the first good answer wins.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        token: str,
+        *,
+        http2: bool = True,
+        max_connections: int = 20,
+        max_keepalive_connections: int = 20,
+        keepalive_expiry: float = 30.0,
+        connect_timeout: float = 5.0,
+        default_timeout: float = 10.0,
+        endpoint_timeouts: dict[str, float] | None = None,
+        rate_limit: float | None = None,
+        rate_burst: int = 20,
+        max_retries: int = 2,
+        retry_base_delay: float = 0.1,
+        retry_max_delay: float = 2.0,
+        retry_budget: RetryBudget | None = None,
+        breaker: CircuitBreaker | None = None,
+        hedge_delay: float | None = None,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.token = token
+        self.http2 = http2
+        self.max_connections = max_connections
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.connect_timeout = connect_timeout
+        self.default_timeout = default_timeout
+        self.endpoint_timeouts = endpoint_timeouts or {}
+        self.rate_limit = rate_limit
+        self.rate_burst = rate_burst
+        self._bucket: TokenBucket | None = None
+        self.max_retries = max_retries
+        self.retry_base_delay = retry_base_delay
+        self.retry_max_delay = retry_max_delay
+        self.retry_budget = retry_budget or RetryBudget()
+        self.breaker = breaker or CircuitBreaker()
+        self.hedge_delay = hedge_delay
+        self.in_flight = 0
+        self.retries_total = 0
+        self.hedges_total = 0
+        self.hedge_wins_total = 0
+        self._client: httpx.AsyncClient | None = None
+        self._slots: asyncio.Semaphore | None = None
+
+    @classmethod
+    def from_settings(cls, settings) -> "PayMongoClient":
+        return cls(
+            settings.PAYMONGO_BASE_URL,
+            settings.PAYMONGO_TOKEN,
+            http2=settings.PAYMONGO_HTTP2,
+            max_connections=settings.PAYMONGO_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.PAYMONGO_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=settings.PAYMONGO_KEEPALIVE_EXPIRY,
+            connect_timeout=settings.PAYMONGO_CONNECT_TIMEOUT,
+            default_timeout=settings.PAYMONGO_TIMEOUT,
+            endpoint_timeouts=settings.PAYMONGO_ENDPOINT_TIMEOUTS,
+            rate_limit=settings.PAYMONGO_RATE_LIMIT,
+            rate_burst=settings.PAYMONGO_RATE_BURST,
+            max_retries=settings.PAYMONGO_MAX_RETRIES,
+            retry_base_delay=settings.PAYMONGO_RETRY_BASE_DELAY,
+            retry_max_delay=settings.PAYMONGO_RETRY_MAX_DELAY,
+            retry_budget=RetryBudget(settings.PAYMONGO_RETRY_BUDGET_RATIO, settings.PAYMONGO_RETRY_BUDGET_MIN_PER_SECOND),
+            breaker=CircuitBreaker(settings.PAYMONGO_BREAKER_FAILURE_THRESHOLD, settings.PAYMONGO_BREAKER_RESET_TIMEOUT),
+            hedge_delay=settings.PAYMONGO_HEDGE_DELAY,
+        )
+
+    async def start(self):
+        if self._client is not None:
+            return
+        http2 = self.http2
+        if http2:
+            try:
+                import h2  # noqa: F401
+            except ImportError:
+                http2 = False
+        self._slots = asyncio.Semaphore(self.max_connections)
+        if self.rate_limit:
+            self._bucket = TokenBucket(self.rate_limit, self.rate_burst)
+        self._client = httpx.AsyncClient(
+            base_url=self.base_url,
+            http2=http2,
+            limits=self.limits,
+            timeout=self.timeout_for(None),
+            headers={
+                "accept": "application/json",
+                "authorization": f"Basic {self.token}",
+            },
+        )
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def timeout_for(self, endpoint: str | None) -> httpx.Timeout:
+        read = self.endpoint_timeouts.get(endpoint, self.default_timeout)
+        return httpx.Timeout(read, connect=self.connect_timeout)
+
+    async def request(
+        self,
+        method: str,
+        path: str,
+        *,
+        endpoint: str | None = None,
+        json: dict | None = None,
+        params: dict | None = None,
+        headers: dict | None = None,
+        hedge: bool = False,
+    ) -> httpx.Response:
+        if self._client is None:
+            # Created on first use: building the TLS context takes long enough to slow startup
+            await self.start()
+        idempotent = method in IDEMPOTENT_METHODS or bool(headers and "Idempotency-Key" in headers)
+        hedge = hedge and method == "GET" and self.hedge_delay is not None
+
+        async def send() -> httpx.Response:
+            if self._bucket is not None:
+                await self._bucket.acquire()
+            async with self._slots:
+                self.in_flight += 1
+                start = time.perf_counter()
+                outcome = "error"
+                try:
+                    response = await self._client.request(
+                        method,
+                        path,
+                        json=json,
+                        params=params,
+                        headers=headers,
+                        timeout=self.timeout_for(endpoint),
+                    )
+                    outcome = response.status_code
+                    return response
+                except httpx.TimeoutException:
+                    outcome = "timeout"
+                    raise
+                finally:
+                    self.in_flight -= 1
+                    paymongo_request_duration.observe(time.perf_counter() - start, endpoint or "other", outcome)
+
+        self.retry_budget.deposit()
+        attempt = 0
+        while True:
+            if not self.breaker.allow():
+                raise CircuitOpenError(self.breaker.retry_after())
+            try:
+                response = await (self._hedged(send) if hedge else send())
+            except httpx.RequestError as exc:
+                self.breaker.record_failure()
+                # A request that never connected was not sent, so any method may retry it
+                retryable = idempotent or isinstance(exc, httpx.ConnectError)
+                if not (retryable and await self._retry(attempt := attempt + 1)):
+                    raise
+                continue
+            except BaseException:
+                self.breaker.release()
+                raise
+            if response.status_code not in RETRYABLE_STATUSES:
+                self.breaker.record_success()
+                return response
+            self.breaker.record_failure()
+            if not (idempotent and await self._retry(attempt := attempt + 1)):
+                return response
+
+    async def _retry(self, attempt: int) -> bool:
+        """Sleep before retry number `attempt`, or return False if it is not allowed."""
+        if attempt > self.max_retries or not self.retry_budget.withdraw():
+            return False
+        self.retries_total += 1
+        await asyncio.sleep(backoff_delay(attempt, self.retry_base_delay, self.retry_max_delay))
+        return True
+
+    async def _hedged(self, send) -> httpx.Response:
+        primary = asyncio.create_task(send())
+        pending = {primary}
+        try:
+            done, _ = await asyncio.wait(pending, timeout=self.hedge_delay)
+            if done or not self.retry_budget.withdraw():
+                return await primary
+            self.hedges_total += 1
+            hedge = asyncio.create_task(send())
+            pending.add(hedge)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None and task.result().status_code not in RETRYABLE_STATUSES:
+                        self.hedge_wins_total += task is hedge
+                        return task.result()
+            # Neither answer was good; surface the primary's outcome
+            return primary.result()
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def stats(self) -> dict:
+        return {
+            "breaker": self.breaker.stats(),
+            "retry_budget": self.retry_budget.stats(),
+            "retries_total": self.retries_total,
+            "hedges_total": self.hedges_total,
+            "hedge_wins_total": self.hedge_wins_total,
+        }
+
+    async def get(self, path: str, **kwargs) -> httpx.Response:
+        return await self.request("GET", path, **kwargs)
+
+    async def post(self, path: str, **kwargs) -> httpx.Response:
+        return await self.request("POST", path, **kwargs)
+
+    async def put(self, path: str, **kwargs) -> httpx.Response:
+        return await self.request("PUT", path, **kwargs)
+
+
+paymongo_client = PayMongoClient.from_settings(settings)
+
+
+def _paymongo_gauges() -> dict[tuple, float]:
+    breaker = paymongo_client.breaker
+    return {
+        ("in_use",): paymongo_client.in_flight,
+        ("max",): paymongo_client.max_connections,
+        ("breaker_open",): float(breaker.state == "open"),
+        ("retry_budget",): paymongo_client.retry_budget.stats()["balance"],
+    }
+
+
+def _paymongo_counters() -> dict[tuple, float]:
+    return {
+        ("retries",): paymongo_client.retries_total,
+        ("hedges",): paymongo_client.hedges_total,
+        ("hedge_wins",): paymongo_client.hedge_wins_total,
+        ("breaker_opened",): paymongo_client.breaker.opened_total,
+        ("breaker_rejected",): paymongo_client.breaker.rejected_total,
+    }
+
+
+registry.gauge("paymongo_client", "PayMongo HTTP pool usage and resilience state.", ("state",), _paymongo_gauges)
+registry.counter("paymongo_client_events_total", "PayMongo retries, hedges and breaker transitions.", ("event",), _paymongo_counters)
+
+
+def get_paymongo() -> PayMongoClient:
+    return paymongo_client
+
+
+def error_detail(response: httpx.Response):
+    """Return the upstream error body, falling back to raw text when it is not JSON."""
+    try:
+        return response.json()
+    except ValueError:
+        return response.text
@@ -0,0 +1,149 @@
+"""
+Per-request SQL statement budget.
+
+QueryGuardMiddleware counts the statements each request runs, and times
+them, through engine events that guard_engine() installs. A request over
+QUERY_GUARD_MAX_STATEMENTS, or with a statement slower than
+QUERY_GUARD_SLOW_STATEMENT, is logged with its route and slowest
+statements, which is how an N+1 loop or a missing index shows up. With
+QUERY_GUARD_RAISE (meant for tests) the offending statement raises
+QueryBudgetExceeded instead, so the request fails where the budget broke.
+"""
+import asyncio
+import logging
+import time
+from contextvars import ContextVar
+from app.core.config import settings
+from app.core.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetExceeded(RuntimeError):
+    pass
+
+
+class QueryBudget:
+    __slots__ = ("owner", "statements", "slow", "max_statements", "slow_threshold", "strict")
+
+    def __init__(self, max_statements: int, slow_threshold: float, strict: bool):
+        # Tasks a request spawns (coalesced cache loads, background jobs) inherit its
+        # context; only statements run by the request's own task count
+        self.owner = asyncio.current_task()
+        self.statements = 0
+        self.slow: list[tuple[float, str]] = []
+        self.max_statements = max_statements
+        self.slow_threshold = slow_threshold
+        self.strict = strict
+
+    def record(self, statement: str, elapsed: float):
+        self.statements += 1
+        if elapsed >= self.slow_threshold:
+            self.slow.append((elapsed, " ".join(statement.split())[:300]))
+        if self.strict:
+            if self.statements > self.max_statements:
+                raise QueryBudgetExceeded(f"More than {self.max_statements} statements in one request")
+            if elapsed >= self.slow_threshold:
+                raise QueryBudgetExceeded(f"Statement took {elapsed * 1000:.0f}ms: {self.slow[-1][1]}")
+
+    def exceeded(self) -> str | None:
+        if self.statements > self.max_statements:
+            return "statements"
+        if self.slow:
+            return "slow_statement"
+        return None
+
+
+_budget: ContextVar[QueryBudget | None] = ContextVar("query_budget", default=None)
+
+
+def current_budget() -> QueryBudget | None:
+    budget = _budget.get()
+    if budget is None:
+        return None
+    try:
+        task = asyncio.current_task()
+    except RuntimeError:
+        task = None  # a threadpool thread running a sync route for the request
+    if task is not None and task is not budget.owner:
+        return None
+    return budget
+
+
+def guard_engine(engine):
+    """Count and time statements on a sync Engine for the request running them."""
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _start(conn, cursor, statement, parameters, context, executemany):
+        if _budget.get() is not None:
+            conn.info.setdefault("guard_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _stop(conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get("guard_start")
+        if not starts:
+            return
+        elapsed = time.perf_counter() - starts.pop()
+        budget = current_budget()
+        if budget is not None:
+            budget.record(statement, elapsed)
+
+    @event.listens_for(engine, "handle_error")
+    def _error(exception_context):
+        connection = exception_context.connection
+        if connection is not None and connection.info.get("guard_start"):
+            connection.info["guard_start"].pop()
+
+
+class QueryGuardMiddleware:
+    """Pure ASGI middleware giving each HTTP request its own QueryBudget."""
+
+    def __init__(
+        self,
+        app,
+        max_statements: int | None = None,
+        slow_threshold: float | None = None,
+        strict: bool | None = None,
+    ):
+        self.app = app
+        self.max_statements = settings.QUERY_GUARD_MAX_STATEMENTS if max_statements is None else max_statements
+        self.slow_threshold = settings.QUERY_GUARD_SLOW_STATEMENT if slow_threshold is None else slow_threshold
+        self.strict = settings.QUERY_GUARD_RAISE if strict is None else strict
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        budget = QueryBudget(self.max_statements, self.slow_threshold, self.strict)
+        token = _budget.set(budget)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _budget.reset(token)
+            budget.owner = None  # statements from tasks the request left behind no longer count
+            reason = budget.exceeded()
+            if reason is not None:
+                route = scope.get("route")
+                route = route.path if route is not None else "<unmatched>"
+                query_budget_exceeded.inc(route, reason)
+                logger.warning(
+                    "Request exceeded its query budget",
+                    extra={
+                        "method": scope["method"],
+                        "route": route,
+                        "statements": budget.statements,
+                        "max_statements": budget.max_statements,
+                        "slow_statements": [
+                            {"ms": round(elapsed * 1000, 1), "sql": sql}
+                            for elapsed, sql in sorted(budget.slow, reverse=True)[:5]
+                        ],
+                    },
+                )
+
+
+query_budget_exceeded = registry.counter(
+    "http_query_budget_exceeded_total",
+    "Requests over the statement count or slow statement threshold.",
+    ("route", "reason"),
+)
@@ -0,0 +1,218 @@
+import asyncio
+import logging
+import math
+import time
+from collections import OrderedDict
+from hashlib import blake2b
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse
+from app.core.config import settings
+from app.core.metrics import registry
+from app.core.security import token_cache
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """
+    Refills `rate` tokens per second up to `burst`. acquire() waits for a
+    token, and waiters are served in arrival order.
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self):
+        async with self._lock:
+            self._refill()
+            while self.tokens < 1:
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+                self._refill()
+            self.tokens -= 1
+
+
+class RateLimiter:
+    """
+    Non-blocking token buckets, one per key. hit() takes a token and returns
+    0.0, or returns the seconds until one is available without taking it.
+    """
+
+    async def hit(self, key: str, rate: float, burst: int) -> float:
+        raise NotImplementedError
+
+
+class MemoryRateLimiter(RateLimiter):
+    """
+    Per-process buckets, stored as (tokens, updated, full_at) in an LRU. A
+    bucket that has refilled to full is the same as no bucket, so entries
+    past full_at are dropped as they reach the LRU's idle end; maxsize caps
+    memory if that is not enough.
+    """
+
+    def __init__(self, maxsize: int = 100_000):
+        self.maxsize = maxsize
+        self.evictions = 0
+        self._buckets: OrderedDict[str, tuple[float, float, float]] = OrderedDict()
+
+    async def hit(self, key: str, rate: float, burst: int) -> float:
+        now = time.monotonic()
+        buckets = self._buckets
+        while buckets:
+            oldest = next(iter(buckets.values()))
+            if oldest[2] > now and len(buckets) < self.maxsize:
+                break
+            if oldest[2] > now:
+                self.evictions += 1
+            buckets.popitem(last=False)
+        entry = buckets.pop(key, None)
+        tokens = burst if entry is None else min(burst, entry[0] + (now - entry[1]) * rate)
+        retry_after = 0.0
+        if tokens >= 1:
+            tokens -= 1
+        else:
+            retry_after = (1 - tokens) / rate
+        buckets[key] = (tokens, now, now + (burst - tokens) / rate)
+        return retry_after
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+# Refill and take a token in one step; Redis TIME gives every worker the same clock
+TOKEN_BUCKET_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1])
+if tokens == nil then
+    tokens = burst
+else
+    tokens = math.min(burst, tokens + math.max(0, now - tonumber(state[2])) * rate)
+end
+local retry_after = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    retry_after = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil((burst - tokens) / rate * 1000) + 1000)
+return tostring(retry_after)
+"""
+
+
+class RedisRateLimiter(RateLimiter):
+    """
+    Buckets shared by every worker, each a Redis hash updated atomically by
+    a Lua script. A key expires once its bucket would be full again, so idle
+    clients cost nothing.
+    """
+
+    def __init__(self, client, prefix: str):
+        self.redis = client
+        self.prefix = prefix
+        self._script = client.register_script(TOKEN_BUCKET_SCRIPT)
+
+    async def hit(self, key: str, rate: float, burst: int) -> float:
+        result = await self._script(keys=[f"{self.prefix}:{key}"], args=[rate, burst])
+        return float(result)
+
+
+def create_rate_limiter() -> RateLimiter:
+    if settings.CACHE_URL:
+        from app.core.cache import redis_client
+
+        return RedisRateLimiter(redis_client(), f"{settings.CACHE_KEY_PREFIX}:ratelimit")
+    return MemoryRateLimiter(settings.RATE_LIMIT_MAX_KEYS)
+
+
+rate_limit_decisions = registry.counter(
+    "rate_limit_decisions_total", "Rate limiter decisions by route prefix.", ("prefix", "outcome")
+)
+
+
+def client_key(scope) -> str:
+    """Who a request is counted against: the JWT subject, a gateway-set key header, or the client IP."""
+    headers = Headers(scope=scope)
+    authorization = headers.get("authorization")
+    if authorization and authorization[:7].lower() == "bearer ":
+        payload = token_cache.decode(authorization[7:])
+        if payload and payload.get("sub"):
+            return f"user:{payload['sub']}"
+    if settings.RATE_LIMIT_KEY_HEADER:
+        value = headers.get(settings.RATE_LIMIT_KEY_HEADER)
+        if value:
+            return f"key:{blake2b(value.encode(), digest_size=12).hexdigest()}"
+    client = scope.get("client")
+    return f"ip:{client[0] if client else 'unknown'}"
+
+
+class RateLimitMiddleware:
+    """
+    Pure ASGI middleware applying settings.RATE_LIMITS. Requests over their
+    limit get 429 with Retry-After. If the shared backend is unreachable,
+    requests are let through rather than failing the API.
+    """
+
+    def __init__(self, app, limits: dict[str, tuple[float, int]] | None = None, limiter: RateLimiter | None = None):
+        self.app = app
+        limits = settings.RATE_LIMITS if limits is None else limits
+        for prefix, (rate, burst) in limits.items():
+            if rate <= 0 or burst < 1:
+                raise ValueError(f"rate limit for {prefix!r} needs rate > 0 and burst >= 1")
+        # Longest prefix first, so the most specific rule wins
+        self.rules = sorted(
+            ((prefix, float(rate), int(burst)) for prefix, (rate, burst) in limits.items()),
+            key=lambda rule: -len(rule[0]),
+        )
+        self.limiter = limiter
+        self._failing = False
+
+    def match(self, path: str) -> tuple[str, float, int] | None:
+        for rule in self.rules:
+            if path.startswith(rule[0]):
+                return rule
+        return None
+
+    async def __call__(self, scope, receive, send):
+        rule = self.match(scope["path"]) if scope["type"] == "http" else None
+        if rule is None:
+            await self.app(scope, receive, send)
+            return
+        prefix, rate, burst = rule
+        if self.limiter is None:
+            self.limiter = create_rate_limiter()
+        try:
+            retry_after = await self.limiter.hit(f"{prefix}|{client_key(scope)}", rate, burst)
+        except Exception:
+            rate_limit_decisions.inc(prefix, "error")
+            if not self._failing:
+                self._failing = True
+                logger.exception("Rate limiter backend failed; allowing requests until it recovers")
+            await self.app(scope, receive, send)
+            return
+        if self._failing:
+            self._failing = False
+            logger.info("Rate limiter backend recovered")
+        if retry_after > 0:
+            rate_limit_decisions.inc(prefix, "limited")
+            response = JSONResponse(
+                {"detail": "Too many requests, please retry later"},
+                status_code=429,
+                headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+            )
+            await response(scope, receive, send)
+            return
+        rate_limit_decisions.inc(prefix, "allowed")
+        await self.app(scope, receive, send)
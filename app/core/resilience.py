@@ -0,0 +1,121 @@
+import random
+import time
+from fastapi import HTTPException, status
+
+
+class CircuitOpenError(HTTPException):
+    """Raised instead of calling an upstream whose circuit is open; served as 503."""
+
+    def __init__(self, retry_after: float):
+        super().__init__(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Payment gateway is unavailable, please retry shortly",
+            headers={"Retry-After": str(max(1, round(retry_after)))},
+        )
+
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failures and rejects calls
+    for `reset_timeout` seconds. Then one probe call is let through
+    (half-open): success closes the circuit, failure re-opens it.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.opened_total = 0
+        self.rejected_total = 0
+        self._probing = False
+
+    def allow(self) -> bool:
+        if self.state == "closed":
+            return True
+        if self.state == "open" and time.monotonic() - self.opened_at >= self.reset_timeout:
+            self.state = "half_open"
+        if self.state == "half_open" and not self._probing:
+            self._probing = True
+            return True
+        self.rejected_total += 1
+        return False
+
+    def retry_after(self) -> float:
+        return max(0.0, self.reset_timeout - (time.monotonic() - self.opened_at))
+
+    def record_success(self):
+        self.consecutive_failures = 0
+        self._probing = False
+        self.state = "closed"
+
+    def record_failure(self):
+        self.consecutive_failures += 1
+        self._probing = False
+        if self.state == "half_open" or self.consecutive_failures >= self.failure_threshold:
+            if self.state != "open":
+                self.opened_total += 1
+            self.state = "open"
+            self.opened_at = time.monotonic()
+
+    def release(self):
+        """Give back a half-open probe slot whose call was cancelled before it finished."""
+        self._probing = False
+
+    def stats(self) -> dict:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "opened_total": self.opened_total,
+            "rejected_total": self.rejected_total,
+        }
+
+
+class RetryBudget:
+    """
+    Caps retries (and hedged requests) at `ratio` of recent traffic plus a
+    floor of `min_per_second`, so a struggling upstream sees at most that
+    much extra load. Every request deposits `ratio` tokens, the floor
+    refills continuously, and each retry spends one token.
+    """
+
+    def __init__(self, ratio: float = 0.2, min_per_second: float = 5.0, window: float = 10.0):
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.capacity = max(1.0, min_per_second * window)
+        self.balance = self.capacity
+        self.updated = time.monotonic()
+        self.spent_total = 0
+        self.exhausted_total = 0
+
+    def _refill(self):
+        now = time.monotonic()
+        self.balance = min(self.capacity, self.balance + (now - self.updated) * self.min_per_second)
+        self.updated = now
+
+    def deposit(self):
+        self._refill()
+        self.balance = min(self.capacity, self.balance + self.ratio)
+
+    def withdraw(self) -> bool:
+        self._refill()
+        if self.balance < 1:
+            self.exhausted_total += 1
+            return False
+        self.balance -= 1
+        self.spent_total += 1
+        return True
+
+    def stats(self) -> dict:
+        self._refill()
+        return {
+            "balance": round(self.balance, 2),
+            "spent_total": self.spent_total,
+            "exhausted_total": self.exhausted_total,
+        }
+
+
+def backoff_delay(attempt: int, base: float, cap: float) -> float:
+    """Full-jitter exponential backoff for retry number `attempt` (1-based)."""
+    return random.uniform(0, min(cap, base * 2 ** (attempt - 1)))
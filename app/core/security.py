@@ -1,32 +1,211 @@
+import asyncio
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from jose import jwt
+from functools import cache, partial
+from hashlib import blake2b
+from app.core.cache import TTLCache
 from app.core.config import settings
-from passlib.context import CryptContext
 
-pwd_context = CryptContext(schemes=['bcrypt'], deprecated='auto')
+# python-jose and passlib are imported on first use rather than at startup
+
+
+@cache
+def password_context():
+    from passlib.context import CryptContext
+
+    # Hashes with a cost other than BCRYPT_ROUNDS report needs_update() and are rehashed on login
+    return CryptContext(
+        schemes=['bcrypt'],
+        deprecated='auto',
+        bcrypt__rounds=settings.BCRYPT_ROUNDS,
+        bcrypt__min_rounds=settings.BCRYPT_ROUNDS,
+        bcrypt__max_rounds=settings.BCRYPT_ROUNDS,
+    )
 
 SECRET_KEY = settings.SECRET_KEY
 ALGORITHM = 'HS256' 
 ACCESS_TOKEN_EXPIRE_MINUTES = settings.ACCESS_TOKEN_EXPIRE_MINUTES
 
+
+class KeyRing:
+    """
+    JWT signing keys by kid. New tokens are signed with the active kid and
+    carry it in their header; a token verifies against whichever listed key
+    its kid names. When keys_file is set it is re-read (at most every
+    reload_interval seconds, and only if its mtime changed), so keys can be
+    rotated without a restart: add the new key, make it active, and drop
+    the old one once its tokens have expired.
+    """
+
+    def __init__(
+        self,
+        keys: dict[str, str],
+        active_kid: str,
+        keys_file: str | None = None,
+        reload_interval: float = 5.0,
+    ):
+        self.keys_file = keys_file
+        self.reload_interval = reload_interval
+        self.version = 0
+        self._checked_at = 0.0
+        self._mtime: float | None = None
+        self.set_keys(keys, active_kid)
+
+    @classmethod
+    def from_settings(cls, settings) -> "KeyRing":
+        keys = dict(settings.JWT_KEYS) or {settings.JWT_ACTIVE_KID: settings.SECRET_KEY}
+        return cls(keys, settings.JWT_ACTIVE_KID, settings.JWT_KEYS_FILE, settings.JWT_KEYS_RELOAD_INTERVAL)
+
+    def set_keys(self, keys: dict[str, str], active_kid: str):
+        if active_kid not in keys:
+            raise ValueError(f"active kid {active_kid!r} has no key")
+        self.keys = dict(keys)
+        self.active_kid = active_kid
+        # Bumping the version drops every cached verification made with the old keys
+        self.version += 1
+
+    def maybe_reload(self):
+        if not self.keys_file:
+            return
+        now = time.monotonic()
+        if now - self._checked_at < self.reload_interval:
+            return
+        self._checked_at = now
+        try:
+            mtime = os.stat(self.keys_file).st_mtime
+            if mtime == self._mtime:
+                return
+            with open(self.keys_file) as fh:
+                data = json.load(fh)
+            self.set_keys(data["keys"], data["active_kid"])
+            self._mtime = mtime
+        except (OSError, ValueError, KeyError, TypeError):
+            # Keep serving with the last good keys
+            pass
+
+    def signing_key(self) -> tuple[str, str]:
+        self.maybe_reload()
+        return self.active_kid, self.keys[self.active_kid]
+
+    def verification_key(self, kid: str | None) -> str | None:
+        self.maybe_reload()
+        return self.keys.get(kid or self.active_kid)
+
+
+key_ring = KeyRing.from_settings(settings)
+
 def create_access_token(data: dict, expires_delta: timedelta | None = None):    
     to_encode = data.copy()
     expire = datetime.utcnow() + (expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
     to_encode.update({"exp": expire})
-    return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+    from jose import jwt
+
+    kid, key = key_ring.signing_key()
+    return jwt.encode(to_encode, key, algorithm=ALGORITHM, headers={"kid": kid})
 
 def decode_access_token(token: str):
+    from jose import jwt
+
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        key = key_ring.verification_key(jwt.get_unverified_header(token).get("kid"))
+        if key is None:
+            return None
+        payload = jwt.decode(token, key, algorithms=[ALGORITHM])
         return payload
     except jwt.JWTError:
         return None
 
+
+class TokenCache:
+    """
+    Verified JWT payloads keyed by a hash of the token, each kept until the
+    token's own exp. Entries are also keyed by the key ring version, so a
+    rotation that removes a key stops its tokens from verifying at once.
+    """
+
+    def __init__(self, maxsize: int = 10_000):
+        self.entries = TTLCache(maxsize=maxsize)
+
+    def decode(self, token: str) -> dict | None:
+        key_ring.maybe_reload()
+        key = (key_ring.version, blake2b(token.encode(), digest_size=16).digest())
+        payload = self.entries.get(key)
+        if payload is not None:
+            return payload
+        payload = decode_access_token(token)
+        if payload is None:
+            return None
+        ttl = payload.get("exp", 0) - time.time()
+        if ttl > 0:
+            self.entries.set(key, payload, ttl)
+        return payload
+
+
+token_cache = TokenCache(settings.AUTH_TOKEN_CACHE_SIZE)
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+    return password_context().verify(plain_password, hashed_password)
 
 def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
+    return password_context().hash(password)
+
+def verify_and_rehash(plain_password: str, hashed_password: str) -> tuple[bool, str | None]:
+    """Verify a password and return a fresh hash when the stored one uses outdated settings."""
+    context = password_context()
+    if not context.verify(plain_password, hashed_password):
+        return False, None
+    if context.needs_update(hashed_password):
+        return True, context.hash(plain_password)
+    return True, None
+
+
+class PasswordPoolBusy(Exception):
+    """Raised when the password pool already has its maximum of pending jobs."""
+
+
+class PasswordWorkerPool:
+    """
+    Dedicated threads for bcrypt work. bcrypt releases the GIL while hashing,
+    so these threads run in parallel without touching the shared Starlette
+    threadpool. Jobs beyond workers + queue_size are rejected immediately.
+    """
+
+    def __init__(self, workers: int | None = None, queue_size: int = 32):
+        self.workers = workers or os.cpu_count() or 1
+        self.queue_size = queue_size
+        self.pending = 0
+        self._executor: ThreadPoolExecutor | None = None
+
+    def start(self):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="password")
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    async def run(self, func, *args):
+        if self.pending >= self.workers + self.queue_size:
+            raise PasswordPoolBusy()
+        self.start()
+        self.pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, partial(func, *args))
+        finally:
+            self.pending -= 1
+
+
+password_pool = PasswordWorkerPool(settings.PASSWORD_HASH_WORKERS, settings.PASSWORD_HASH_QUEUE_SIZE)
+
+async def hash_password_async(password: str) -> str:
+    return await password_pool.run(hash_password, password)
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> tuple[bool, str | None]:
+    return await password_pool.run(verify_and_rehash, plain_password, hashed_password)
 
 def current_user(token: str):
     payload = decode_access_token(token)
@@ -0,0 +1,16 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+def dialect_insert(db: AsyncSession, table):
+    """
+    INSERT construct for the session's backend, giving access to
+    on_conflict_do_nothing / on_conflict_do_update on SQLite and PostgreSQL.
+    """
+    name = db.bind.dialect.name
+    if name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise NotImplementedError(f"upserts are not supported on {name}")
+    return insert(table)
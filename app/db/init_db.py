@@ -1,8 +1,47 @@
-from app.db.session import engine, Base
+import os
+from alembic import command
+from alembic.config import Config
+from app.db.session import Base, get_async_engine, get_engine
+# Every model is imported here so Base.metadata is complete for migrations
 from app.models.pricing_plan import PricingPlan
+from app.models.user import User
+from app.models.webhook_event import WebhookEvent
+from app.models.processed_event import ProcessedEvent
+from app.models.checkout_session import CheckoutSessionRecord
+from app.models.subscription import Subscription
+from app.models.usage import UsageRollup
+from app.models.invoice_job import InvoiceJob
+from app.models.plan_outbox import PlanOutbox
+from app.models.sync_state import SyncState
+from app.models.issued_invoice import IssuedInvoice
+
+ALEMBIC_INI = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "alembic.ini")
+
+
+def alembic_config(connection=None) -> Config:
+    config = Config(ALEMBIC_INI)
+    config.attributes["connection"] = connection
+    return config
+
+
+def migrate(connection):
+    """Upgrade the database on `connection` to the latest migration."""
+    # A database create_all built before there were migrations has no alembic_version; it is
+    # upgraded from the start too, as 0001-0003 keep whatever tables and indexes it already has
+    command.upgrade(alembic_config(connection), "head")
+
 
 def init_db():
-    Base.metadata.create_all(bind=engine)
+    get_async_engine()
+    with get_engine().begin() as connection:
+        migrate(connection)
+
+
+async def ensure_schema():
+    """Apply pending migrations; run once by the app lifespan so init_db is not a manual step."""
+    async with get_async_engine().begin() as conn:
+        await conn.run_sync(migrate)
+
 
 if __name__ == "__main__":
-    init_db()
\ No newline at end of file
+    init_db()
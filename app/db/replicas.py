@@ -0,0 +1,211 @@
+"""
+Read replica routing.
+
+Sessions from app.db.session.read_session() go to a healthy replica from
+DATABASE_REPLICA_URLS, chosen round-robin or by fewest sessions in use.
+Everything else, writes included, uses the primary. Replicas are probed
+every DB_REPLICA_HEALTH_INTERVAL seconds; one that fails a probe, or drops
+a connection mid-request, is taken out of rotation until a probe succeeds.
+With no healthy replica, reads fall back to the primary.
+
+ReadYourWritesMiddleware pins a client's reads to the primary for
+DB_READ_YOUR_WRITES_SECONDS after a request of theirs writes, so they do
+not read a replica that has not replayed their change yet. Clients are
+identified as the rate limiter does (JWT subject, key header or IP). Pins
+are kept per process, so behind several workers a client can still land on
+a worker that has not seen its write; keep the window above the replicas'
+usual lag.
+"""
+import asyncio
+import itertools
+import logging
+import time
+from collections import OrderedDict
+from contextvars import ContextVar
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import AsyncEngine
+from app.core.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+BALANCING = ("round_robin", "least_connections")
+
+
+class Replica:
+    __slots__ = ("name", "engine", "healthy", "in_use", "last_error")
+
+    def __init__(self, name: str, engine: AsyncEngine):
+        self.name = name
+        self.engine = engine
+        self.healthy = True
+        self.in_use = 0  # read sessions open on this replica
+        self.last_error: str | None = None
+
+
+class ReplicaSet:
+    """Replica engines with load balancing and health checks."""
+
+    def __init__(
+        self,
+        engines: list[AsyncEngine],
+        balancing: str = "round_robin",
+        health_interval: float = 5.0,
+        health_timeout: float = 2.0,
+    ):
+        if balancing not in BALANCING:
+            raise ValueError(f"DB_REPLICA_BALANCING must be one of {', '.join(BALANCING)}, not {balancing!r}")
+        self.replicas = [Replica(f"replica{i}", engine) for i, engine in enumerate(engines)]
+        self.balancing = balancing
+        self.health_interval = health_interval
+        self.health_timeout = health_timeout
+        self._turn = itertools.count()
+        self._checker: asyncio.Task | None = None
+
+    def pick(self) -> Replica | None:
+        """A healthy replica for the next read session, or None to use the primary."""
+        healthy = [replica for replica in self.replicas if replica.healthy]
+        if not healthy:
+            return None
+        start = next(self._turn) % len(healthy)
+        if self.balancing == "round_robin":
+            return healthy[start]
+        # Rotating the start spreads ties instead of always favouring the first replica
+        rotated = healthy[start:] + healthy[:start]
+        return min(rotated, key=lambda replica: replica.in_use)
+
+    def mark_down(self, replica: Replica, error: BaseException):
+        replica.last_error = f"{type(error).__name__}: {error}"
+        if replica.healthy:
+            replica.healthy = False
+            logger.warning("Read replica taken out of rotation", extra={"replica": replica.name, "error": replica.last_error})
+
+    async def check(self, replica: Replica):
+        try:
+            async with replica.engine.connect() as conn:
+                await asyncio.wait_for(conn.execute(text("SELECT 1")), timeout=self.health_timeout)
+        except Exception as e:
+            self.mark_down(replica, e)
+            return
+        if not replica.healthy:
+            replica.healthy = True
+            replica.last_error = None
+            logger.info("Read replica back in rotation", extra={"replica": replica.name})
+
+    async def check_all(self):
+        await asyncio.gather(*(self.check(replica) for replica in self.replicas))
+
+    def start(self):
+        if self._checker is None and self.replicas:
+            self._checker = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._checker is not None:
+            self._checker.cancel()
+            try:
+                await self._checker
+            except asyncio.CancelledError:
+                pass
+            self._checker = None
+
+    async def _run(self):
+        while True:
+            await self.check_all()
+            await asyncio.sleep(self.health_interval)
+
+    async def dispose(self):
+        await self.stop()
+        for replica in self.replicas:
+            await replica.engine.dispose()
+
+
+class RequestRouting:
+    """Routing state of the request being served."""
+    __slots__ = ("primary", "wrote")
+
+    def __init__(self, primary: bool):
+        self.primary = primary  # read from the primary: the client wrote recently
+        self.wrote = False  # this request has written to the primary
+
+
+_routing: ContextVar[RequestRouting | None] = ContextVar("db_routing", default=None)
+
+
+def reads_pinned_to_primary() -> bool:
+    state = _routing.get()
+    return state is not None and (state.primary or state.wrote)
+
+
+def track_writes(engine):
+    """Note on the current request when it sends INSERT/UPDATE/DELETE through `engine` (the primary)."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _note_write(conn, cursor, statement, parameters, context, executemany):
+        state = _routing.get()
+        if state is not None and not state.wrote and context is not None and (
+            context.isinsert or context.isupdate or context.isdelete
+        ):
+            state.wrote = True
+
+
+class PrimaryPins:
+    """Clients whose reads go to the primary until a deadline; an LRU bounded by maxsize."""
+
+    def __init__(self, window: float, maxsize: int = 100_000):
+        self.window = window
+        self.maxsize = maxsize
+        self._until: OrderedDict[str, float] = OrderedDict()
+
+    def pin(self, key: str):
+        self._until[key] = time.monotonic() + self.window
+        self._until.move_to_end(key)
+        while len(self._until) > self.maxsize:
+            self._until.popitem(last=False)
+
+    def pinned(self, key: str) -> bool:
+        until = self._until.get(key)
+        if until is None:
+            return False
+        if until <= time.monotonic():
+            del self._until[key]
+            return False
+        return True
+
+    def __len__(self) -> int:
+        return len(self._until)
+
+
+class ReadYourWritesMiddleware:
+    """Pure ASGI middleware routing a recently-writing client's reads to the primary."""
+
+    def __init__(self, app, window: float | None = None, maxsize: int | None = None):
+        from app.core.config import settings
+        from app.core.ratelimit import client_key
+
+        self.app = app
+        self.client_key = client_key
+        self.pins = PrimaryPins(
+            settings.DB_READ_YOUR_WRITES_SECONDS if window is None else window,
+            settings.DB_READ_PIN_MAX_CLIENTS if maxsize is None else maxsize,
+        )
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        key = self.client_key(scope)
+        state = RequestRouting(primary=self.pins.pinned(key))
+        token = _routing.set(state)
+
+        async def send_wrapper(message):
+            # Pinned before the response leaves, so the client's next request already sees it
+            if message["type"] == "http.response.start" and state.wrote:
+                self.pins.pin(key)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _routing.reset(token)
+
+
+db_reads = registry.counter("db_read_sessions_total", "Read sessions by the database they went to.", ("target",))
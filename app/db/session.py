@@ -1,19 +1,215 @@
-from sqlalchemy import create_engine
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+from sqlalchemy import MetaData, create_engine, event
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
 from app.core.config import settings
+from app.core.metrics import instrument_engine, registry
+from app.core.queryguard import guard_engine
+from app.db.replicas import ReplicaSet, db_reads, reads_pinned_to_primary, track_writes
 
-engine = create_engine(
-    settings.DATABASE_URL,
-    connect_args={"check_same_thread": False} if settings.DATABASE_URL.startswith("sqlite") else {}
-)
+# Async drivers for the sync URLs we accept in DATABASE_URL
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "postgres": "postgresql+asyncpg",
+}
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-Base = declarative_base()
+
+def async_database_url(url: str) -> str:
+    """Translate a sync DATABASE_URL into the matching async driver URL."""
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if parsed.drivername in ASYNC_DRIVERS.values() or backend not in ASYNC_DRIVERS:
+        return url
+    return parsed.set(drivername=ASYNC_DRIVERS[backend]).render_as_string(hide_password=False)
+
+
+def engine_options(url: str) -> dict:
+    options = {
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "echo": settings.DB_ECHO,
+    }
+    if url.startswith("sqlite"):
+        options["connect_args"] = {"check_same_thread": False}
+    else:
+        options.update(
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+        )
+    return options
+
+
+def use_sqlite_wal(engine: Engine):
+    """
+    Put SQLite file databases in WAL mode, where readers never block a
+    writer: long streaming reads (invoice runs, dedup loads) would otherwise
+    hold a shared lock that makes every commit elsewhere time out.
+    """
+    if engine.dialect.name != "sqlite" or not settings.DB_SQLITE_WAL:
+        return
+
+    @event.listens_for(engine, "connect")
+    def _set_wal(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.close()
+
+
+# Named unique constraints, so migrations can drop them on every backend.
+# Relationships are declared lazy="raise" and loaded with explicit
+# joinedload()/selectinload() options: an N+1 cannot creep in through
+# attribute access, and under asyncio an implicit lazy load fails anyway.
+Base = declarative_base(metadata=MetaData(naming_convention={
+    "ix": "ix_%(column_0_label)s",  # SQLAlchemy's default, kept
+    "uq": "uq_%(table_name)s_%(column_0_name)s",
+}))
+
+# Bound to their engines by get_engine() / get_async_engine(), which the app
+# lifespan (or init_db) calls, so importing this module opens nothing
+SessionLocal = sessionmaker(autocommit=False, autoflush=False)
+# expire_on_commit=False so committed objects can still be read without an implicit (sync) refresh
+AsyncSessionLocal = async_sessionmaker(autoflush=False, expire_on_commit=False)
+
+_engine: Engine | None = None
+_async_engine: AsyncEngine | None = None
+_replicas: ReplicaSet | None = None
+
+
+def get_engine() -> Engine:
+    """The sync engine, created on first use; the app itself only needs it for scripts and sync dependencies."""
+    global _engine
+    if _engine is None:
+        _engine = create_engine(settings.DATABASE_URL, **engine_options(settings.DATABASE_URL))
+        use_sqlite_wal(_engine)
+        instrument_engine(_engine)
+        if settings.QUERY_GUARD_ENABLED:
+            guard_engine(_engine)
+        if settings.DATABASE_REPLICA_URLS:
+            track_writes(_engine)
+        SessionLocal.configure(bind=_engine)
+    return _engine
+
+
+def create_instrumented_async_engine(url: str) -> AsyncEngine:
+    engine = create_async_engine(url, **engine_options(url))
+    use_sqlite_wal(engine.sync_engine)
+    instrument_engine(engine.sync_engine)
+    if settings.QUERY_GUARD_ENABLED:
+        guard_engine(engine.sync_engine)
+    return engine
+
+
+def get_async_engine() -> AsyncEngine:
+    """The primary async engine, and the replica engines with it when DATABASE_REPLICA_URLS is set."""
+    global _async_engine, _replicas
+    if _async_engine is None:
+        url = settings.ASYNC_DATABASE_URL or async_database_url(settings.DATABASE_URL)
+        _async_engine = create_instrumented_async_engine(url)
+        AsyncSessionLocal.configure(bind=_async_engine)
+        if settings.DATABASE_REPLICA_URLS:
+            track_writes(_async_engine.sync_engine)
+            _replicas = ReplicaSet(
+                [
+                    create_instrumented_async_engine(async_database_url(replica_url))
+                    for replica_url in settings.DATABASE_REPLICA_URLS
+                ],
+                balancing=settings.DB_REPLICA_BALANCING,
+                health_interval=settings.DB_REPLICA_HEALTH_INTERVAL,
+                health_timeout=settings.DB_REPLICA_HEALTH_TIMEOUT,
+            )
+    return _async_engine
+
+
+def get_replica_set() -> ReplicaSet | None:
+    return _replicas
+
+
+@asynccontextmanager
+async def read_session(primary: bool = False) -> AsyncIterator[AsyncSession]:
+    """
+    A session for reads only. It is bound to a replica when replicas are
+    configured and healthy, unless `primary` is set or the current client
+    wrote within DB_READ_YOUR_WRITES_SECONDS; otherwise to the primary.
+    """
+    replica = None
+    if _replicas is not None and not primary and not reads_pinned_to_primary():
+        replica = _replicas.pick()
+    if replica is None:
+        db_reads.inc("primary")
+        async with AsyncSessionLocal() as db:
+            yield db
+        return
+    db_reads.inc(replica.name)
+    replica.in_use += 1
+    try:
+        async with AsyncSessionLocal(bind=replica.engine) as db:
+            yield db
+    except DBAPIError as e:
+        if e.connection_invalidated:
+            _replicas.mark_down(replica, e)
+        raise
+    finally:
+        replica.in_use -= 1
+
+
+async def dispose_engines():
+    """Close pooled connections; the engines reconnect if used again."""
+    if _async_engine is not None:
+        await _async_engine.dispose()
+    if _replicas is not None:
+        await _replicas.dispose()
+    if _engine is not None:
+        _engine.dispose()
+
+
+def _pool_connections() -> dict[tuple, float]:
+    values = {}
+    engines = [("sync", _engine), ("async", _async_engine and _async_engine.sync_engine)]
+    if _replicas is not None:
+        engines += [(replica.name, replica.engine.sync_engine) for replica in _replicas.replicas]
+    for name, engine in engines:
+        # Only queue pools report sizes; SQLite memory/static pools have nothing to show
+        if engine is not None and hasattr(engine.pool, "checkedout"):
+            values[(name, "checked_out")] = engine.pool.checkedout()
+            values[(name, "idle")] = engine.pool.checkedin()
+            values[(name, "size")] = engine.pool.size()
+    return values
+
+
+def _replica_states() -> dict[tuple, float]:
+    if _replicas is None:
+        return {}
+    return {
+        (replica.name, state): value
+        for replica in _replicas.replicas
+        for state, value in (("healthy", int(replica.healthy)), ("in_use", replica.in_use))
+    }
+
+
+registry.gauge("db_pool_connections", "Database pool connections by state.", ("engine", "state"), _pool_connections)
+registry.gauge("db_replica", "Read replica health (1/0) and read sessions in use.", ("replica", "state"), _replica_states)
 
 # ✅ No decorator, just a generator function
 def get_db():
+    get_engine()
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+async def get_async_read_db():
+    """Dependency for read-only routes; see read_session()."""
+    async with read_session() as db:
+        yield db
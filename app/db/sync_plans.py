@@ -0,0 +1,28 @@
+"""
+Run the plan catalog sync once, outside the app:
+
+    python -m app.db.sync_plans          # plans changed on PayMongo since the last sync
+    python -m app.db.sync_plans --full   # every PayMongo plan
+"""
+import argparse
+import asyncio
+import json
+from app.core.paymongo import paymongo_client
+from app.db import init_db  # noqa: F401  imports every model, so the mappers' relationships resolve
+from app.db.session import dispose_engines, get_async_engine
+from app.workers.plan_sync import plan_catalog_sync
+
+
+async def sync_plans(full: bool = False) -> dict[str, int]:
+    get_async_engine()
+    try:
+        return await plan_catalog_sync.run(full=full)
+    finally:
+        await paymongo_client.close()
+        await dispose_engines()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--full", action="store_true", help="ignore the high-water mark")
+    print(json.dumps(asyncio.run(sync_plans(parser.parse_args().full))))
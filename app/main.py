@@ -1,13 +1,115 @@
+import logging
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
-from app.api.v1 import (auth, plans, webhooks, checkout)
-   
-app = FastAPI(title="FastAPI Example", description="A simple FastAPI application", version="1.0.0")
+from fastapi.responses import ORJSONResponse, PlainTextResponse
+from app.core.config import settings
+from app.core.log import configure_logging, shutdown_logging
+from app.core.metrics import MetricsMiddleware, registry
+from app.core.queryguard import QueryGuardMiddleware
+from app.core.ratelimit import RateLimitMiddleware
 
-    # This function can be used to initialize resources or perform startup tasks
-print("Application is starting up...")
 
+logger = logging.getLogger("app.main")
 
-app.include_router(auth.router, prefix="/api/v1/auth", tags=["auth"])
-app.include_router(plans.router, prefix="/api/v1/plan", tags=["plan"])
-app.include_router(webhooks.router, prefix="/api/v1/webhooks", tags=["webhooks"])    
-app.include_router(checkout.router, prefix="/api/v1/checkout", tags=["checkout"])
\ No newline at end of file
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Open shared resources before serving and release them on shutdown.
+    # The PayMongo HTTP client is created on its first request.
+    from app.core.cache import close_caches, start_caches
+    from app.core.dedup import event_deduplicator
+    from app.core.paymongo import paymongo_client
+    from app.core.security import password_pool
+    from app.db.init_db import ensure_schema
+    from app.db.session import dispose_engines, get_async_engine, get_replica_set
+    from app.workers.invoices import invoice_generator
+    from app.workers.plan_sync import plan_catalog_sync
+    from app.workers.plans import plan_outbox_worker
+    from app.workers.usage import usage_aggregator
+    from app.workers.webhooks import webhook_worker
+
+    configure_logging()
+    logger.info("Application is starting up")
+    get_async_engine()
+    if settings.DB_CREATE_SCHEMA:
+        await ensure_schema()
+    replicas = get_replica_set()
+    if replicas is not None:
+        replicas.start()
+    password_pool.start()
+    await start_caches()
+    await event_deduplicator.start()
+    if settings.WEBHOOK_WORKER_ENABLED:
+        webhook_worker.start()
+    if settings.PLAN_OUTBOX_ENABLED:
+        plan_outbox_worker.start()
+    plan_catalog_sync.start()
+    usage_aggregator.start()
+    try:
+        yield
+    finally:
+        await webhook_worker.stop()
+        await plan_outbox_worker.stop()
+        await plan_catalog_sync.stop()
+        await usage_aggregator.stop()
+        await invoice_generator.shutdown()
+        await event_deduplicator.stop()
+        await paymongo_client.close()
+        password_pool.shutdown()
+        await close_caches()
+        await dispose_engines()
+        shutdown_logging()
+
+
+def create_app() -> FastAPI:
+    """
+    Build the application. Routers pull in the ORM, auth and PayMongo
+    stack, so they are imported here rather than when this module is.
+    Serve with `uvicorn app.main:app` or `uvicorn app.main:create_app --factory`.
+    """
+    from app.api.v1 import auth, checkout, invoices, plans, subscription, usage, webhooks
+    from app.core.paymongo import paymongo_client
+
+    app = FastAPI(
+        title="FastAPI Example",
+        description="A simple FastAPI application",
+        version="1.0.0",
+        lifespan=lifespan,
+        default_response_class=ORJSONResponse,
+    )
+    if settings.QUERY_GUARD_ENABLED:
+        app.add_middleware(QueryGuardMiddleware)
+    if settings.DATABASE_REPLICA_URLS:
+        from app.db.replicas import ReadYourWritesMiddleware
+
+        app.add_middleware(ReadYourWritesMiddleware)
+    if settings.RATE_LIMIT_ENABLED:
+        app.add_middleware(RateLimitMiddleware)
+    # Added last so it is outermost: rate-limited requests are still timed and counted
+    app.add_middleware(MetricsMiddleware)
+
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics():
+        return PlainTextResponse(await registry.render(), media_type="text/plain; version=0.0.4")
+
+    @app.get("/health", tags=["health"])
+    async def health():
+        # Upstream breaker state lets load balancers and dashboards see PayMongo trouble
+        return {"status": "ok", "paymongo": paymongo_client.stats()}
+
+    app.include_router(auth.router, prefix="/api/v1/auth", tags=["auth"])
+    app.include_router(plans.router, prefix="/api/v1/plan", tags=["plan"])
+    app.include_router(webhooks.router, prefix="/api/v1/webhooks", tags=["webhooks"])
+    app.include_router(checkout.router, prefix="/api/v1/checkout", tags=["checkout"])
+    app.include_router(subscription.router, prefix="/api/v1/subscriptions", tags=["subscriptions"])
+    app.include_router(usage.router, prefix="/api/v1/usage", tags=["usage"])
+    app.include_router(invoices.router, prefix="/api/v1/invoices", tags=["invoices"])
+    return app
+
+
+def __getattr__(name: str):
+    # `app.main:app` keeps working: the module-level app is built on first access
+    if name == "app":
+        app = globals()["app"] = create_app()
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
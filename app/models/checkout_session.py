@@ -0,0 +1,71 @@
+import json
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, DateTime, LargeBinary, Index, or_
+from sqlalchemy.orm import deferred
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.dialect import dialect_insert
+from app.db.session import Base
+
+class CheckoutSessionRecord(Base):
+    """Local copy of a PayMongo checkout session, written on create and updated from webhooks."""
+    __tablename__ = "checkout_sessions"
+
+    id = Column(String, primary_key=True)  # PayMongo cs_... id
+    reference_number = Column(String, index=True, nullable=True)
+    status = Column(String, nullable=False, default="active")  # active, paid, expired
+    amount = Column(Integer, nullable=False, default=0)  # total in centavos
+    currency = Column(String, nullable=False, default="PHP")
+    description = Column(String, nullable=True)
+    checkout_url = Column(String, nullable=True)
+    payment_intent_id = Column(String, nullable=True)
+    # {"data": <resource>} as PayMongo returned it; only loaded when selected explicitly
+    payload = deferred(Column(LargeBinary, nullable=False))
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (
+        # Keyset pagination: ORDER BY created_at DESC, id DESC, optionally filtered by status
+        Index("ix_checkout_sessions_created_at_id", "created_at", "id"),
+        Index("ix_checkout_sessions_status_created_at_id", "status", "created_at", "id"),
+    )
+
+
+def session_columns(resource: dict) -> dict:
+    """Column values for a PayMongo checkout_session resource."""
+    attributes = resource.get("attributes") or {}
+    line_items = attributes.get("line_items") or []
+    status = "paid" if attributes.get("payments") else attributes.get("status") or "active"
+    created_at = attributes.get("created_at")
+    return {
+        "id": resource["id"],
+        "reference_number": attributes.get("reference_number"),
+        "status": status,
+        "amount": sum(int(item.get("amount") or 0) * int(item.get("quantity") or 1) for item in line_items),
+        "currency": line_items[0].get("currency", "PHP") if line_items else "PHP",
+        "description": attributes.get("description"),
+        "checkout_url": attributes.get("checkout_url"),
+        "payment_intent_id": (attributes.get("payment_intent") or {}).get("id"),
+        "created_at": datetime.utcfromtimestamp(created_at) if created_at else datetime.utcnow(),
+    }
+
+
+async def upsert_checkout_session(db: AsyncSession, resource: dict, payload: bytes | None = None):
+    """
+    Insert or refresh the local row for `resource`; the caller commits.
+    Writes arrive out of order (a refresh or expire response fetched before
+    the payment webhook can be stored after it), so a paid row only takes
+    paid snapshots and an expired row never goes back to active.
+    """
+    values = session_columns(resource)
+    values["payload"] = payload if payload is not None else json.dumps({"data": resource}).encode()
+    values["updated_at"] = datetime.utcnow()
+    stmt = dialect_insert(db, CheckoutSessionRecord).values(**values)
+    await db.execute(stmt.on_conflict_do_update(
+        index_elements=[CheckoutSessionRecord.id],
+        set_={key: stmt.excluded[key] for key in values if key not in ("id", "created_at")},
+        where=or_(
+            CheckoutSessionRecord.status == "active",
+            CheckoutSessionRecord.status == stmt.excluded.status,
+            stmt.excluded.status == "paid",
+        ),
+    ))
@@ -0,0 +1,25 @@
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, Text, DateTime, Index
+from app.db.session import Base
+
+class InvoiceJob(Base):
+    """One invoice run over a billing period; its progress is updated while it runs."""
+    __tablename__ = "invoice_jobs"
+
+    id = Column(String, primary_key=True)  # uuid hex, also the output directory name
+    status = Column(String, nullable=False, default="pending")  # pending, running, done, failed
+    period_start = Column(DateTime, nullable=False)
+    period_end = Column(DateTime, nullable=False)
+    total = Column(Integer, nullable=False, default=0)  # invoices the run will produce
+    processed = Column(Integer, nullable=False, default=0)
+    csv_path = Column(String, nullable=True)
+    pdf_dir = Column(String, nullable=True)
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        # Job list, newest first
+        Index("ix_invoice_jobs_created_at", "created_at"),
+    )
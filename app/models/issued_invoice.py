@@ -0,0 +1,24 @@
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, DateTime, Index, UniqueConstraint
+from app.db.session import Base
+
+class IssuedInvoice(Base):
+    """
+    One invoice an invoice job has issued, so later runs skip what was billed
+    already: a paid checkout session once, a subscription once per renewal.
+    """
+    __tablename__ = "issued_invoices"
+
+    id = Column(Integer, primary_key=True)
+    source = Column(String, nullable=False)  # checkout_session or subscription
+    source_id = Column(String, nullable=False)
+    billed_at = Column(DateTime, nullable=False)  # session creation, or the subscription renewal billed
+    job_id = Column(String, nullable=False)
+    issued_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (
+        # Claimed by one job only; also the "already invoiced" lookup
+        UniqueConstraint("source", "source_id", "billed_at", name="uq_issued_invoices_source"),
+        # Released together if the job fails
+        Index("ix_issued_invoices_job_id", "job_id"),
+    )
@@ -0,0 +1,35 @@
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, Text, DateTime, LargeBinary, ForeignKey, Index, text
+from app.db.session import Base
+
+class PlanOutbox(Base):
+    """
+    A PayMongo call owed for a pricing plan, written in the same transaction
+    as the plan change and delivered by the plan outbox worker.
+    """
+    __tablename__ = "plan_outbox"
+
+    id = Column(Integer, primary_key=True)
+    plan_id = Column(Integer, ForeignKey("pricing_plans.id"), nullable=False, index=True)
+    operation = Column(String, nullable=False, default="create")
+    payload = Column(LargeBinary, nullable=False)  # request body, fixed when the row is written
+    status = Column(String, nullable=False, default="pending")  # pending, processing, done, dead
+    attempts = Column(Integer, nullable=False, default=0)
+    available_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    locked_until = Column(DateTime, nullable=True)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    processed_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        # Claim query: WHERE status IN (...) AND available_at <= now ORDER BY id
+        Index("ix_plan_outbox_status_available_at", "status", "available_at"),
+        # At most one undelivered row per plan: the reconciler cannot queue a plan twice
+        Index(
+            "uq_plan_outbox_open_plan_id",
+            "plan_id",
+            unique=True,
+            postgresql_where=text("status IN ('pending', 'processing')"),
+            sqlite_where=text("status IN ('pending', 'processing')"),
+        ),
+    )
@@ -1,14 +1,45 @@
 from sqlalchemy import Column, Integer, String, Float, Boolean
 from app.db.session import Base
+from app.models.subscription import cycle_months
 
 class PricingPlan(Base):
     __tablename__ = "pricing_plans"
 
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     name = Column(String, unique=True, index=True)
     price = Column(Float, nullable=False)
     description = Column(String, nullable=True)
     is_active = Column(Boolean, default=True)
     max_users = Column(Integer, nullable=False, default=1)
     billing_cycle = Column(String, nullable=False)
-    
\ No newline at end of file
+    # Set by the plan outbox worker once PayMongo has the plan
+    paymongo_plan_id = Column(String, unique=True, nullable=True)
+    sync_status = Column(String, nullable=False, default="pending")  # pending, synced, failed
+
+
+def paymongo_plan_payload(plan: PricingPlan) -> dict:
+    """The PayMongo plan create body for a local plan."""
+    months = cycle_months(plan.billing_cycle)
+    interval, interval_count = ("yearly", months // 12) if months % 12 == 0 else ("monthly", months)
+    return {"data": {"attributes": {
+        "name": plan.name,
+        "description": plan.description or plan.name,
+        "amount": round(plan.price * 100),  # centavos
+        "currency": "PHP",
+        "interval": interval,
+        "interval_count": interval_count,
+    }}}
+
+
+def plan_values_from_paymongo(resource: dict) -> dict:
+    """pricing_plans column values for a PayMongo plan resource; the inverse of paymongo_plan_payload."""
+    attributes = resource.get("attributes") or {}
+    months = max(1, int(attributes.get("interval_count") or 1)) * (12 if attributes.get("interval") == "yearly" else 1)
+    return {
+        "paymongo_plan_id": resource["id"],
+        "name": attributes.get("name") or resource["id"],
+        "description": attributes.get("description"),
+        "price": (attributes.get("amount") or 0) / 100,
+        "billing_cycle": str(months),
+        "sync_status": "synced",
+    }
@@ -0,0 +1,10 @@
+from datetime import datetime
+from sqlalchemy import Column, String, DateTime
+from app.db.session import Base
+
+class ProcessedEvent(Base):
+    """PayMongo event ids whose side effects have been applied; pruned after the retention window."""
+    __tablename__ = "processed_events"
+
+    event_id = Column(String, primary_key=True)
+    processed_at = Column(DateTime, nullable=False, default=datetime.utcnow, index=True)
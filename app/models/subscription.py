@@ -0,0 +1,66 @@
+import calendar
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index
+from sqlalchemy.orm import relationship
+from app.db.session import Base
+
+class Subscription(Base):
+    """A user's subscription to a pricing plan; usage is metered against it."""
+    __tablename__ = "subscriptions"
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    plan_id = Column(Integer, ForeignKey("pricing_plans.id"), nullable=False)
+    status = Column(String, nullable=False, default="active")  # active, canceled
+    current_period_start = Column(DateTime, nullable=False)
+    current_period_end = Column(DateTime, nullable=False)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    canceled_at = Column(DateTime, nullable=True)
+
+    user = relationship("User", lazy="raise")
+    plan = relationship("PricingPlan", lazy="raise")
+
+    __table_args__ = (
+        # A user's subscriptions, optionally only the active ones
+        Index("ix_subscriptions_user_id_status", "user_id", "status"),
+        # Subscribers of a plan, and the plan join in invoice runs
+        Index("ix_subscriptions_plan_id", "plan_id"),
+    )
+
+
+# Named billing cycles; a numeric billing_cycle is a number of months
+CYCLE_MONTHS = {"monthly": 1, "quarterly": 3, "yearly": 12, "annual": 12}
+
+
+def cycle_months(billing_cycle) -> int:
+    value = str(billing_cycle).strip().lower()
+    if value.isdigit():
+        return max(1, int(value))
+    return CYCLE_MONTHS.get(value, 1)
+
+
+def add_months(moment: datetime, months: int) -> datetime:
+    """Same day `months` later, clamped to the end of shorter months."""
+    month = moment.month - 1 + months
+    year, month = moment.year + month // 12, month % 12 + 1
+    return moment.replace(year=year, month=month, day=min(moment.day, calendar.monthrange(year, month)[1]))
+
+
+def billing_cycles(
+    created_at: datetime, months: int, canceled_at: datetime | None, start: datetime, end: datetime
+) -> list[tuple[datetime, datetime]]:
+    """
+    The (billed at, cycle end) of each cycle a subscription is billed for in
+    [start, end): one at creation, then every `months` after it, counted from
+    creation so short months do not drift the day, until it is canceled.
+    """
+    elapsed = (start.year - created_at.year) * 12 + start.month - created_at.month
+    cycle = max(0, elapsed // months - 1)  # a cycle that renews before start
+    cycles = []
+    billed = add_months(created_at, cycle * months)
+    while billed < end and (canceled_at is None or billed < canceled_at):
+        cycle_end = add_months(created_at, (cycle + 1) * months)
+        if billed >= start:
+            cycles.append((billed, cycle_end))
+        billed, cycle = cycle_end, cycle + 1
+    return cycles
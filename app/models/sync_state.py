@@ -0,0 +1,11 @@
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, DateTime
+from app.db.session import Base
+
+class SyncState(Base):
+    """Progress of an incremental sync from PayMongo, one row per synced collection."""
+    __tablename__ = "sync_state"
+
+    name = Column(String, primary_key=True)
+    high_water = Column(Integer, nullable=True)  # largest upstream updated_at applied, unix seconds
+    last_run_at = Column(DateTime, nullable=True, default=datetime.utcnow)
@@ -0,0 +1,39 @@
+from datetime import datetime
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, ForeignKey, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.session import Base
+
+class UsageRollup(Base):
+    """
+    Usage totals per subscription, metric and time bucket. Raw usage events
+    are never stored: they are summed in memory and added to these rows.
+    """
+    __tablename__ = "usage_rollups"
+
+    # The primary key doubles as the index for per-subscription range and limit queries
+    subscription_id = Column(Integer, ForeignKey("subscriptions.id"), primary_key=True)
+    metric = Column(String, primary_key=True)
+    bucket_start = Column(DateTime, primary_key=True)
+    quantity = Column(BigInteger, nullable=False, default=0)
+    events = Column(Integer, nullable=False, default=0)  # usage events summed into this row
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+
+async def usage_totals(db: AsyncSession, subscription_id: int, metrics) -> dict[str, int]:
+    """Flushed all-time totals for `metrics`, summed from the rollup rows rather than raw events."""
+    rows = (await db.execute(
+        select(UsageRollup.metric, func.sum(UsageRollup.quantity))
+        .where(UsageRollup.subscription_id == subscription_id, UsageRollup.metric.in_(list(metrics)))
+        .group_by(UsageRollup.metric)
+    )).all()
+    return {metric: 0 for metric in metrics} | {metric: int(total) for metric, total in rows}
+
+
+async def usage_totals_by_subscription(db: AsyncSession, subscription_ids, metrics) -> dict[tuple[int, str], int]:
+    """Flushed all-time totals keyed by (subscription_id, metric), for several subscriptions in one query."""
+    rows = (await db.execute(
+        select(UsageRollup.subscription_id, UsageRollup.metric, func.sum(UsageRollup.quantity))
+        .where(UsageRollup.subscription_id.in_(list(subscription_ids)), UsageRollup.metric.in_(list(metrics)))
+        .group_by(UsageRollup.subscription_id, UsageRollup.metric)
+    )).all()
+    return {(subscription_id, metric): int(total) for subscription_id, metric, total in rows}
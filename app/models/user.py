@@ -4,7 +4,7 @@ from app.db.session import Base
 class User(Base):
     __tablename__= "users"
 
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     email = Column(String, unique=True, index=True)
     password = Column(String, nullable=False)
     is_active = Column(Boolean, default=True)
\ No newline at end of file
@@ -0,0 +1,29 @@
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, Text, DateTime, LargeBinary, Index
+from app.db.session import Base
+
+class WebhookEvent(Base):
+    """Inbox row for a received PayMongo event; processed asynchronously by the webhook worker."""
+    __tablename__ = "webhook_events"
+
+    id = Column(Integer, primary_key=True)
+    event_id = Column(String, index=True, nullable=True)  # PayMongo evt_... id
+    event_type = Column(String, nullable=False)
+    payload = Column(LargeBinary, nullable=False)  # raw request body as received
+    amount = Column(Integer, nullable=True)  # resource amount in centavos, when the event has one
+    status = Column(String, nullable=False, default="pending")  # pending, processing, done, dead
+    attempts = Column(Integer, nullable=False, default=0)
+    available_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    locked_until = Column(DateTime, nullable=True)
+    last_error = Column(Text, nullable=True)
+    received_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    processed_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        # Claim query: WHERE status IN (...) AND available_at <= now ORDER BY id
+        Index("ix_webhook_events_status_available_at", "status", "available_at"),
+        # Covers per-type / per-day counts and amount sums without reading payloads
+        Index("ix_webhook_events_type_received_at_amount", "event_type", "received_at", "amount"),
+        # Listing one type newest first: WHERE event_type = ? ORDER BY id DESC
+        Index("ix_webhook_events_type_id", "event_type", "id"),
+    )
@@ -1,5 +1,7 @@
+from datetime import datetime
 from pydantic import BaseModel
 from typing import Optional
+from app.schemas.paymongo import PayMongoResource
 
 class CheckoutSession(BaseModel):
     amount: float
@@ -9,4 +11,26 @@ class CheckoutSession(BaseModel):
 
     class Config:
         from_attributes = True
-        
\ No newline at end of file
+
+class CheckoutSessionOut(BaseModel):
+    id: str
+    reference_number: Optional[str] = None
+    status: str
+    amount: int
+    currency: str
+    description: Optional[str] = None
+    checkout_url: Optional[str] = None
+    payment_intent_id: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
+
+    class Config:
+        from_attributes = True
+
+class CheckoutSessionPage(BaseModel):
+    data: list[CheckoutSessionOut]
+    next_cursor: Optional[str] = None
+
+class CheckoutSessionResult(BaseModel):
+    message: str
+    response: PayMongoResource
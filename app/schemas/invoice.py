@@ -0,0 +1,23 @@
+from datetime import date, datetime
+from pydantic import BaseModel
+from typing import Optional
+
+class InvoiceJobCreate(BaseModel):
+    # Defaults to the previous calendar month; period_end is exclusive
+    period_start: Optional[date] = None
+    period_end: Optional[date] = None
+
+class InvoiceJobOut(BaseModel):
+    id: str
+    status: str
+    period_start: datetime
+    period_end: datetime
+    total: int
+    processed: int
+    error: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
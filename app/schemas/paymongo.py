@@ -0,0 +1,11 @@
+from pydantic import BaseModel
+from typing import Any
+
+# PayMongo's response envelopes. Proxied bodies are passed through as bytes,
+# so these only document the routes.
+
+class PayMongoResource(BaseModel):
+    data: dict[str, Any]
+
+class PayMongoList(BaseModel):
+    data: list[dict[str, Any]]
@@ -1,4 +1,5 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, field_validator
+from app.models.subscription import cycle_months
 
 class PricingPlan(BaseModel):
     name: str
@@ -15,7 +16,15 @@ class PricingPlanCreate(PricingPlan):
 class PricingPlanOut(PricingPlan):
     id: int
     is_active: bool
-    
+    paymongo_plan_id: str | None = None
+    sync_status: str = "pending"
+
+    # The column is a string, and rows from before billing_cycle held months still say "monthly" or "yearly"
+    @field_validator("billing_cycle", mode="before")
+    @classmethod
+    def billing_cycle_months(cls, value) -> int:
+        return cycle_months(value)
+
     class Config:
         from_attributes = True
     
\ No newline at end of file
@@ -0,0 +1,30 @@
+from datetime import datetime
+from pydantic import BaseModel
+from typing import Optional
+
+class SubscriptionCreate(BaseModel):
+    plan_id: int
+
+class SubscriptionOut(BaseModel):
+    id: int
+    user_id: int
+    plan_id: int
+    status: str
+    current_period_start: datetime
+    current_period_end: datetime
+    created_at: datetime
+    canceled_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+class UsageLimit(BaseModel):
+    metric: str
+    used: int
+    limit: int
+    exceeded: bool
+
+class SubscriptionLimits(BaseModel):
+    subscription_id: int
+    plan_id: int
+    limits: list[UsageLimit]
@@ -0,0 +1,25 @@
+from datetime import datetime
+from pydantic import BaseModel, Field
+from typing import Optional
+
+class UsageEvent(BaseModel):
+    subscription_id: int
+    metric: str = Field(min_length=1, max_length=64)
+    quantity: int = 1
+    timestamp: Optional[datetime] = None  # when the usage happened; naive values are UTC, defaults to now
+
+class UsageAccepted(BaseModel):
+    accepted: int
+
+class UsageRow(BaseModel):
+    metric: str
+    bucket_start: datetime
+    quantity: int
+    events: int
+
+    class Config:
+        from_attributes = True
+
+class UsageReport(BaseModel):
+    subscription_id: int
+    data: list[UsageRow]
@@ -14,4 +14,13 @@ class UserOut(UserBase):
     is_active: bool
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class Token(BaseModel):
+    access_token: str
+    token_type: str
+
+class RegisterOut(BaseModel):
+    message: str
+    user: UserOut
+    token: str
@@ -1,3 +1,4 @@
+from datetime import date
 from pydantic import BaseModel
 from typing import Optional, List  # Needed for Python <3.9
 
@@ -16,4 +17,18 @@ class WebhookCreate(WebhookEvent):
                 "events": ["payment.created", "payment.failed"]
             }
         }
-    }
\ No newline at end of file
+    }
+
+class StatusMessage(BaseModel):
+    status: str
+    message: str
+
+class EventAggregateRow(BaseModel):
+    event_type: Optional[str] = None
+    day: Optional[date] = None
+    count: int
+    amount: int
+
+class EventAggregate(BaseModel):
+    group_by: str
+    data: List[EventAggregateRow]
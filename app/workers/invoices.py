@@ -0,0 +1,279 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from sqlalchemy import delete, func, or_, select, update
+from app.core.config import settings
+from app.core.invoices import CSV_COLUMNS, render_chunk
+from app.core.metrics import registry
+from app.db.dialect import dialect_insert
+from app.db.session import AsyncSessionLocal
+from app.models.checkout_session import CheckoutSessionRecord
+from app.models.invoice_job import InvoiceJob
+from app.models.issued_invoice import IssuedInvoice
+from app.models.pricing_plan import PricingPlan
+from app.models.subscription import Subscription, billing_cycles, cycle_months
+from app.models.user import User
+
+logger = logging.getLogger(__name__)
+
+
+def source_queries(period_start: datetime, period_end: datetime) -> list[tuple[str, object]]:
+    """
+    What may be invoiced for a period, as (source, query): paid checkout
+    sessions not invoiced yet, and the subscriptions live at some point in
+    it, which billable_rows() turns into one row per cycle billed.
+    """
+    invoiced = select(IssuedInvoice.id).where(
+        IssuedInvoice.source == "checkout_session",
+        IssuedInvoice.source_id == CheckoutSessionRecord.id,
+    )
+    sessions = (
+        select(
+            CheckoutSessionRecord.id,
+            CheckoutSessionRecord.reference_number,
+            CheckoutSessionRecord.description,
+            CheckoutSessionRecord.amount,
+            CheckoutSessionRecord.currency,
+            CheckoutSessionRecord.created_at,
+        )
+        .where(
+            CheckoutSessionRecord.status == "paid",
+            CheckoutSessionRecord.created_at >= period_start,
+            CheckoutSessionRecord.created_at < period_end,
+            ~invoiced.exists(),
+        )
+        .order_by(CheckoutSessionRecord.created_at, CheckoutSessionRecord.id)
+    )
+    # Subscriptions that were live at any point in the period
+    subscriptions = (
+        select(
+            Subscription.id, User.email, PricingPlan.name, PricingPlan.price,
+            PricingPlan.billing_cycle, Subscription.created_at, Subscription.canceled_at,
+        )
+        .join(User, User.id == Subscription.user_id)
+        .join(PricingPlan, PricingPlan.id == Subscription.plan_id)
+        .where(
+            Subscription.created_at < period_end,
+            or_(Subscription.canceled_at.is_(None), Subscription.canceled_at >= period_start),
+        )
+        .order_by(Subscription.id)
+    )
+    return [("checkout_session", sessions), ("subscription", subscriptions)]
+
+
+def billable_rows(source: str, rows, period_start: datetime, period_end: datetime) -> list[tuple]:
+    """Source query rows in the layouts app.core.invoices expects; a subscription gets one per cycle billed in the period."""
+    if source != "subscription":
+        return [tuple(row) for row in rows]
+    billable = []
+    for subscription_id, email, plan_name, price, billing_cycle, created_at, canceled_at in rows:
+        cycles = billing_cycles(created_at, cycle_months(billing_cycle), canceled_at, period_start, period_end)
+        billable += [(subscription_id, email, plan_name, price, billed_at, cycle_end) for billed_at, cycle_end in cycles]
+    return billable
+
+
+def invoice_key(source: str, row: tuple) -> tuple[str, datetime]:
+    """(source_id, billed_at) of a billable row, as recorded in issued_invoices."""
+    return str(row[0]), row[5] if source == "checkout_session" else row[4]
+
+
+class InvoiceGenerator:
+    """
+    Runs invoice jobs in the background. Source rows are streamed from the
+    database with yield_per, so one chunk at a time is held in memory. Each
+    chunk is first claimed in issued_invoices, which drops whatever another
+    job has invoiced already, then rendered to CSV lines and PDF files in a
+    process pool, with at most two chunks per process in flight, and the
+    CSV lines are appended to the job's export in source order. A job that
+    fails releases its claims, so a re-run picks them up. Progress is
+    written to the job row every progress_interval seconds.
+    """
+
+    def __init__(
+        self,
+        output_dir: str = "./invoices",
+        workers: int | None = None,
+        chunk_size: int = 1000,
+        pdf_enabled: bool = True,
+        progress_interval: float = 1.0,
+    ):
+        self.output_dir = output_dir
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self.pdf_enabled = pdf_enabled
+        self.progress_interval = progress_interval
+        self._executor: ProcessPoolExecutor | None = None
+        self._jobs: dict[str, asyncio.Task] = {}
+
+    @classmethod
+    def from_settings(cls, settings) -> "InvoiceGenerator":
+        return cls(
+            output_dir=settings.INVOICE_OUTPUT_DIR,
+            workers=settings.INVOICE_RENDER_WORKERS,
+            chunk_size=settings.INVOICE_CHUNK_SIZE,
+            pdf_enabled=settings.INVOICE_PDF_ENABLED,
+            progress_interval=settings.INVOICE_PROGRESS_INTERVAL,
+        )
+
+    def start(self):
+        if self._executor is None:
+            # spawn rather than fork: forking a process with a running event loop and open connections is unsafe
+            self._executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+
+    async def shutdown(self):
+        """Stop running jobs, which are marked failed, and the render processes."""
+        for task in list(self._jobs.values()):
+            task.cancel()
+        if self._jobs:
+            await asyncio.wait(list(self._jobs.values()))
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    async def submit(self, period_start: datetime, period_end: datetime) -> InvoiceJob:
+        job = InvoiceJob(id=uuid.uuid4().hex, status="pending", period_start=period_start, period_end=period_end)
+        async with AsyncSessionLocal() as db:
+            db.add(job)
+            await db.commit()
+        task = asyncio.create_task(self._run_in_background(job.id, period_start, period_end))
+        self._jobs[job.id] = task
+        task.add_done_callback(lambda _: self._jobs.pop(job.id, None))
+        return job
+
+    async def _run_in_background(self, job_id: str, period_start: datetime, period_end: datetime):
+        try:
+            await self.run(job_id, period_start, period_end)
+        except Exception:
+            pass  # logged and recorded on the job row by run()
+
+    async def _update(self, job_id: str, **values):
+        async with AsyncSessionLocal() as db:
+            await db.execute(update(InvoiceJob).where(InvoiceJob.id == job_id).values(**values))
+            await db.commit()
+
+    async def count(self, db, queries, period_start: datetime, period_end: datetime) -> int:
+        """Invoices a run over the period will produce, barring concurrent runs."""
+        total = 0
+        for source, query in queries:
+            if source != "subscription":
+                total += await db.scalar(select(func.count()).select_from(query.order_by(None).subquery()))
+                continue
+            # Cycles are counted in Python, as billable_rows() works them out; claimed ones are subtracted
+            result = await db.stream(query.execution_options(yield_per=self.chunk_size))
+            async for partition in result.partitions():
+                total += len(billable_rows(source, partition, period_start, period_end))
+            total -= await db.scalar(select(func.count()).where(
+                IssuedInvoice.source == source,
+                IssuedInvoice.billed_at >= period_start,
+                IssuedInvoice.billed_at < period_end,
+            ))
+        return max(total, 0)
+
+    async def claim(self, job_id: str, source: str, rows: list[tuple], issued_at: datetime) -> list[tuple]:
+        """Record rows as issued by this job; returns, in order, those no other job has issued."""
+        if not rows:
+            return rows
+        async with AsyncSessionLocal() as db:
+            stmt = dialect_insert(db, IssuedInvoice).values([
+                {"source": source, "source_id": source_id, "billed_at": billed_at, "job_id": job_id, "issued_at": issued_at}
+                for source_id, billed_at in (invoice_key(source, row) for row in rows)
+            ])
+            stmt = stmt.on_conflict_do_nothing(
+                index_elements=[IssuedInvoice.source, IssuedInvoice.source_id, IssuedInvoice.billed_at]
+            ).returning(IssuedInvoice.source_id, IssuedInvoice.billed_at)
+            claimed = set((await db.execute(stmt)).all())
+            await db.commit()
+        return [row for row in rows if invoice_key(source, row) in claimed]
+
+    async def release(self, job_id: str):
+        async with AsyncSessionLocal() as db:
+            await db.execute(delete(IssuedInvoice).where(IssuedInvoice.job_id == job_id))
+            await db.commit()
+
+    async def run(self, job_id: str, period_start: datetime, period_end: datetime) -> int:
+        """Produce the job's CSV export and PDFs; returns the number of invoices."""
+        self.start()
+        job_dir = os.path.join(self.output_dir, job_id)
+        csv_path = os.path.join(job_dir, "invoices.csv")
+        pdf_dir = os.path.join(job_dir, "pdf") if self.pdf_enabled else None
+        issued_at = datetime.utcnow()
+        loop = asyncio.get_running_loop()
+        in_flight: deque[tuple[str, int, asyncio.Future]] = deque()
+        processed = 0
+        try:
+            os.makedirs(job_dir, exist_ok=True)
+            queries = source_queries(period_start, period_end)
+            async with AsyncSessionLocal() as db:
+                total = await self.count(db, queries, period_start, period_end)
+            await self._update(
+                job_id, status="running", started_at=issued_at, total=total, csv_path=csv_path, pdf_dir=pdf_dir
+            )
+            reported = time.monotonic()
+            with open(csv_path, "wb") as export:
+                export.write((",".join(CSV_COLUMNS) + "\r\n").encode())
+
+                async def write_oldest():
+                    # Futures are awaited in submission order, so the export keeps the source order
+                    nonlocal processed
+                    source, count, future = in_flight.popleft()
+                    export.write(await future)
+                    processed += count
+                    invoices_rendered.inc(source, amount=count)
+
+                async with AsyncSessionLocal() as db:
+                    for source, query in queries:
+                        result = await db.stream(query.execution_options(yield_per=self.chunk_size))
+                        async for partition in result.partitions():
+                            rows = billable_rows(source, partition, period_start, period_end)
+                            rows = await self.claim(job_id, source, rows, issued_at)
+                            if not rows:
+                                continue
+                            in_flight.append((source, len(rows), loop.run_in_executor(
+                                self._executor, render_chunk, source, rows, issued_at, pdf_dir
+                            )))
+                            while len(in_flight) >= self.workers * 2:
+                                await write_oldest()
+                            if time.monotonic() - reported >= self.progress_interval:
+                                await self._update(job_id, processed=processed)
+                                reported = time.monotonic()
+                while in_flight:
+                    await write_oldest()
+            await self._update(job_id, status="done", processed=processed, finished_at=datetime.utcnow())
+            logger.info("Invoice job finished", extra={"job_id": job_id, "invoices": processed})
+            return processed
+        except BaseException as e:
+            for _, _, future in in_flight:
+                future.cancel()
+            if isinstance(e, asyncio.CancelledError):
+                error = "Interrupted by shutdown"
+                logger.warning("Invoice job interrupted", extra={"job_id": job_id, "processed": processed})
+            else:
+                error = f"{type(e).__name__}: {e}"
+                logger.exception("Invoice job failed", extra={"job_id": job_id, "processed": processed})
+                if isinstance(e, BrokenProcessPool) and self._executor is not None:
+                    # A render process died; the next job gets a fresh pool
+                    self._executor.shutdown(wait=False, cancel_futures=True)
+                    self._executor = None
+            try:
+                await self._update(job_id, status="failed", processed=processed, error=error, finished_at=datetime.utcnow())
+                await self.release(job_id)
+            except Exception:
+                logger.exception("Recording invoice job failure failed", extra={"job_id": job_id})
+            raise
+
+
+invoice_generator = InvoiceGenerator.from_settings(settings)
+
+invoices_rendered = registry.counter("invoices_rendered_total", "Invoices rendered by invoice jobs.", ("source",))
+registry.gauge(
+    "invoice_jobs_running",
+    "Invoice jobs running in this process.",
+    callback=lambda: {(): len(invoice_generator._jobs)},
+)
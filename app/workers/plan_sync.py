@@ -0,0 +1,214 @@
+import asyncio
+import logging
+import time
+from datetime import datetime
+from sqlalchemy import bindparam, or_, select, update
+from app.core.config import settings
+from app.core.metrics import registry
+from app.core.paymongo import PayMongoClient, error_detail, paymongo_client
+from app.db.dialect import dialect_insert
+from app.db.session import AsyncSessionLocal
+from app.models.pricing_plan import PricingPlan, plan_values_from_paymongo
+from app.models.sync_state import SyncState
+from app.workers.plans import BASE_URL
+
+logger = logging.getLogger(__name__)
+
+SYNC_NAME = "paymongo_plans"
+
+
+class PlanCatalogSync:
+    """
+    Pulls PayMongo's plan catalog into pricing_plans.
+
+    Each run asks PayMongo only for plans updated since the high-water mark
+    stored in sync_state (the largest updated_at applied by the last
+    complete run); plans at or below the mark are skipped as well, should
+    the filter be ignored. Pages are cursor-linked, so they are fetched in
+    order, but the next page is requested while the current one is written.
+    Each page is applied with a single upsert keyed on paymongo_plan_id,
+    which only touches rows whose values differ. A local plan with the same
+    name that is not linked yet is linked first; one linked to another
+    PayMongo plan is left alone and logged. The mark only advances once
+    every page is written, so a failed run is repeated in full next time.
+
+    PayMongo is the source of truth here: name, description, price and
+    billing cycle of linked plans follow it. Local-only plans are never
+    touched; the plan outbox worker creates them upstream.
+    """
+
+    def __init__(self, client: PayMongoClient, interval: float | None = 300.0, page_size: int = 100):
+        self.client = client
+        self.interval = interval
+        self.page_size = page_size
+        self._lock = asyncio.Lock()
+        self._task: asyncio.Task | None = None
+
+    @classmethod
+    def from_settings(cls, settings, client: PayMongoClient) -> "PlanCatalogSync":
+        return cls(client, interval=settings.PLAN_SYNC_INTERVAL, page_size=settings.PLAN_SYNC_PAGE_SIZE)
+
+    def start(self):
+        if self._task is None and self.interval:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                await self.run()
+            except Exception:
+                logger.exception("Plan catalog sync failed")
+            await asyncio.sleep(self.interval)
+
+    async def fetch_page(self, since: int | None, after: str | None) -> dict:
+        params = {"limit": self.page_size}
+        if since is not None:
+            params["updated_at[gte]"] = since
+        if after is not None:
+            params["after"] = after
+        response = await self.client.get(BASE_URL, params=params, endpoint="plans.list")
+        if response.status_code != 200:
+            raise RuntimeError(f"Listing PayMongo plans failed ({response.status_code}): {error_detail(response)}")
+        return response.json()
+
+    async def run(self, full: bool = False) -> dict[str, int]:
+        """Fetch and apply the plans changed since the last run (every plan if `full`); returns counts."""
+        async with self._lock:
+            start = time.perf_counter()
+            try:
+                counts = await self._sync(full)
+            except Exception:
+                plan_sync_runs.inc("failed")
+                raise
+            finally:
+                plan_sync_duration.observe(time.perf_counter() - start)
+            plan_sync_runs.inc("ok")
+            for outcome, count in counts.items():
+                if count and outcome != "fetched":
+                    plan_sync_rows.inc(outcome, amount=count)
+            logger.info(
+                "Plan catalog sync finished",
+                extra={**counts, "full": full, "duration_s": round(time.perf_counter() - start, 3)},
+            )
+            return counts
+
+    async def _sync(self, full: bool) -> dict[str, int]:
+        async with AsyncSessionLocal() as db:
+            state = await db.get(SyncState, SYNC_NAME)
+        since = None if full or state is None else state.high_water
+        high_water = since
+        counts = {"fetched": 0, "changed": 0, "unchanged": 0, "linked": 0, "conflict": 0}
+        changed_ids: list[int] = []
+        pending = asyncio.create_task(self.fetch_page(since, None))
+        try:
+            while pending is not None:
+                body = await pending
+                page = body.get("data") or []
+                # Ask for the next page before writing this one, so the two overlap
+                pending = (
+                    asyncio.create_task(self.fetch_page(since, page[-1]["id"]))
+                    if body.get("has_more") and page else None
+                )
+                counts["fetched"] += len(page)
+                page = [
+                    resource for resource in page
+                    if since is None or ((resource.get("attributes") or {}).get("updated_at") or since) >= since
+                ]
+                for resource in page:
+                    updated_at = (resource.get("attributes") or {}).get("updated_at")
+                    if isinstance(updated_at, int) and (high_water is None or updated_at > high_water):
+                        high_water = updated_at
+                if page:
+                    changed_ids += await self.apply_page(page, counts)
+        finally:
+            if pending is not None:
+                pending.cancel()
+
+        async with AsyncSessionLocal() as db:
+            stmt = dialect_insert(db, SyncState).values(name=SYNC_NAME, high_water=high_water, last_run_at=datetime.utcnow())
+            await db.execute(stmt.on_conflict_do_update(
+                index_elements=[SyncState.name],
+                set_={"high_water": stmt.excluded.high_water, "last_run_at": stmt.excluded.last_run_at},
+            ))
+            await db.commit()
+        if changed_ids:
+            # Imported here: the plans router imports the plan workers
+            from app.api.v1.plans import invalidate_plan_cache
+            await invalidate_plan_cache(*changed_ids)
+        return counts
+
+    async def apply_page(self, page: list[dict], counts: dict[str, int]) -> list[int]:
+        """Upsert one page of PayMongo plans; returns the ids of local plans it changed."""
+        rows: dict[str, dict] = {}  # by name, which is unique in pricing_plans
+        for resource in page:
+            values = plan_values_from_paymongo(resource)
+            if values["name"] in rows:
+                counts["conflict"] += 1  # two PayMongo plans with one name
+                continue
+            rows[values["name"]] = values
+        async with AsyncSessionLocal() as db:
+            local = (await db.execute(
+                select(PricingPlan.id, PricingPlan.name, PricingPlan.paymongo_plan_id)
+                .where(or_(
+                    PricingPlan.name.in_(list(rows)),
+                    PricingPlan.paymongo_plan_id.in_([row["paymongo_plan_id"] for row in rows.values()]),
+                ))
+            )).all()
+            linked_names = {plan.paymongo_plan_id: plan.name for plan in local if plan.paymongo_plan_id}
+            links = []
+            for plan in local:
+                row = rows.get(plan.name)
+                if row is None or plan.paymongo_plan_id == row["paymongo_plan_id"]:
+                    continue
+                if plan.paymongo_plan_id is None and row["paymongo_plan_id"] not in linked_names:
+                    # Created upstream before its creation was recorded here
+                    links.append({"link_id": plan.id, "link_paymongo_id": row["paymongo_plan_id"]})
+                    continue
+                logger.warning(
+                    "PayMongo plan name is taken by another local plan, skipping it",
+                    extra={"plan_id": plan.id, "paymongo_plan_id": row["paymongo_plan_id"], "plan_name": plan.name},
+                )
+                del rows[plan.name]
+                counts["conflict"] += 1
+            if links:
+                table = PricingPlan.__table__
+                await db.execute(
+                    update(table)
+                    .where(table.c.id == bindparam("link_id"))
+                    .values(paymongo_plan_id=bindparam("link_paymongo_id")),
+                    links,
+                )
+                counts["linked"] += len(links)
+            changed: list[int] = []
+            if rows:
+                stmt = dialect_insert(db, PricingPlan).values(list(rows.values()))
+                fields = ("name", "description", "price", "billing_cycle", "sync_status")
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=[PricingPlan.paymongo_plan_id],
+                    set_={field: stmt.excluded[field] for field in fields},
+                    # Rows PayMongo has not changed are left as they are, and not returned
+                    where=or_(*(getattr(PricingPlan, field).is_distinct_from(stmt.excluded[field]) for field in fields)),
+                ).returning(PricingPlan.id)
+                changed = list((await db.execute(stmt)).scalars())
+            await db.commit()
+        counts["changed"] += len(changed)
+        counts["unchanged"] += len(rows) - len(changed)
+        return changed + [link["link_id"] for link in links]
+
+
+plan_catalog_sync = PlanCatalogSync.from_settings(settings, paymongo_client)
+
+plan_sync_runs = registry.counter("plan_sync_runs_total", "Plan catalog sync runs by outcome.", ("outcome",))
+plan_sync_rows = registry.counter(
+    "plan_sync_rows_total", "PayMongo plans applied by the catalog sync, by outcome.", ("outcome",)
+)
+plan_sync_duration = registry.histogram("plan_sync_duration_seconds", "Time to run one plan catalog sync.")
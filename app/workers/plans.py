@@ -0,0 +1,371 @@
+import asyncio
+import logging
+import random
+import time
+from datetime import datetime, timedelta
+import orjson
+from sqlalchemy import func, or_, select, update
+from app.core.config import settings
+from app.core.metrics import registry
+from app.core.paymongo import PayMongoClient, error_detail, paymongo_client
+from app.db.session import AsyncSessionLocal
+from app.models.plan_outbox import PlanOutbox
+from app.models.pricing_plan import PricingPlan, paymongo_plan_payload
+
+logger = logging.getLogger(__name__)
+
+BASE_URL = "/subscriptions/plans"
+
+
+class PermanentError(Exception):
+    """PayMongo rejected the request itself; retrying it will not help."""
+
+
+class PlanOutboxWorker:
+    """
+    Delivers plan_outbox rows to PayMongo.
+
+    Rows are claimed in batches with a lease, as the webhook worker claims
+    events. The PayMongo calls for a batch run concurrently with no database
+    session open, and their outcomes are recorded together in one
+    transaction. Each call carries an Idempotency-Key derived from the row
+    id, so a row delivered again after a crash or a lost response does not
+    create a second plan. Failures are retried with jittered exponential
+    backoff; 4xx answers and rows past max_attempts are moved to "dead" and
+    their plan marked failed.
+
+    Every reconcile_interval seconds the worker also pages through
+    PayMongo's plan list and repairs drift: unlinked plans that exist
+    upstream are linked, and plans that are missing upstream are queued
+    again. A plan may be linked after the list was read, so a linked plan
+    missing from it is looked up on its own before it is queued.
+    """
+
+    def __init__(
+        self,
+        client: PayMongoClient,
+        concurrency: int = 4,
+        batch_size: int = 20,
+        poll_interval: float = 5.0,
+        lease_seconds: float = 60.0,
+        max_attempts: int = 8,
+        retry_base_delay: float = 2.0,
+        retry_max_delay: float = 600.0,
+        reconcile_interval: float | None = 900.0,
+        page_size: int = 100,
+    ):
+        self.client = client
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.lease = timedelta(seconds=lease_seconds)
+        self.max_attempts = max_attempts
+        self.retry_base_delay = retry_base_delay
+        self.retry_max_delay = retry_max_delay
+        self.reconcile_interval = reconcile_interval
+        self.page_size = page_size
+        self._wakeup: asyncio.Event | None = None
+        self._tasks: list[asyncio.Task] = []
+
+    @classmethod
+    def from_settings(cls, settings, client: PayMongoClient) -> "PlanOutboxWorker":
+        return cls(
+            client,
+            concurrency=settings.PLAN_OUTBOX_CONCURRENCY,
+            batch_size=settings.PLAN_OUTBOX_BATCH_SIZE,
+            poll_interval=settings.PLAN_OUTBOX_POLL_INTERVAL,
+            lease_seconds=settings.PLAN_OUTBOX_LEASE_SECONDS,
+            max_attempts=settings.PLAN_OUTBOX_MAX_ATTEMPTS,
+            retry_base_delay=settings.PLAN_OUTBOX_RETRY_BASE_DELAY,
+            retry_max_delay=settings.PLAN_OUTBOX_RETRY_MAX_DELAY,
+            reconcile_interval=settings.PLAN_RECONCILE_INTERVAL,
+            page_size=settings.PLAN_RECONCILE_PAGE_SIZE,
+        )
+
+    def start(self):
+        if not self._tasks:
+            self._wakeup = asyncio.Event()
+            self._tasks.append(asyncio.create_task(self._run()))
+            if self.reconcile_interval:
+                self._tasks.append(asyncio.create_task(self._reconcile_periodically()))
+
+    async def stop(self):
+        # A batch cut short is delivered again once its lease expires
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._tasks = []
+
+    def notify(self):
+        """Wake the worker right away instead of waiting for the next poll interval."""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _run(self):
+        while True:
+            delivered = 0
+            try:
+                delivered = await self.run_once()
+            except Exception:
+                logger.exception("Delivering plan outbox rows failed")
+            # A full batch means more rows are probably due
+            if delivered == self.batch_size:
+                continue
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def run_once(self) -> int:
+        """Claim, deliver and record one batch; returns the number of rows claimed."""
+        claimed = await self.claim(self.batch_size)
+        if claimed:
+            slots = asyncio.Semaphore(self.concurrency)
+
+            async def deliver(row_id: int, payload: bytes) -> str | BaseException:
+                async with slots:
+                    try:
+                        return await self.deliver(row_id, payload)
+                    except Exception as e:
+                        return e
+
+            outcomes = await asyncio.gather(*(deliver(row_id, payload) for row_id, _, payload, _ in claimed))
+            await self.record(claimed, outcomes)
+        return len(claimed)
+
+    async def claim(self, limit: int) -> list[tuple[int, int, bytes, int]]:
+        """Lease up to `limit` due rows; returns (id, plan_id, payload, attempts) tuples."""
+        now = datetime.utcnow()
+        claimable = (
+            PlanOutbox.status.in_(("pending", "processing")),
+            PlanOutbox.available_at <= now,
+            or_(PlanOutbox.locked_until.is_(None), PlanOutbox.locked_until < now),
+        )
+        candidates = (
+            select(PlanOutbox.id)
+            .where(*claimable)
+            .order_by(PlanOutbox.id)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        stmt = (
+            update(PlanOutbox)
+            .where(PlanOutbox.id.in_(candidates.scalar_subquery()), *claimable)
+            .values(status="processing", locked_until=now + self.lease, attempts=PlanOutbox.attempts + 1)
+            .returning(PlanOutbox.id, PlanOutbox.plan_id, PlanOutbox.payload, PlanOutbox.attempts)
+            .execution_options(synchronize_session=False)
+        )
+        async with AsyncSessionLocal() as db:
+            rows = (await db.execute(stmt)).all()
+            await db.commit()
+        return [tuple(row) for row in rows]
+
+    async def deliver(self, row_id: int, payload: bytes) -> str:
+        """Create the plan on PayMongo; returns its PayMongo id."""
+        response = await self.client.post(
+            BASE_URL,
+            json=orjson.loads(payload),
+            endpoint="plans.create",
+            headers={"Idempotency-Key": f"plan-outbox-{row_id}"},
+        )
+        if response.status_code == 200:
+            return response.json()["data"]["id"]
+        detail = f"PayMongo answered {response.status_code}: {error_detail(response)}"
+        if 400 <= response.status_code < 500 and response.status_code != 429:
+            raise PermanentError(detail)
+        raise RuntimeError(detail)
+
+    async def record(self, claimed: list[tuple], outcomes: list):
+        """Write a batch's outcomes: link delivered plans, schedule retries, give up on the rest."""
+        now = datetime.utcnow()
+        plan_ids = []
+        async with AsyncSessionLocal() as db:
+            for (row_id, plan_id, _, attempts), outcome in zip(claimed, outcomes):
+                if isinstance(outcome, str):
+                    await db.execute(
+                        update(PlanOutbox).where(PlanOutbox.id == row_id)
+                        .values(status="done", processed_at=now, locked_until=None, last_error=None)
+                    )
+                    await db.execute(
+                        update(PricingPlan).where(PricingPlan.id == plan_id)
+                        .values(paymongo_plan_id=outcome, sync_status="synced")
+                    )
+                    plan_ids.append(plan_id)
+                    plan_outbox_processed.inc("done")
+                    continue
+                error = f"{type(outcome).__name__}: {outcome}"
+                log_extra = {"plan_outbox_id": row_id, "plan_id": plan_id, "attempts": attempts, "error": error}
+                values = {"locked_until": None, "last_error": error}
+                if isinstance(outcome, PermanentError) or attempts >= self.max_attempts:
+                    values["status"] = "dead"
+                    await db.execute(update(PricingPlan).where(PricingPlan.id == plan_id).values(sync_status="failed"))
+                    plan_ids.append(plan_id)
+                    plan_outbox_processed.inc("dead")
+                    logger.error("Plan outbox row gave up", extra=log_extra)
+                else:
+                    delay = min(self.retry_max_delay, self.retry_base_delay * 2 ** (attempts - 1))
+                    values["status"] = "pending"
+                    values["available_at"] = now + timedelta(seconds=random.uniform(delay / 2, delay))
+                    plan_outbox_processed.inc("retry")
+                    logger.warning("Plan outbox row failed, will retry", extra=log_extra)
+                await db.execute(update(PlanOutbox).where(PlanOutbox.id == row_id).values(**values))
+            await db.commit()
+        if plan_ids:
+            # Imported here: the plans router imports this module
+            from app.api.v1.plans import invalidate_plan_cache
+            await invalidate_plan_cache(*plan_ids)
+
+    async def _reconcile_periodically(self):
+        while True:
+            await asyncio.sleep(self.reconcile_interval)
+            try:
+                await self.reconcile()
+            except Exception:
+                logger.exception("Plan reconciliation failed")
+
+    async def remote_plans(self) -> dict[str, dict]:
+        """Every plan on PayMongo, id -> attributes, read a page at a time."""
+        plans: dict[str, dict] = {}
+        params = {"limit": self.page_size}
+        while True:
+            response = await self.client.get(BASE_URL, params=params, endpoint="plans.list")
+            if response.status_code != 200:
+                raise RuntimeError(f"Listing PayMongo plans failed ({response.status_code}): {error_detail(response)}")
+            body = response.json()
+            page = body.get("data") or []
+            for resource in page:
+                plans[resource["id"]] = resource.get("attributes") or {}
+            if not body.get("has_more") or not page:
+                return plans
+            params = {"limit": self.page_size, "after": page[-1]["id"]}
+
+    async def remote_plan(self, plan_id: str) -> dict | None:
+        """One plan's attributes from PayMongo, or None if it does not exist."""
+        response = await self.client.get(f"{BASE_URL}/{plan_id}", endpoint="plans.retrieve")
+        if response.status_code == 404:
+            return None
+        if response.status_code != 200:
+            raise RuntimeError(f"Retrieving PayMongo plan failed ({response.status_code}): {error_detail(response)}")
+        return response.json()["data"].get("attributes") or {}
+
+    async def confirm_missing(self, remote: dict[str, dict]) -> set[str]:
+        """
+        Look up, one by one, linked plans the list did not return: the outbox
+        or the catalog sync may have linked them after it was read. Those
+        found are added to `remote`; returns the ids PayMongo does not have.
+        """
+        async with AsyncSessionLocal() as db:
+            linked = set((await db.execute(
+                select(PricingPlan.paymongo_plan_id).where(PricingPlan.paymongo_plan_id.is_not(None))
+            )).scalars())
+        missing = set()
+        for plan_id in linked - remote.keys():
+            attributes = await self.remote_plan(plan_id)
+            if attributes is None:
+                missing.add(plan_id)
+            else:
+                remote[plan_id] = attributes
+        return missing
+
+    async def reconcile(self) -> dict[str, int]:
+        """Diff local plans against PayMongo's and repair what can be; returns counts per outcome."""
+        start = time.perf_counter()
+        # Read before opening a session, so no connection waits on PayMongo
+        remote = await self.remote_plans()
+        missing = await self.confirm_missing(remote)
+        remote_by_name = {attributes.get("name"): plan_id for plan_id, attributes in remote.items()}
+        counts = {"in_sync": 0, "linked": 0, "requeued": 0, "drifted": 0, "failed": 0, "unknown_remote": 0, "deferred": 0}
+        changed = []
+        async with AsyncSessionLocal() as db:
+            queued = set((await db.execute(
+                select(PlanOutbox.plan_id).where(PlanOutbox.status.in_(("pending", "processing")))
+            )).scalars())
+            plans = (await db.execute(select(PricingPlan))).scalars().all()
+            for plan in plans:
+                if plan.paymongo_plan_id in remote:
+                    attributes = remote[plan.paymongo_plan_id]
+                    if attributes.get("amount") not in (None, round(plan.price * 100)):
+                        counts["drifted"] += 1
+                        logger.warning(
+                            "PayMongo plan amount differs from the local plan",
+                            extra={"plan_id": plan.id, "paymongo_plan_id": plan.paymongo_plan_id,
+                                   "remote_amount": attributes.get("amount"), "local_price": plan.price},
+                        )
+                    else:
+                        counts["in_sync"] += 1
+                    if plan.sync_status != "synced":
+                        plan.sync_status = "synced"
+                        changed.append(plan.id)
+                    continue
+                if plan.id in queued:
+                    continue  # the worker has it
+                if plan.paymongo_plan_id is not None and plan.paymongo_plan_id not in missing:
+                    counts["deferred"] += 1  # linked since confirm_missing() looked; checked next run
+                    continue
+                if plan.sync_status == "failed" and plan.name not in remote_by_name:
+                    counts["failed"] += 1  # rejected by PayMongo; needs a fix, not another attempt
+                    continue
+                if plan.paymongo_plan_id is None and plan.name in remote_by_name:
+                    # Created upstream but never recorded, e.g. a lost response on a dead row
+                    plan.paymongo_plan_id = remote_by_name[plan.name]
+                    plan.sync_status = "synced"
+                    counts["linked"] += 1
+                else:
+                    # Never created, given up on, or deleted upstream
+                    if plan.paymongo_plan_id is not None:
+                        logger.warning(
+                            "Plan is missing on PayMongo, queueing it again",
+                            extra={"plan_id": plan.id, "paymongo_plan_id": plan.paymongo_plan_id},
+                        )
+                    plan.paymongo_plan_id = None
+                    plan.sync_status = "pending"
+                    db.add(PlanOutbox(
+                        plan_id=plan.id, operation="create", payload=orjson.dumps(paymongo_plan_payload(plan))
+                    ))
+                    counts["requeued"] += 1
+                changed.append(plan.id)
+            linked = {plan.paymongo_plan_id for plan in plans}
+            counts["unknown_remote"] = sum(1 for plan_id in remote if plan_id not in linked)
+            await db.commit()
+        if changed:
+            from app.api.v1.plans import invalidate_plan_cache
+            await invalidate_plan_cache(*changed)
+        if counts["requeued"]:
+            self.notify()
+        for outcome, count in counts.items():
+            if count:
+                plans_reconciled.inc(outcome, amount=count)
+        logger.info(
+            "Plan reconciliation finished",
+            extra={**counts, "remote_plans": len(remote), "duration_s": round(time.perf_counter() - start, 3)},
+        )
+        return counts
+
+
+plan_outbox_worker = PlanOutboxWorker.from_settings(settings, paymongo_client)
+
+plan_outbox_processed = registry.counter(
+    "plan_outbox_processed_total", "Plan outbox deliveries by outcome.", ("outcome",)
+)
+plans_reconciled = registry.counter(
+    "plans_reconciled_total", "Local plans checked against PayMongo by outcome.", ("outcome",)
+)
+plan_outbox_depth = registry.gauge("plan_outbox_depth", "Plan outbox rows by status.", ("status",))
+
+
+@registry.collector
+async def collect_plan_outbox_depth():
+    async with AsyncSessionLocal() as db:
+        rows = (await db.execute(
+            select(PlanOutbox.status, func.count())
+            .where(PlanOutbox.status.in_(("pending", "processing", "dead")))
+            .group_by(PlanOutbox.status)
+        )).all()
+    counts = {"pending": 0, "processing": 0, "dead": 0, **dict(rows)}
+    for status, count in counts.items():
+        plan_outbox_depth.set(count, status)
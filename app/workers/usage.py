@@ -0,0 +1,169 @@
+import asyncio
+import logging
+import time
+from datetime import datetime
+from app.core.config import settings
+from app.core.metrics import registry
+from app.db.dialect import dialect_insert
+from app.db.session import AsyncSessionLocal
+from app.models.usage import UsageRollup
+
+logger = logging.getLogger(__name__)
+
+
+class UsageAggregator:
+    """
+    Sums usage events in memory per (subscription, metric, time bucket) and
+    adds the sums to usage_rollups with bulk upserts every flush_interval,
+    so however many events a subscription reports, each flush costs one
+    row per metric and bucket. At most max_pending_keys sums are held:
+    past that, add() flushes before accepting more. Sums not yet flushed
+    are lost if the process dies.
+    """
+
+    def __init__(
+        self,
+        bucket_seconds: int = 3600,
+        flush_interval: float = 5.0,
+        max_pending_keys: int = 100_000,
+        chunk_size: int = 1000,
+    ):
+        self.bucket_seconds = bucket_seconds
+        self.flush_interval = flush_interval
+        self.max_pending_keys = max_pending_keys
+        self.chunk_size = chunk_size
+        # (subscription_id, metric, bucket epoch seconds) -> [quantity, events]
+        self._pending: dict[tuple[int, str, int], list[int]] = {}
+        self._flush_lock = asyncio.Lock()
+        self._flusher: asyncio.Task | None = None
+
+    @classmethod
+    def from_settings(cls, settings) -> "UsageAggregator":
+        return cls(
+            bucket_seconds=settings.USAGE_BUCKET_SECONDS,
+            flush_interval=settings.USAGE_FLUSH_INTERVAL,
+            max_pending_keys=settings.USAGE_MAX_PENDING_KEYS,
+        )
+
+    def start(self):
+        if self._flusher is None:
+            self._flusher = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._flusher is None:
+            return
+        self._flusher.cancel()
+        try:
+            await self._flusher
+        except asyncio.CancelledError:
+            pass
+        self._flusher = None
+        try:
+            await self.flush()
+        except Exception:
+            logger.exception("Flushing usage at shutdown failed", extra={"pending_keys": len(self._pending)})
+
+    async def add(self, events) -> int:
+        """
+        Add (subscription_id, metric, quantity, unix timestamp) tuples; returns
+        how many were added. Raises if a flush needed to make room fails, in
+        which case none of the events were added.
+        """
+        if len(self._pending) >= self.max_pending_keys:
+            await self.flush()
+        pending = self._pending
+        size = self.bucket_seconds
+        count = 0
+        for subscription_id, metric, quantity, timestamp in events:
+            key = (subscription_id, metric, int(timestamp // size) * size)
+            entry = pending.get(key)
+            if entry is None:
+                pending[key] = [quantity, 1]
+            else:
+                entry[0] += quantity
+                entry[1] += 1
+            count += 1
+        usage_events_ingested.inc(amount=count)
+        return count
+
+    def pending_totals(self, subscription_ids, metrics) -> dict[tuple[int, str], int]:
+        """Unflushed sums keyed by (subscription_id, metric), for adding to the flushed rollup totals."""
+        totals: dict[tuple[int, str], int] = {}
+        for (subscription_id, metric, _), (quantity, _) in self._pending.items():
+            if subscription_id in subscription_ids and metric in metrics:
+                totals[subscription_id, metric] = totals.get((subscription_id, metric), 0) + quantity
+        return totals
+
+    async def flush(self) -> int:
+        """Write every pending sum in one transaction; returns the number of rollup rows upserted."""
+        async with self._flush_lock:
+            if not self._pending:
+                return 0
+            pending, self._pending = self._pending, {}
+            start = time.perf_counter()
+            try:
+                await self._write(pending)
+            except Exception:
+                # Nothing was committed, so the sums go back to be retried with whatever arrived meanwhile
+                for key, (quantity, count) in pending.items():
+                    entry = self._pending.get(key)
+                    if entry is None:
+                        self._pending[key] = [quantity, count]
+                    else:
+                        entry[0] += quantity
+                        entry[1] += count
+                raise
+            usage_flush_duration.observe(time.perf_counter() - start)
+            usage_rollup_rows.inc(amount=len(pending))
+            return len(pending)
+
+    async def _write(self, pending: dict[tuple[int, str, int], list[int]]):
+        now = datetime.utcnow()
+        rows = [
+            {
+                "subscription_id": subscription_id,
+                "metric": metric,
+                "bucket_start": datetime.utcfromtimestamp(bucket),
+                "quantity": quantity,
+                "events": count,
+                "updated_at": now,
+            }
+            for (subscription_id, metric, bucket), (quantity, count) in pending.items()
+        ]
+        async with AsyncSessionLocal() as db:
+            # One compiled statement run as executemany; it is cached, where multi-row VALUES recompile per batch
+            stmt = dialect_insert(db, UsageRollup)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[UsageRollup.subscription_id, UsageRollup.metric, UsageRollup.bucket_start],
+                set_={
+                    "quantity": UsageRollup.quantity + stmt.excluded.quantity,
+                    "events": UsageRollup.events + stmt.excluded.events,
+                    "updated_at": stmt.excluded.updated_at,
+                },
+            )
+            for offset in range(0, len(rows), self.chunk_size):
+                await db.execute(stmt, rows[offset:offset + self.chunk_size])
+            await db.commit()
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception:
+                logger.exception("Flushing usage rollups failed", extra={"pending_keys": len(self._pending)})
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+
+usage_aggregator = UsageAggregator.from_settings(settings)
+
+usage_events_ingested = registry.counter("usage_events_ingested_total", "Usage events accepted for metering.")
+usage_rollup_rows = registry.counter("usage_rollup_rows_flushed_total", "Usage rollup rows upserted by flushes.")
+usage_flush_duration = registry.histogram("usage_flush_duration_seconds", "Time to write one usage flush.")
+registry.gauge(
+    "usage_pending_keys",
+    "Usage sums held in memory awaiting a flush.",
+    callback=lambda: {(): len(usage_aggregator)},
+)
@@ -0,0 +1,296 @@
+import asyncio
+import logging
+import random
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable
+import orjson
+from sqlalchemy import func, insert, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
+from app.core.metrics import registry
+from app.db.dialect import dialect_insert
+from app.db.session import AsyncSessionLocal
+from app.models.checkout_session import upsert_checkout_session
+from app.models.processed_event import ProcessedEvent
+from app.models.webhook_event import WebhookEvent
+
+logger = logging.getLogger(__name__)
+
+EventHandler = Callable[[AsyncSession, dict], Awaitable[None]]
+
+# Event type -> coroutine run inside the same transaction that marks the event done
+EVENT_HANDLERS: dict[str, EventHandler] = {}
+
+def event_handler(event_type: str):
+    def register(func: EventHandler) -> EventHandler:
+        EVENT_HANDLERS[event_type] = func
+        return func
+    return register
+
+
+@event_handler("payment.paid")
+async def handle_payment_paid(db: AsyncSession, event: dict):
+    payment_data = event["data"]["attributes"]["data"]
+    payment_id = payment_data["id"]
+    amount = payment_data["attributes"]["amount"]
+    customer_email = (payment_data["attributes"].get("billing") or {}).get("email")
+    logger.info(
+        "Payment successful",
+        extra={"payment_id": payment_id, "amount": amount, "email": customer_email},
+    )
+    # Here you can add your logic to handle the payment, e.g., update database, send email, etc.
+
+
+@event_handler("checkout_session.payment.paid")
+async def handle_checkout_session_paid(db: AsyncSession, event: dict):
+    # The event carries the full checkout_session resource, payments included
+    await upsert_checkout_session(db, event["data"]["attributes"]["data"])
+
+
+class InboxWriter:
+    """
+    Group-commits webhook_events inserts. Rows that arrive while a flush is
+    in progress are written together by the next flush as one multi-row
+    INSERT and one COMMIT, and each caller returns only once its row is
+    committed. Under load this turns one fsync per webhook into one per
+    batch without adding latency when idle.
+    """
+
+    def __init__(self, max_batch: int = 500):
+        self.max_batch = max_batch
+        self._pending: list[tuple[dict, asyncio.Future]] = []
+        self._flusher: asyncio.Task | None = None
+
+    async def write(self, row: dict):
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((row, future))
+        if self._flusher is None or self._flusher.done():
+            self._flusher = asyncio.create_task(self._flush())
+        await future
+
+    async def _flush(self):
+        while self._pending:
+            batch = self._pending[:self.max_batch]
+            del self._pending[:self.max_batch]
+            try:
+                async with AsyncSessionLocal() as db:
+                    await db.execute(insert(WebhookEvent), [row for row, _ in batch])
+                    await db.commit()
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+            else:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_result(None)
+
+
+class WebhookWorker:
+    """
+    Drains the webhook_events inbox with a pool of asyncio tasks.
+
+    Events are claimed in batches by setting a lease (locked_until); on
+    PostgreSQL the candidate rows are selected FOR UPDATE SKIP LOCKED so
+    several app processes can poll concurrently without contention. An
+    event whose lease expires (e.g. the process died) becomes claimable
+    again. Failures are retried with jittered exponential backoff and
+    moved to the "dead" state after max_attempts.
+    """
+
+    def __init__(
+        self,
+        concurrency: int = 8,
+        batch_size: int = 50,
+        poll_interval: float = 1.0,
+        lease_seconds: float = 60.0,
+        max_attempts: int = 8,
+        retry_base_delay: float = 2.0,
+        retry_max_delay: float = 600.0,
+    ):
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.lease = timedelta(seconds=lease_seconds)
+        self.max_attempts = max_attempts
+        self.retry_base_delay = retry_base_delay
+        self.retry_max_delay = retry_max_delay
+        self.in_flight = 0
+        self._backlog = False
+        self._wakeup: asyncio.Event | None = None
+        self._poller: asyncio.Task | None = None
+        self._tasks: set[asyncio.Task] = set()
+
+    @classmethod
+    def from_settings(cls, settings) -> "WebhookWorker":
+        return cls(
+            concurrency=settings.WEBHOOK_WORKER_CONCURRENCY,
+            batch_size=settings.WEBHOOK_BATCH_SIZE,
+            poll_interval=settings.WEBHOOK_POLL_INTERVAL,
+            lease_seconds=settings.WEBHOOK_LEASE_SECONDS,
+            max_attempts=settings.WEBHOOK_MAX_ATTEMPTS,
+            retry_base_delay=settings.WEBHOOK_RETRY_BASE_DELAY,
+            retry_max_delay=settings.WEBHOOK_RETRY_MAX_DELAY,
+        )
+
+    def start(self):
+        if self._poller is None:
+            self._wakeup = asyncio.Event()
+            self._poller = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._poller is None:
+            return
+        self._poller.cancel()
+        try:
+            await self._poller
+        except asyncio.CancelledError:
+            pass
+        self._poller = None
+        # Let in-flight events finish; anything unfinished is re-claimed after its lease
+        if self._tasks:
+            await asyncio.wait(self._tasks, timeout=self.lease.total_seconds())
+
+    def notify(self):
+        """Wake the poller right away instead of waiting for the next poll interval."""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _run(self):
+        while True:
+            free = self.concurrency - self.in_flight
+            claimed = []
+            if free > 0:
+                try:
+                    claimed = await self.claim(min(free, self.batch_size))
+                except Exception:
+                    logger.exception("Claiming webhook events failed")
+            for event in claimed:
+                self.in_flight += 1
+                task = asyncio.create_task(self._process(*event))
+                self._tasks.add(task)
+                task.add_done_callback(self._task_done)
+            # A full batch means more events are probably due
+            self._backlog = bool(claimed) and len(claimed) == min(free, self.batch_size)
+            if self._backlog and self.in_flight < self.concurrency:
+                continue
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    def _task_done(self, task: asyncio.Task):
+        self._tasks.discard(task)
+        self.in_flight -= 1
+        if self._backlog:
+            self.notify()
+
+    async def claim(self, limit: int) -> list[tuple[int, bytes, int]]:
+        """Lease up to `limit` due events; returns (id, payload, attempts) tuples."""
+        now = datetime.utcnow()
+        claimable = (
+            WebhookEvent.status.in_(("pending", "processing")),
+            WebhookEvent.available_at <= now,
+            or_(WebhookEvent.locked_until.is_(None), WebhookEvent.locked_until < now),
+        )
+        candidates = (
+            select(WebhookEvent.id)
+            .where(*claimable)
+            .order_by(WebhookEvent.id)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        # Re-checking the lease in the UPDATE keeps claims exclusive on backends without SKIP LOCKED
+        stmt = (
+            update(WebhookEvent)
+            .where(WebhookEvent.id.in_(candidates.scalar_subquery()), *claimable)
+            .values(
+                status="processing",
+                locked_until=now + self.lease,
+                attempts=WebhookEvent.attempts + 1,
+            )
+            .returning(WebhookEvent.id, WebhookEvent.payload, WebhookEvent.attempts)
+            .execution_options(synchronize_session=False)
+        )
+        async with AsyncSessionLocal() as db:
+            rows = (await db.execute(stmt)).all()
+            await db.commit()
+        return [tuple(row) for row in rows]
+
+    async def _process(self, event_id: int, payload: bytes, attempts: int):
+        event_type = "unknown"
+        try:
+            event = orjson.loads(payload)
+            event_type = event["data"]["attributes"]["type"]
+            handler = EVENT_HANDLERS.get(event_type)
+            paymongo_id = event["data"].get("id")
+            async with AsyncSessionLocal() as db:
+                first_delivery = True
+                if paymongo_id:
+                    # Claimed in the handler's transaction, so side effects run at most once per event id
+                    result = await db.execute(
+                        dialect_insert(db, ProcessedEvent)
+                        .values(event_id=paymongo_id, processed_at=datetime.utcnow())
+                        .on_conflict_do_nothing()
+                    )
+                    first_delivery = result.rowcount == 1
+                if handler is not None and first_delivery:
+                    await handler(db, event)
+                await db.execute(
+                    update(WebhookEvent)
+                    .where(WebhookEvent.id == event_id)
+                    .values(status="done", processed_at=datetime.utcnow(), locked_until=None, last_error=None)
+                )
+                await db.commit()
+            webhook_events_processed.inc(event_type, "done" if first_delivery else "duplicate")
+        except Exception as e:
+            webhook_events_processed.inc(event_type, "failed")
+            await self._fail(event_id, attempts, e)
+
+    async def _fail(self, event_id: int, attempts: int, error: Exception):
+        values = {"locked_until": None, "last_error": f"{type(error).__name__}: {error}"}
+        log_extra = {"webhook_event_id": event_id, "attempts": attempts, "error": values["last_error"]}
+        if attempts >= self.max_attempts:
+            values["status"] = "dead"
+            logger.error("Webhook event gave up after max attempts", extra=log_extra)
+        else:
+            delay = min(self.retry_max_delay, self.retry_base_delay * 2 ** (attempts - 1))
+            values["status"] = "pending"
+            values["available_at"] = datetime.utcnow() + timedelta(seconds=random.uniform(delay / 2, delay))
+            logger.warning("Webhook event failed, will retry", extra=log_extra)
+        try:
+            async with AsyncSessionLocal() as db:
+                await db.execute(update(WebhookEvent).where(WebhookEvent.id == event_id).values(**values))
+                await db.commit()
+        except Exception:
+            # The lease will expire and the event will be retried
+            logger.exception("Recording webhook event failure failed", extra={"webhook_event_id": event_id})
+
+
+inbox_writer = InboxWriter()
+webhook_worker = WebhookWorker.from_settings(settings)
+
+webhook_events_processed = registry.counter(
+    "webhook_events_processed_total", "Webhook events handled by the worker.", ("event_type", "outcome")
+)
+webhook_queue_depth = registry.gauge("webhook_queue_depth", "Stored webhook events by status.", ("status",))
+registry.gauge(
+    "webhook_worker",
+    "In-process webhook ingest and worker state.",
+    ("state",),
+    lambda: {("inbox_pending",): len(inbox_writer._pending), ("in_flight",): webhook_worker.in_flight},
+)
+
+
+@registry.collector
+async def collect_webhook_queue_depth():
+    async with AsyncSessionLocal() as db:
+        rows = (await db.execute(
+            select(WebhookEvent.status, func.count())
+            .where(WebhookEvent.status.in_(("pending", "processing", "dead")))
+            .group_by(WebhookEvent.status)
+        )).all()
+    counts = {"pending": 0, "processing": 0, "dead": 0, **dict(rows)}
+    for status, count in counts.items():
+        webhook_queue_depth.set(count, status)
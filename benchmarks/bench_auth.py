@@ -0,0 +1,77 @@
+"""
+Per-request cost of the get_current_user dependency.
+
+"cold" clears both caches before every call, so each request verifies the
+JWT signature and loads the user from the database, which is what a naive
+dependency would do. "token warm" keeps verified tokens but reloads the
+user; "warm" is the steady state with both caches hot.
+
+    python -m benchmarks.bench_auth --requests 5000 --users 100
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+from benchmarks.common import bootstrap_env, report
+
+
+def per_op(name: str, elapsed: float, ops: int) -> dict:
+    return {
+        "name": name,
+        "ops": ops,
+        "elapsed_s": round(elapsed, 4),
+        "us_per_op": round(elapsed / ops * 1e6, 3),
+        "ops_per_s": round(ops / elapsed, 1),
+    }
+
+
+async def run(total: int, users: int) -> list[dict]:
+    from app.core.auth import get_current_user, user_cache
+    from app.core.security import create_access_token, token_cache
+    from app.db.init_db import init_db
+    from app.db.session import AsyncSessionLocal, dispose_engines
+    from app.models.user import User
+
+    init_db()
+    async with AsyncSessionLocal() as db:
+        db.add_all(User(email=f"user{i}@example.com", password="x") for i in range(users))
+        await db.commit()
+    tokens = [create_access_token({"sub": f"user{i}@example.com"}) for i in range(users)]
+
+    async def measure(name: str, clear_tokens: bool, clear_users: bool) -> dict:
+        start = time.perf_counter()
+        for i in range(total):
+            if clear_tokens:
+                token_cache.entries.clear()
+            if clear_users:
+                await user_cache.delete(f"user{i % users}@example.com")
+            await get_current_user(tokens[i % users])
+        return per_op(name, time.perf_counter() - start, total)
+
+    results = [
+        await measure("cold (verify JWT + SELECT user)", True, True),
+        await measure("token warm, user cold", False, True),
+        await measure("token cold, user warm", True, False),
+        await measure("warm (both cached)", False, False),
+    ]
+    await dispose_engines()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--output", help="write results as JSON to this path")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DATABASE_URL"] = f"sqlite:///{tmp}/bench_auth.db"
+        bootstrap_env()
+        report(asyncio.run(run(args.requests, args.users)), args.output)
+
+
+if __name__ == "__main__":
+    main()
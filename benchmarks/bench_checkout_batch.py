@@ -0,0 +1,94 @@
+"""
+Wall time for creating N checkout sessions: N sequential calls to
+/api/v1/checkout/create versus one /api/v1/checkout/batch request.
+
+The app is served by uvicorn on a background thread (httpx's ASGI
+transport buffers whole responses, which would hide the streaming) and
+talks to the mock PayMongo server in a child process.
+
+    python -m benchmarks.bench_checkout_batch --items 200 --latency 0.1 --concurrency 10
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+
+from benchmarks.common import bootstrap_env, report, serve_app, summarize
+from benchmarks import mock_paymongo
+
+
+def make_items(count: int) -> list[dict]:
+    return [{"amount": 100 + i, "name": f"Bench item {i}", "quantity": 1} for i in range(count)]
+
+
+async def run(base_url: str, items: list[dict]) -> list[dict]:
+    import httpx
+
+    results = []
+    async with httpx.AsyncClient(base_url=base_url, timeout=None) as client:
+        latencies = []
+        failures = 0
+        start = time.perf_counter()
+        for item in items:
+            call_start = time.perf_counter()
+            response = await client.post("/api/v1/checkout/create", json=item)
+            failures += response.status_code != 200
+            latencies.append(time.perf_counter() - call_start)
+        results.append(summarize("sequential /create", latencies, time.perf_counter() - start, failures=failures))
+
+        latencies = []
+        summary = {}
+        start = time.perf_counter()
+        async with client.stream("POST", "/api/v1/checkout/batch", json=items) as response:
+            first_line = None
+            async for line in response.aiter_lines():
+                if not line:
+                    continue
+                record = json.loads(line)
+                if "summary" in record:
+                    summary = record["summary"]
+                    continue
+                latencies.append(time.perf_counter() - start)
+                if first_line is None:
+                    first_line = time.perf_counter() - start
+        elapsed = time.perf_counter() - start
+        # Latency here is time from batch start until each item's line arrived
+        results.append(summarize(
+            "/batch (NDJSON)",
+            latencies,
+            elapsed,
+            first_result_ms=round((first_line or 0) * 1000, 3),
+            **summary,
+        ))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.1, help="mock upstream latency in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of mock calls that fail")
+    parser.add_argument("--concurrency", type=int, default=10, help="CHECKOUT_BATCH_CONCURRENCY")
+    parser.add_argument("--rate-limit", type=float, help="PAYMONGO_RATE_LIMIT in requests/second")
+    parser.add_argument("--output", help="write results as JSON to this path")
+    args = parser.parse_args()
+
+    with mock_paymongo.spawn(latency=args.latency, error_rate=args.error_rate) as base_url:
+        os.environ["PAYMONGO_BASE_URL"] = base_url
+        os.environ["CHECKOUT_BATCH_CONCURRENCY"] = str(args.concurrency)
+        os.environ["CHECKOUT_BATCH_MAX_ITEMS"] = str(max(args.items, 1))
+        if args.rate_limit:
+            os.environ["PAYMONGO_RATE_LIMIT"] = str(args.rate_limit)
+        bootstrap_env(WEBHOOK_WORKER_ENABLED=False)
+        from app.main import app
+        server, app_url = serve_app(app)
+        try:
+            results = asyncio.run(run(app_url, make_items(args.items)))
+        finally:
+            server.should_exit = True
+        report(results, args.output)
+
+
+if __name__ == "__main__":
+    main()
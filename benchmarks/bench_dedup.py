@@ -0,0 +1,105 @@
+"""
+Cost of the webhook dedup check per event id.
+
+Times EventDeduplicator against a seeded processed_events table for the
+three paths an incoming id can take: a redelivery still in the LRU, a new
+id rejected by the bloom filter, and a bloom positive that falls through
+to the database. The plain primary-key SELECT every check would otherwise
+need is timed alongside for comparison.
+
+    python -m benchmarks.bench_dedup --seed 100000 --lookups 20000
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from datetime import datetime
+
+from benchmarks.common import bootstrap_env, report
+
+
+def per_op(name: str, elapsed: float, ops: int, **extra) -> dict:
+    return {
+        "name": name,
+        "ops": ops,
+        "elapsed_s": round(elapsed, 4),
+        "us_per_op": round(elapsed / ops * 1e6, 3),
+        "ops_per_s": round(ops / elapsed, 1),
+        **extra,
+    }
+
+
+async def run(seed: int, lookups: int) -> list[dict]:
+    from sqlalchemy import insert, select
+    from app.core.dedup import EventDeduplicator
+    from app.db.init_db import init_db
+    from app.db.session import AsyncSessionLocal, dispose_engines
+    from app.models.processed_event import ProcessedEvent
+
+    init_db()
+    now = datetime.utcnow()
+    async with AsyncSessionLocal() as db:
+        for start in range(0, seed, 10_000):
+            await db.execute(insert(ProcessedEvent), [
+                {"event_id": f"evt_seen_{i}", "processed_at": now}
+                for i in range(start, min(seed, start + 10_000))
+            ])
+        await db.commit()
+
+    dedup = EventDeduplicator(lru_size=lookups, bloom_capacity=max(seed * 2, 1000))
+    start = time.perf_counter()
+    await dedup.rebuild()
+    results = [per_op("rebuild bloom from processed_events", time.perf_counter() - start, max(seed, 1))]
+
+    recent = [f"evt_recent_{i}" for i in range(lookups)]
+    for event_id in recent:
+        dedup.remember(event_id)
+    start = time.perf_counter()
+    for event_id in recent:
+        assert await dedup.is_duplicate(event_id)
+    results.append(per_op("duplicate, LRU hit", time.perf_counter() - start, lookups))
+
+    fresh = [f"evt_new_{i}" for i in range(lookups)]
+    start = time.perf_counter()
+    duplicates = sum([await dedup.is_duplicate(event_id) for event_id in fresh])
+    results.append(per_op(
+        "new id, bloom negative (falls back to the DB on false positives)",
+        time.perf_counter() - start,
+        lookups,
+        false_positive_db_checks=dedup.db_checks,
+        duplicates=duplicates,
+    ))
+
+    seen = [f"evt_seen_{i % max(seed, 1)}" for i in range(lookups)]
+    start = time.perf_counter()
+    for event_id in seen:
+        await dedup.is_duplicate(event_id)
+    results.append(per_op("duplicate, bloom positive + DB check (cold LRU)", time.perf_counter() - start, lookups))
+
+    start = time.perf_counter()
+    async with AsyncSessionLocal() as db:
+        for event_id in fresh:
+            await db.scalar(select(ProcessedEvent.event_id).where(ProcessedEvent.event_id == event_id))
+    results.append(per_op("baseline: SELECT per check", time.perf_counter() - start, lookups))
+
+    results.append({"name": "stats", **dedup.stats()})
+    await dispose_engines()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seed", type=int, default=100_000, help="processed events already in the table")
+    parser.add_argument("--lookups", type=int, default=20_000)
+    parser.add_argument("--output", help="write results as JSON to this path")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DATABASE_URL"] = f"sqlite:///{tmp}/bench_dedup.db"
+        bootstrap_env()
+        report(asyncio.run(run(args.seed, args.lookups)), args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""
+Invoice run throughput and memory.
+
+Seeds --invoices paid checkout sessions, then runs one invoice job per
+--workers value, each in a fresh interpreter so its peak RSS (VmHWM) is the
+job's own: the app process streaming rows and writing the CSV, and the
+largest render process. Memory should stay flat as --invoices grows, and
+invoices/sec should grow with workers up to the core count.
+
+PDFs cost a file per invoice (about 4 KB of disk each); pass --no-pdf for
+runs in the millions.
+
+    python -m benchmarks.bench_invoices --invoices 100000 --workers 1,2,4
+    python -m benchmarks.bench_invoices --invoices 1000000 --workers 4 --no-pdf
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from benchmarks.common import bootstrap_env, report
+
+PERIOD_START = datetime(2026, 1, 1)
+PERIOD_END = datetime(2026, 2, 1)
+
+
+def peak_rss_mb(pid: int | str = "self") -> float | None:
+    try:
+        with open(f"/proc/{pid}/status") as fh:
+            for line in fh:
+                if line.startswith("VmHWM:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return None
+
+
+def seed(count: int):
+    from sqlalchemy import insert
+    from app.db.init_db import init_db
+    from app.db.session import get_engine
+    from app.models.checkout_session import CheckoutSessionRecord
+
+    init_db()
+    step = timedelta(days=30) / max(count, 1)
+    with get_engine().begin() as conn:
+        for offset in range(0, count, 10_000):
+            conn.execute(insert(CheckoutSessionRecord), [
+                {
+                    "id": f"cs_bench_{i:08d}",
+                    "reference_number": f"ref-{i}",
+                    "status": "paid",
+                    "amount": 10_000 + i % 90_000,
+                    "currency": "PHP",
+                    "description": f"Bench order {i}",
+                    "payload": b"{}",
+                    "created_at": PERIOD_START + step * i,
+                    "updated_at": PERIOD_START + step * i,
+                }
+                for i in range(offset, min(count, offset + 10_000))
+            ])
+
+
+async def run_job(workers: int, pdf: bool, chunk_size: int, output_dir: str) -> dict:
+    from app.db.session import AsyncSessionLocal, dispose_engines, get_async_engine
+    from app.models.invoice_job import InvoiceJob
+    from app.workers.invoices import InvoiceGenerator
+
+    get_async_engine()
+    generator = InvoiceGenerator(output_dir=output_dir, workers=workers, chunk_size=chunk_size, pdf_enabled=pdf)
+    job_id = f"bench{workers}"
+    async with AsyncSessionLocal() as db:
+        db.add(InvoiceJob(id=job_id, status="pending", period_start=PERIOD_START, period_end=PERIOD_END))
+        await db.commit()
+    # Start the pool first so process start-up is not counted as rendering time
+    generator.start()
+    list(generator._executor.map(abs, range(workers)))
+    start = time.perf_counter()
+    count = await generator.run(job_id, PERIOD_START, PERIOD_END)
+    elapsed = time.perf_counter() - start
+    render_peaks = [peak_rss_mb(pid) for pid in generator._executor._processes]
+    await generator.shutdown()
+    await dispose_engines()
+    return {
+        "name": f"invoice job, {workers} render workers{'' if pdf else ', CSV only'}",
+        "invoices": count,
+        "elapsed_s": round(elapsed, 2),
+        "invoices_per_s": round(count / elapsed),
+        "app_peak_rss_mb": peak_rss_mb(),
+        "render_peak_rss_mb": max((peak for peak in render_peaks if peak is not None), default=None),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--invoices", type=int, default=100000)
+    parser.add_argument("--workers", default=str(os.cpu_count() or 1), help="comma-separated render worker counts")
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--no-pdf", action="store_true")
+    parser.add_argument("--database-url", help="defaults to a throwaway SQLite file")
+    parser.add_argument("--job", type=int, help=argparse.SUPPRESS)  # internal: run one job in this process
+    parser.add_argument("--output-dir", help=argparse.SUPPRESS)
+    parser.add_argument("--output", help="write results as JSON to this path")
+    args = parser.parse_args()
+
+    if args.job:
+        print(json.dumps(asyncio.run(run_job(args.job, not args.no_pdf, args.chunk_size, args.output_dir))))
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{tmp}/bench_invoices.db"
+        bootstrap_env()
+        start = time.perf_counter()
+        seed(args.invoices)
+        print(f"seeded {args.invoices} sessions in {time.perf_counter() - start:.1f}s", file=sys.stderr)
+        results = []
+        for workers in (int(value) for value in args.workers.split(",")):
+            command = [
+                sys.executable, "-m", "benchmarks.bench_invoices", "--job", str(workers),
+                "--chunk-size", str(args.chunk_size), "--output-dir", os.path.join(tmp, f"out{workers}"),
+            ]
+            if args.no_pdf:
+                command.append("--no-pdf")
+            result = subprocess.run(command, capture_output=True, text=True, check=True)
+            results.append(json.loads(result.stdout.strip().splitlines()[-1]))
+    report(results, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Per-call cost of the metrics collectors and the logging hot path.
+
+Times Histogram.observe / Counter.inc directly, the /health endpoint with
+and without MetricsMiddleware (in-process via httpx's ASGI transport), a
+DEBUG log call that is filtered out by level, and an INFO call handed to
+the background log listener.
+
+    python -m benchmarks.bench_metrics --calls 200000 --requests 5000
+"""
+import argparse
+import asyncio
+import io
+import logging
+import time
+
+from benchmarks.common import bootstrap_env, report, summarize
+
+
+def per_call(name: str, fn, calls: int) -> dict:
+    start = time.perf_counter()
+    for _ in range(calls):
+        fn()
+    elapsed = time.perf_counter() - start
+    return {"name": name, "calls": calls, "ns_per_call": round(elapsed / calls * 1e9, 1)}
+
+
+async def drive(app, total: int) -> tuple[list[float], float]:
+    import httpx
+
+    latencies: list[float] = []
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        start = time.perf_counter()
+        for _ in range(total):
+            begin = time.perf_counter()
+            response = await client.get("/health")
+            assert response.status_code == 200, response.status_code
+            latencies.append(time.perf_counter() - begin)
+    return latencies, time.perf_counter() - start
+
+
+async def run(calls: int, total: int) -> list[dict]:
+    from fastapi import FastAPI
+    from app.core import log
+    from app.core.metrics import MetricsMiddleware, Registry
+
+    registry = Registry()
+    histogram = registry.histogram("bench_seconds", "Benchmark histogram.", ("route", "status"))
+    counter = registry.counter("bench_total", "Benchmark counter.", ("outcome",))
+    results = [
+        per_call("Histogram.observe", lambda: histogram.observe(0.0042, "/api/v1/plan/", 200), calls),
+        per_call("Counter.inc", lambda: counter.inc("done"), calls),
+    ]
+
+    log.configure_logging("INFO")
+    logger = logging.getLogger("app.bench")
+    # Point the listener's stdout handler at a buffer so terminal speed is not measured
+    for handler in log._listener.handlers:
+        handler.setStream(io.StringIO())
+    results.append(per_call("logger.debug (filtered)", lambda: logger.debug("noop", extra={"n": 1}), calls))
+    results.append(per_call("logger.info (queued)", lambda: logger.info("event", extra={"n": 1}), calls // 10))
+    log.shutdown_logging()
+
+    for instrumented in (False, True):
+        app = FastAPI()
+
+        @app.get("/health")
+        async def health():
+            return {"status": "ok"}
+
+        if instrumented:
+            app.add_middleware(MetricsMiddleware)
+        latencies, elapsed = await drive(app, total)
+        results.append(summarize(f"GET /health {'with' if instrumented else 'without'} MetricsMiddleware", latencies, elapsed))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=200000)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--output", help="write results as JSON to this path")
+    args = parser.parse_args()
+
+    bootstrap_env()
+    report(asyncio.run(run(args.calls, args.requests)), args.output)
+
+
+if __name__ == "__main__":
+    main()
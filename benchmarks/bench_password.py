@@ -0,0 +1,109 @@
+"""
+Login hashing throughput before and after the dedicated password pool.
+
+"before" runs verify_password on the shared Starlette/anyio threadpool, as
+the old sync login handler did; "after" uses verify_password_async on the
+bounded PasswordWorkerPool. While the storm runs, a probe keeps submitting
+no-op jobs to the shared threadpool to show how long other sync endpoints
+wait for a worker.
+
+    python -m benchmarks.bench_password --logins 200 --concurrency 100 --rounds 10
+"""
+import argparse
+import asyncio
+import os
+import time
+
+from benchmarks.common import bootstrap_env, percentile, report
+
+
+async def probe_threadpool(stop: asyncio.Event, waits: list[float]):
+    from fastapi.concurrency import run_in_threadpool
+
+    while not stop.is_set():
+        start = time.perf_counter()
+        await run_in_threadpool(lambda: None)
+        waits.append(time.perf_counter() - start)
+        await asyncio.sleep(0.01)
+
+
+async def storm(name: str, verify, hashed: str, logins: int, concurrency: int) -> dict:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: list[float] = []
+    rejected = 0
+
+    async def login():
+        nonlocal rejected
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                await verify("correct horse", hashed)
+            except Exception:
+                rejected += 1
+                return
+            latencies.append(time.perf_counter() - start)
+
+    stop = asyncio.Event()
+    waits: list[float] = []
+    probe = asyncio.create_task(probe_threadpool(stop, waits))
+    cpu_start = time.process_time()
+    start = time.perf_counter()
+    await asyncio.gather(*(login() for _ in range(logins)))
+    elapsed = time.perf_counter() - start
+    cpu = time.process_time() - cpu_start
+    stop.set()
+    await probe
+    cores = os.cpu_count() or 1
+    return {
+        "name": name,
+        "logins": len(latencies),
+        "rejected_429": rejected,
+        "elapsed_s": round(elapsed, 3),
+        "logins_per_s": round(len(latencies) / elapsed, 1),
+        "logins_per_s_per_core": round(len(latencies) / elapsed / cores, 1),
+        "cpu_s": round(cpu, 3),
+        "login_p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "login_p99_ms": round(percentile(latencies, 99) * 1000, 1),
+        "other_routes_threadpool_wait_p99_ms": round(percentile(waits, 99) * 1000, 2),
+    }
+
+
+async def run(logins: int, concurrency: int):
+    from fastapi.concurrency import run_in_threadpool
+    from app.core.security import hash_password, password_pool, verify_password, verify_password_async
+
+    hashed = hash_password("correct horse")
+
+    async def before(plain, stored):
+        return await run_in_threadpool(verify_password, plain, stored)
+
+    results = [await storm("before: shared threadpool", before, hashed, logins, concurrency)]
+    password_pool.start()
+    results.append(await storm(
+        f"after: password pool ({password_pool.workers} workers, queue {password_pool.queue_size})",
+        verify_password_async, hashed, logins, concurrency,
+    ))
+    password_pool.shutdown()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--rounds", type=int, default=12, help="bcrypt cost factor")
+    parser.add_argument("--workers", type=int, default=None, help="password pool size (default: CPU count)")
+    parser.add_argument("--queue-size", type=int, default=1000, help="password pool queue before 429")
+    parser.add_argument("--output", help="write results as JSON to this path")
+    args = parser.parse_args()
+
+    bootstrap_env(
+        BCRYPT_ROUNDS=args.rounds,
+        PASSWORD_HASH_QUEUE_SIZE=args.queue_size,
+        **({"PASSWORD_HASH_WORKERS": args.workers} if args.workers else {}),
+    )
+    report(asyncio.run(run(args.logins, args.concurrency)), args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Compare the old per-call `requests` path with the shared async PayMongo client.
+
+The `requests` path mirrors what the sync routes did: a fresh
+`requests.post` (new connection, no Session) on one of Starlette's 40
+threadpool workers. The async path drives the pooled `PayMongoClient`
+from the event loop.
+
+    python -m benchmarks.bench_paymongo_client --requests 2000 --concurrency 100 --latency 0.1
+"""
+import argparse
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.common import bootstrap_env, report, summarize
+from benchmarks import mock_paymongo
+
+PAYLOAD = {
+    "data": {
+        "attributes": {
+            "line_items": [{"currency": "PHP", "amount": 10000, "name": "Bench", "quantity": 1}],
+            "payment_method_types": ["gcash", "card"],
+            "reference_number": "Ref-bench",
+        }
+    }
+}
+
+STARLETTE_THREADPOOL_SIZE = 40
+
+
+def bench_requests(base_url: str, total: int) -> dict:
+    import requests
+
+    def call(_):
+        start = time.perf_counter()
+        response = requests.post(f"{base_url}/checkout_sessions", json=PAYLOAD, headers={"Authorization": "Basic x"})
+        response.raise_for_status()
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=STARLETTE_THREADPOOL_SIZE) as pool:
+        latencies = list(pool.map(call, range(total)))
+    return summarize("requests (new connection per call)", latencies, time.perf_counter() - start)
+
+
+async def bench_httpx(base_url: str, total: int, concurrency: int, pool_size: int) -> dict:
+    from app.core.paymongo import PayMongoClient
+
+    client = PayMongoClient(base_url, "x", max_connections=pool_size, max_keepalive_connections=pool_size)
+    await client.start()
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: list[float] = []
+
+    async def call():
+        async with semaphore:
+            start = time.perf_counter()
+            response = await client.post("/checkout_sessions", json=PAYLOAD, endpoint="checkout.create")
+            response.raise_for_status()
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(call() for _ in range(total)))
+    elapsed = time.perf_counter() - start
+    await client.close()
+    return summarize("httpx shared async client", latencies, elapsed, concurrency=concurrency, pool_size=pool_size)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--pool-size", type=int, default=20, help="PayMongoClient max_connections")
+    parser.add_argument("--latency", type=float, default=0.1, help="mock upstream latency in seconds")
+    parser.add_argument("--output", help="write results as JSON to this path")
+    args = parser.parse_args()
+
+    bootstrap_env()
+    results = []
+    with mock_paymongo.spawn(latency=args.latency) as base_url:
+        try:
+            results.append(bench_requests(base_url, args.requests))
+        except ImportError:
+            print("requests is not installed; skipping the baseline run")
+        results.append(asyncio.run(bench_httpx(base_url, args.requests, args.concurrency, args.pool_size)))
+    report(results, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Requests/sec for the plan catalog endpoints with the cache on and off.
+
+Seeds a throwaway SQLite database and drives the app in-process through
+httpx's ASGI transport, so the numbers reflect handler + serialization cost
+without network noise.
+
+    python -m benchmarks.bench_plan_cache --plans 200 --requests 5000
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+from benchmarks.common import bootstrap_env, report, summarize
+
+
+async def drive(client, path: str, total: int, concurrency: int, headers: dict | None = None) -> tuple[list[float], float]:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: list[float] = []
+
+    async def call():
+        async with semaphore:
+            start = time.perf_counter()
+            response = await client.get(path, headers=headers)
+            assert response.status_code in (200, 304), response.status_code
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(call() for _ in range(total)))
+    return latencies, time.perf_counter() - start
+
+
+async def run(plans: int, total: int, concurrency: int) -> list[dict]:
+    import httpx
+    from app.db.init_db import init_db
+    from app.db.session import SessionLocal, dispose_engines
+    from app.main import app
+    from app.models.pricing_plan import PricingPlan
+    from app.api.v1.plans import plan_cache
+
+    init_db()
+    with SessionLocal() as db:
+        db.add_all(
+            PricingPlan(name=f"plan-{i}", price=100 + i, description="Benchmark plan " * 4, billing_cycle="1")
+            for i in range(plans)
+        )
+        db.commit()
+
+    results = []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for path in ("/api/v1/plan/", "/api/v1/plan/1"):
+            plan_cache.enabled = False
+            latencies, elapsed = await drive(client, path, total, concurrency)
+            results.append(summarize(f"GET {path} cache off", latencies, elapsed))
+
+            plan_cache.enabled = True
+            await plan_cache.delete("list", 1)
+            latencies, elapsed = await drive(client, path, total, concurrency)
+            results.append(summarize(f"GET {path} cache on", latencies, elapsed, cache=plan_cache.stats()))
+
+            etag = (await client.get(path)).headers["etag"]
+            latencies, elapsed = await drive(client, path, total, concurrency, headers={"If-None-Match": etag})
+            results.append(summarize(f"GET {path} cache on, If-None-Match (304)", latencies, elapsed))
+    await dispose_engines()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--plans", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=3000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--output", help="write results as JSON to this path")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DATABASE_URL"] = f"sqlite:///{tmp}/bench_plans.db"
+        bootstrap_env()
+        report(asyncio.run(run(args.plans, args.requests, args.concurrency)), args.output)
+
+
+if __name__ == "__main__":
+    main()
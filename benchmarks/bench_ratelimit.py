@@ -0,0 +1,175 @@
+"""
+Cost of the per-client rate limiter.
+
+  hit()           ns per call for the in-process buckets and the Redis script
+  memory          bytes per active key in the in-process backend (tracemalloc)
+  middleware      GET latency on a rate-limited route without RateLimitMiddleware,
+                  and with it on each backend (in-process via httpx's ASGI transport)
+
+It also checks behaviour: the request after the burst gets 429 with
+Retry-After, idle buckets are evicted once they would be full again, and two
+limiters sharing Redis (as two workers would) share one budget.
+
+The Redis backend uses --redis-url when given, otherwise fakeredis if it is
+installed, otherwise it is skipped.
+
+    python -m benchmarks.bench_ratelimit --calls 100000 --keys 100000 --requests 5000
+"""
+import argparse
+import asyncio
+import time
+import tracemalloc
+
+from benchmarks.common import bootstrap_env, report, summarize
+
+ROUTE = "/api/v1/checkout/bench"
+
+
+def redis_client(url: str | None):
+    if url:
+        from redis.asyncio import Redis
+
+        return Redis.from_url(url)
+    try:
+        from fakeredis import FakeAsyncRedis
+    except ImportError:
+        return None
+    return FakeAsyncRedis()
+
+
+async def per_hit(name: str, limiter, calls: int) -> dict:
+    start = time.perf_counter()
+    for i in range(calls):
+        await limiter.hit(f"bench|ip:{i % 1000}", 1e9, 10**9)
+    elapsed = time.perf_counter() - start
+    return {"name": name, "calls": calls, "ns_per_call": round(elapsed / calls * 1e9, 1)}
+
+
+async def memory_per_key(keys: int) -> dict:
+    from app.core.ratelimit import MemoryRateLimiter
+
+    limiter = MemoryRateLimiter(maxsize=keys)
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    # A slow refill keeps every bucket alive until the count is taken
+    for i in range(keys):
+        await limiter.hit(f"/api/v1/checkout|ip:10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}", 0.001, 20)
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return {"name": "MemoryRateLimiter memory", "keys": len(limiter), "bytes_per_key": round(used / keys, 1)}
+
+
+async def check_idle_eviction() -> dict:
+    from app.core.ratelimit import MemoryRateLimiter
+
+    limiter = MemoryRateLimiter(maxsize=1_000_000)
+    # Each bucket is full again 0.5s after its only hit
+    for i in range(10_000):
+        await limiter.hit(f"idle|ip:{i}", 2.0, 1)
+    active = len(limiter)
+    await asyncio.sleep(0.6)
+    await limiter.hit("idle|ip:new", 2.0, 1)
+    assert len(limiter) == 1, len(limiter)
+    return {"name": "idle eviction", "keys_before": active, "keys_after": len(limiter), "evicted_while_active": limiter.evictions}
+
+
+async def check_shared_budget(client) -> dict:
+    from app.core.ratelimit import RedisRateLimiter
+
+    workers = [RedisRateLimiter(client, "bench:shared"), RedisRateLimiter(client, "bench:shared")]
+    allowed = 0
+    for i in range(20):
+        if await workers[i % 2].hit("login|ip:1.2.3.4", 0.01, 5) == 0:
+            allowed += 1
+    assert allowed == 5, allowed
+    return {"name": "shared budget across 2 workers", "burst": 5, "attempts": 20, "allowed": allowed}
+
+
+def build_app(limiter, limits):
+    from fastapi import FastAPI
+    from app.core.ratelimit import RateLimitMiddleware
+
+    app = FastAPI()
+
+    @app.get(ROUTE)
+    async def route():
+        return {"status": "ok"}
+
+    if limiter is not None:
+        app.add_middleware(RateLimitMiddleware, limits=limits, limiter=limiter)
+    return app
+
+
+async def drive(app, total: int) -> tuple[list[float], float]:
+    import httpx
+
+    latencies: list[float] = []
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        start = time.perf_counter()
+        for _ in range(total):
+            begin = time.perf_counter()
+            response = await client.get(ROUTE)
+            assert response.status_code == 200, response.status_code
+            latencies.append(time.perf_counter() - begin)
+    return latencies, time.perf_counter() - start
+
+
+async def check_rejection(limiter) -> dict:
+    import httpx
+
+    app = build_app(limiter, {"/api/v1/checkout": (0.5, 3)})
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        statuses = [(await client.get(ROUTE)) for _ in range(4)]
+    assert [r.status_code for r in statuses] == [200, 200, 200, 429], [r.status_code for r in statuses]
+    retry_after = statuses[-1].headers["Retry-After"]
+    assert retry_after == "2", retry_after
+    return {"name": f"429 after burst ({type(limiter).__name__})", "statuses": [r.status_code for r in statuses], "retry_after": retry_after}
+
+
+async def run(calls: int, keys: int, total: int, redis_url: str | None) -> list[dict]:
+    from app.core.ratelimit import MemoryRateLimiter, RedisRateLimiter
+
+    client = redis_client(redis_url)
+    backends = {"memory": lambda prefix: MemoryRateLimiter()}
+    if client is not None:
+        await client.flushdb()
+        backends["redis"] = lambda prefix: RedisRateLimiter(client, prefix)
+
+    results = []
+    for name, make in backends.items():
+        results.append(await per_hit(f"{name} hit()", make("bench:hit"), calls))
+    results.append(await memory_per_key(keys))
+    results.append(await check_idle_eviction())
+    for name, make in backends.items():
+        results.append(await check_rejection(make("bench:reject")))
+    if client is not None:
+        results.append(await check_shared_budget(client))
+
+    # A limit no benchmark client reaches, so every request pays for a bucket update and passes
+    limits = {"/api/v1/checkout": (1e9, 10**9)}
+    latencies, elapsed = await drive(build_app(None, limits), total)
+    results.append(summarize(f"GET {ROUTE} without RateLimitMiddleware", latencies, elapsed))
+    for name, make in backends.items():
+        latencies, elapsed = await drive(build_app(make("bench:mw"), limits), total)
+        results.append(summarize(f"GET {ROUTE} with RateLimitMiddleware ({name})", latencies, elapsed))
+
+    if client is not None:
+        await client.aclose()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=100000)
+    parser.add_argument("--keys", type=int, default=100000, help="distinct keys for the memory measurement")
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--redis-url", help="Redis to benchmark against instead of fakeredis")
+    parser.add_argument("--output", help="write results as JSON to this path")
+    args = parser.parse_args()
+
+    bootstrap_env()
+    report(asyncio.run(run(args.calls, args.keys, args.requests, args.redis_url)), args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+PayMongo client behaviour under injected upstream faults.
+
+Drives PayMongoClient GETs against the mock server and compares a plain
+client (no retries, no hedging, breaker effectively off) with the resilient
+configuration in three scenarios:
+
+  flaky   a fraction of calls return 500; retries recover them
+  tail    a fraction of calls are slow; hedged GETs cut the tail
+  outage  every call fails; the breaker stops sending load upstream
+
+    python -m benchmarks.bench_resilience --requests 500 --concurrency 20
+"""
+import argparse
+import asyncio
+import time
+
+import httpx
+
+from benchmarks.common import bootstrap_env, report, summarize
+from benchmarks import mock_paymongo
+
+
+async def set_faults(base_url: str, **faults) -> int:
+    """Apply faults and return the mock's request count so far."""
+    async with httpx.AsyncClient() as admin:
+        response = await admin.post(base_url.removesuffix("/v1") + "/__faults", json=faults)
+        return response.json()["requests"]
+
+
+async def drive(client, path: str, total: int, concurrency: int) -> tuple[list[float], float, dict]:
+    from app.core.resilience import CircuitOpenError
+
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: list[float] = []
+    outcomes = {"ok": 0, "error": 0, "rejected": 0}
+
+    async def call():
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                response = await client.get(path, endpoint="checkout.retrieve", hedge=True)
+                outcomes["ok" if response.status_code == 200 else "error"] += 1
+            except CircuitOpenError:
+                outcomes["rejected"] += 1
+            except httpx.HTTPError:
+                outcomes["error"] += 1
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(call() for _ in range(total)))
+    return latencies, time.perf_counter() - start, outcomes
+
+
+async def run(base_url: str, total: int, concurrency: int, hedge_delay: float) -> list[dict]:
+    from app.core.paymongo import PayMongoClient
+    from app.core.resilience import CircuitBreaker, RetryBudget
+
+    def plain():
+        return PayMongoClient(base_url, "x", max_retries=0, breaker=CircuitBreaker(failure_threshold=10**9))
+
+    def resilient():
+        return PayMongoClient(
+            base_url,
+            "x",
+            max_retries=2,
+            retry_base_delay=0.02,
+            retry_budget=RetryBudget(ratio=0.2, min_per_second=5),
+            breaker=CircuitBreaker(failure_threshold=5, reset_timeout=1.0),
+            hedge_delay=hedge_delay,
+        )
+
+    await set_faults(base_url, error_rate=0, slow_rate=0)
+    async with httpx.AsyncClient() as setup:
+        created = await setup.post(f"{base_url}/checkout_sessions", json={"data": {"attributes": {"line_items": []}}})
+    path = f"/checkout_sessions/{created.json()['data']['id']}"
+
+    scenarios = [
+        ("flaky (20% 500s)", {"error_rate": 0.2, "slow_rate": 0}),
+        ("tail (5% +1s)", {"error_rate": 0, "slow_rate": 0.05}),
+        ("outage (100% 500s)", {"error_rate": 1.0, "slow_rate": 0}),
+    ]
+    results = []
+    for scenario, faults in scenarios:
+        for label, factory in (("plain", plain), ("resilient", resilient)):
+            client = factory()
+            await client.start()
+            before = await set_faults(base_url, **faults)
+            latencies, elapsed, outcomes = await drive(client, path, total, concurrency)
+            upstream_calls = await set_faults(base_url) - before
+            await client.close()
+            results.append(summarize(
+                f"{scenario}: {label}",
+                latencies,
+                elapsed,
+                upstream_calls=upstream_calls,
+                **outcomes,
+                client=client.stats(),
+            ))
+    await set_faults(base_url, error_rate=0, slow_rate=0)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.02, help="mock base latency in seconds")
+    parser.add_argument("--hedge-delay", type=float, default=0.1)
+    parser.add_argument("--output", help="write results as JSON to this path")
+    args = parser.parse_args()
+
+    bootstrap_env()
+    with mock_paymongo.spawn(latency=args.latency, slow_latency=1.0) as base_url:
+        results = asyncio.run(run(base_url, args.requests, args.concurrency, args.hedge_delay))
+    report(results, args.output)
+
+
+if __name__ == "__main__":
+    main()
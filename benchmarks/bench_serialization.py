@@ -0,0 +1,153 @@
+"""
+Response serialization cost for large payloads, per route shape.
+
+Each payload is served by a throwaway FastAPI app in several ways and
+driven in-process through httpx's ASGI transport:
+
+  stdlib          returned as-is: jsonable_encoder + stdlib json (the old default)
+  orjson          returned as-is through ORJSONResponse (jsonable_encoder still runs)
+  response_model  ORJSONResponse with a response_model, so Pydantic's compiled serializer runs
+  passthrough     PayMongo proxy body returned as the upstream bytes
+  decode+encode   PayMongo proxy body decoded and re-encoded, as the proxy routes used to
+
+    python -m benchmarks.bench_serialization --items 1000 --requests 200
+"""
+import argparse
+import asyncio
+import json
+import time
+from datetime import datetime, timedelta
+
+from benchmarks.common import bootstrap_env, report, summarize
+
+
+class PlanRow:
+    """Stands in for a PricingPlan ORM row."""
+
+    def __init__(self, i: int):
+        self.id = i
+        self.name = f"plan-{i}"
+        self.description = "Benchmark plan " * 4
+        self.price = 100.0 + i
+        self.is_active = True
+        self.max_users = 5
+        self.billing_cycle = 1
+
+
+def paymongo_list(items: int) -> bytes:
+    """A PayMongo list response of checkout_session resources."""
+    now = int(time.time())
+    return json.dumps({"data": [
+        {
+            "id": f"cs_{i:024d}",
+            "type": "checkout_session",
+            "attributes": {
+                "checkout_url": f"https://checkout.paymongo.com/cs_{i:024d}",
+                "line_items": [{"amount": 10000 + i, "currency": "PHP", "name": "Item", "quantity": 1}],
+                "payment_method_types": ["gcash", "paymaya", "grab_pay", "card", "qrph"],
+                "reference_number": f"Ref-{i:010d}",
+                "status": "active",
+                "livemode": False,
+                "payments": [],
+                "created_at": now,
+                "updated_at": now,
+            },
+        }
+        for i in range(items)
+    ]}).encode()
+
+
+def aggregate_rows(items: int) -> list[dict]:
+    start = datetime(2025, 1, 1)
+    return [
+        {"event_type": f"type.{i % 7}", "day": (start + timedelta(days=i // 7)).date(), "count": i, "amount": i * 100}
+        for i in range(items)
+    ]
+
+
+def build_app(items: int):
+    from fastapi import FastAPI, Response
+    from fastapi.responses import JSONResponse, ORJSONResponse
+    from app.schemas.paymongo import PayMongoList
+    from app.schemas.pricing_plan import PricingPlanOut
+    from app.schemas.webhook import EventAggregate
+
+    plans = [PlanRow(i) for i in range(items)]
+    plan_dicts = [vars(plan) for plan in plans]
+    aggregate = {"group_by": "type_day", "data": aggregate_rows(items)}
+    upstream = paymongo_list(items)
+    app = FastAPI()
+
+    @app.get("/plans/stdlib", response_class=JSONResponse)
+    async def plans_stdlib():
+        return plan_dicts
+
+    @app.get("/plans/orjson", response_class=ORJSONResponse)
+    async def plans_orjson():
+        return plan_dicts
+
+    @app.get("/plans/response_model", response_class=ORJSONResponse, response_model=list[PricingPlanOut])
+    async def plans_model():
+        return plans
+
+    @app.get("/aggregate/stdlib", response_class=JSONResponse)
+    async def aggregate_stdlib():
+        return aggregate
+
+    @app.get("/aggregate/orjson", response_class=ORJSONResponse)
+    async def aggregate_orjson():
+        return aggregate
+
+    @app.get("/aggregate/response_model", response_class=ORJSONResponse, response_model=EventAggregate)
+    async def aggregate_model():
+        return aggregate
+
+    @app.get("/proxy/decode+encode", response_class=JSONResponse)
+    async def proxy_decode():
+        return json.loads(upstream)
+
+    @app.get("/proxy/passthrough", response_model=PayMongoList)
+    async def proxy_passthrough():
+        return Response(content=upstream, media_type="application/json")
+
+    return app
+
+
+async def run(items: int, total: int) -> list[dict]:
+    import httpx
+
+    app = build_app(items)
+    paths = [route.path for route in app.routes if route.path.startswith(("/plans/", "/aggregate/", "/proxy/"))]
+    results = []
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        for path in paths:
+            response = await client.get(path)
+            assert response.status_code == 200, (path, response.status_code)
+            latencies = []
+            start = time.perf_counter()
+            for _ in range(total):
+                begin = time.perf_counter()
+                await client.get(path)
+                latencies.append(time.perf_counter() - begin)
+            results.append(summarize(
+                f"GET {path} ({items} items)",
+                latencies,
+                time.perf_counter() - start,
+                body_bytes=len(response.content),
+            ))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=1000, help="rows per response")
+    parser.add_argument("--requests", type=int, default=200, help="requests per route")
+    parser.add_argument("--output", help="write results as JSON to this path")
+    args = parser.parse_args()
+
+    bootstrap_env()
+    report(asyncio.run(run(args.items, args.requests)), args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Cold-start cost: import time and time to first request.
+
+Every measurement runs in a fresh interpreter:
+
+  import app.main     python -c "import app.main"
+  first request       spawn uvicorn, poll GET /health until it answers 200
+
+--events seeds processed_events first, so the webhook dedup filter has real
+history to load at startup, as a long-running deployment would.
+
+    python -m benchmarks.bench_startup --runs 5 --events 200000
+"""
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from benchmarks.common import bootstrap_env, report
+
+
+def time_import(module: str) -> float:
+    code = f"import time; t = time.perf_counter(); import {module}; print(time.perf_counter() - t)"
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def time_first_request(host: str = "127.0.0.1") -> float:
+    with socket.socket() as sock:
+        sock.bind((host, 0))
+        port = sock.getsockname()[1]
+    url = f"http://{host}:{port}/health"
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", host, "--port", str(port), "--log-level", "warning"],
+        stdout=subprocess.DEVNULL,
+    )
+    try:
+        while True:
+            try:
+                if httpx.get(url, timeout=1).status_code == 200:
+                    return time.perf_counter() - start
+            except httpx.HTTPError:
+                pass
+            if process.poll() is not None:
+                raise RuntimeError("app server exited during startup")
+            time.sleep(0.005)
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+
+
+def seed_events(count: int):
+    from datetime import datetime
+    from sqlalchemy import create_engine, insert
+    from app.db.init_db import init_db
+    from app.models.processed_event import ProcessedEvent
+
+    init_db()
+    engine = create_engine(os.environ["DATABASE_URL"])
+    now = datetime.utcnow()
+    with engine.begin() as conn:
+        for offset in range(0, count, 10_000):
+            conn.execute(insert(ProcessedEvent), [
+                {"event_id": f"evt_startup_{i}", "processed_at": now}
+                for i in range(offset, min(count, offset + 10_000))
+            ])
+    engine.dispose()
+
+
+def stats(name: str, samples: list[float], **extra) -> dict:
+    return {
+        "name": name,
+        "runs": len(samples),
+        "median_ms": round(statistics.median(samples) * 1000, 1),
+        "min_ms": round(min(samples) * 1000, 1),
+        "max_ms": round(max(samples) * 1000, 1),
+        **extra,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--events", type=int, default=0, help="processed_events rows to seed")
+    parser.add_argument("--output", help="write results as JSON to this path")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DATABASE_URL"] = f"sqlite:///{tmp}/bench_startup.db"
+        bootstrap_env()
+        if args.events:
+            seed_events(args.events)
+        results = [
+            stats("import app.main", [time_import("app.main") for _ in range(args.runs)]),
+            stats("uvicorn start to first request", [time_first_request() for _ in range(args.runs)], events=args.events),
+        ]
+    report(results, args.output)
+
+
+if __name__ == "__main__":
+    main()
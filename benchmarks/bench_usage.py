@@ -0,0 +1,154 @@
+"""
+Usage metering throughput and memory bound.
+
+  add()      events/sec folded into the in-memory sums, no I/O
+  flush()    rollup rows/sec written by one flush
+  ingest     POST /api/v1/usage/events in batches (in-process via httpx's
+             ASGI transport) with the periodic flusher running, reporting
+             events/sec and the most sums held in memory at once
+
+Events spread over --subscriptions subscriptions, 4 metrics and --hours
+hourly buckets. After ingest the rollup totals are checked against what
+was sent.
+
+    python -m benchmarks.bench_usage --events 200000 --batch 1000 --max-pending 20000
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import tempfile
+import time
+
+from benchmarks.common import bootstrap_env, report, summarize
+
+METRICS = ("api_calls", "storage_mb", "emails", "seats")
+
+
+def make_events(count: int, subscriptions: int, hours: int, start: float) -> list[tuple[int, str, int, float]]:
+    rng = random.Random(7)
+    return [
+        (rng.randint(1, subscriptions), rng.choice(METRICS), rng.randint(1, 5), start + rng.random() * hours * 3600)
+        for _ in range(count)
+    ]
+
+
+async def seed(subscriptions: int) -> str:
+    from datetime import datetime
+    from sqlalchemy import insert
+    from app.core.security import create_access_token
+    from app.db.init_db import init_db
+    from app.db.session import AsyncSessionLocal
+    from app.models.pricing_plan import PricingPlan
+    from app.models.subscription import Subscription
+    from app.models.user import User
+
+    init_db()
+    now = datetime.utcnow()
+    async with AsyncSessionLocal() as db:
+        db.add(User(id=1, email="usage@example.com", password="unused", is_active=True))
+        db.add(PricingPlan(id=1, name="Usage", price=100, max_users=10, billing_cycle="monthly"))
+        await db.flush()
+        await db.execute(insert(Subscription), [
+            {"id": i, "user_id": 1, "plan_id": 1, "status": "active", "current_period_start": now, "current_period_end": now}
+            for i in range(1, subscriptions + 1)
+        ])
+        await db.commit()
+    return create_access_token({"sub": "usage@example.com"})
+
+
+async def rollup_total() -> int:
+    from sqlalchemy import func, select
+    from app.db.session import AsyncSessionLocal
+    from app.models.usage import UsageRollup
+
+    async with AsyncSessionLocal() as db:
+        return int(await db.scalar(select(func.coalesce(func.sum(UsageRollup.quantity), 0))))
+
+
+async def run(count: int, batch: int, subscriptions: int, hours: int) -> list[dict]:
+    import httpx
+    from app.db.session import dispose_engines
+    from app.main import app
+    from app.workers.usage import UsageAggregator, usage_aggregator
+
+    token = await seed(subscriptions)
+    start_ts = time.time() - hours * 3600
+    events = make_events(count, subscriptions, hours, start_ts)
+    results = []
+
+    aggregator = UsageAggregator(max_pending_keys=10**9)
+    begin = time.perf_counter()
+    await aggregator.add(events)
+    elapsed = time.perf_counter() - begin
+    results.append({"name": "UsageAggregator.add", "events": count, "keys": len(aggregator), "events_per_s": round(count / elapsed)})
+
+    keys = len(aggregator)
+    begin = time.perf_counter()
+    await aggregator.flush()
+    elapsed = time.perf_counter() - begin
+    results.append({"name": "UsageAggregator.flush (insert)", "rows": keys, "rows_per_s": round(keys / elapsed)})
+    await aggregator.add(events)
+    begin = time.perf_counter()
+    await aggregator.flush()
+    elapsed = time.perf_counter() - begin
+    results.append({"name": "UsageAggregator.flush (update)", "rows": keys, "rows_per_s": round(keys / elapsed)})
+    baseline = await rollup_total()
+
+    bodies = [
+        json.dumps([
+            {"subscription_id": s, "metric": m, "quantity": q, "timestamp": ts}
+            for s, m, q, ts in events[offset:offset + batch]
+        ]).encode()
+        for offset in range(0, count, batch)
+    ]
+    latencies: list[float] = []
+    peak_pending = 0
+    async with app.router.lifespan_context(app):
+        headers = {"Authorization": f"Bearer {token}", "Content-Type": "application/json"}
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+            begin = time.perf_counter()
+            for body in bodies:
+                started = time.perf_counter()
+                response = await client.post("/api/v1/usage/events", content=body, headers=headers)
+                assert response.status_code == 202, response.text
+                latencies.append(time.perf_counter() - started)
+                peak_pending = max(peak_pending, len(usage_aggregator))
+            elapsed = time.perf_counter() - begin
+    # Shutdown flushed what was left
+    sent = sum(q for _, _, q, _ in events)
+    flushed = await rollup_total() - baseline
+    await dispose_engines()
+    assert flushed == sent, (flushed, sent)
+    results.append(summarize(
+        f"POST /api/v1/usage/events x{batch}",
+        latencies,
+        elapsed,
+        events_per_s=round(count / elapsed),
+        peak_pending_keys=peak_pending,
+        max_pending_keys=usage_aggregator.max_pending_keys,
+        totals_match=True,
+    ))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=200000)
+    parser.add_argument("--batch", type=int, default=1000)
+    parser.add_argument("--subscriptions", type=int, default=1000)
+    parser.add_argument("--hours", type=int, default=24, help="hourly buckets the events spread over")
+    parser.add_argument("--max-pending", type=int, default=20000, help="USAGE_MAX_PENDING_KEYS for the ingest run")
+    parser.add_argument("--database-url", help="defaults to a throwaway SQLite file")
+    parser.add_argument("--output", help="write results as JSON to this path")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{tmp}/bench_usage.db"
+        bootstrap_env(USAGE_MAX_PENDING_KEYS=args.max_pending, USAGE_FLUSH_INTERVAL=1.0, WEBHOOK_WORKER_ENABLED="false")
+        report(asyncio.run(run(args.events, args.batch, args.subscriptions, args.hours)), args.output)
+
+
+if __name__ == "__main__":
+    main()
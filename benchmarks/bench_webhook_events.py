@@ -0,0 +1,147 @@
+"""
+Stored webhook event listing and aggregation over a large synthetic history.
+
+Seeds --events rows into webhook_events (default 1M), serves the app with
+uvicorn and reports, per request, time-to-first-byte, total time, bytes
+received and the process's peak RSS while the request ran. The app and
+this client share the process, so the RSS figure is an upper bound for the
+server side.
+
+    python -m benchmarks.bench_webhook_events --events 1000000
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import resource
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from benchmarks.common import bootstrap_env, report, serve_app
+
+EVENT_TYPES = ("payment.paid", "payment.failed", "payment.refunded", "checkout_session.payment.paid")
+
+
+def seed(total: int, days: int = 90, chunk: int = 50_000):
+    from sqlalchemy import insert
+    from app.db.init_db import init_db
+    from app.db.session import get_engine
+    from app.models.webhook_event import WebhookEvent
+
+    init_db()
+    rng = random.Random(7)
+    start = datetime(2025, 1, 1)
+    step = timedelta(days=days) / total
+    with get_engine().begin() as conn:
+        for offset in range(0, total, chunk):
+            rows = []
+            for i in range(offset, min(total, offset + chunk)):
+                event_type = EVENT_TYPES[i % len(EVENT_TYPES)]
+                amount = rng.randint(100, 500_000)
+                payload = json.dumps({
+                    "data": {"id": f"evt_{i}", "attributes": {"type": event_type, "data": {"attributes": {"amount": amount}}}}
+                }).encode()
+                received_at = start + step * i
+                rows.append({
+                    "event_id": f"evt_{i}",
+                    "event_type": event_type,
+                    "payload": payload,
+                    "amount": amount,
+                    "status": "done",
+                    "available_at": received_at,
+                    "received_at": received_at,
+                    "processed_at": received_at,
+                })
+            conn.execute(insert(WebhookEvent), rows)
+
+
+def rss_kb() -> tuple[int, int]:
+    """(current, peak) resident set size in KiB."""
+    try:
+        with open("/proc/self/status") as fh:
+            fields = dict(line.split(":", 1) for line in fh)
+        return int(fields["VmRSS"].split()[0]), int(fields["VmHWM"].split()[0])
+    except OSError:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak, peak
+
+
+def reset_peak_rss():
+    # Linux only: restarts VmHWM from the current RSS
+    try:
+        with open("/proc/self/clear_refs", "w") as fh:
+            fh.write("5")
+    except OSError:
+        pass
+
+
+async def measure(client, name: str, path: str, params: dict) -> dict:
+    reset_peak_rss()
+    before, _ = rss_kb()
+    received = 0
+    first_byte = None
+    start = time.perf_counter()
+    async with client.stream("GET", path, params=params) as response:
+        assert response.status_code == 200, response.status_code
+        async for chunk in response.aiter_raw():
+            if first_byte is None:
+                first_byte = time.perf_counter() - start
+            received += len(chunk)
+    elapsed = time.perf_counter() - start
+    _, peak = rss_kb()
+    return {
+        "name": name,
+        "ttfb_ms": round((first_byte or elapsed) * 1000, 3),
+        "elapsed_s": round(elapsed, 4),
+        "bytes": received,
+        "rss_before_mb": round(before / 1024, 1),
+        "peak_rss_mb": round(peak / 1024, 1),
+    }
+
+
+async def run(base_url: str) -> list[dict]:
+    import httpx
+
+    cases = [
+        ("NDJSON export, all events", "/api/v1/webhooks/events", {"format": "ndjson"}),
+        ("JSON export, all events", "/api/v1/webhooks/events", {}),
+        ("JSON page of 100, one type", "/api/v1/webhooks/events", {"event_type": "payment.paid", "limit": 100}),
+        ("NDJSON, one type, 7-day range", "/api/v1/webhooks/events", {
+            "format": "ndjson", "event_type": "payment.paid", "since": "2025-02-01", "until": "2025-02-08",
+        }),
+        ("aggregate by type and day", "/api/v1/webhooks/events/aggregate", {"group_by": "type_day"}),
+        ("aggregate by day, one type", "/api/v1/webhooks/events/aggregate", {"group_by": "day", "event_type": "payment.paid"}),
+    ]
+    results = []
+    async with httpx.AsyncClient(base_url=base_url, timeout=None) as client:
+        for name, path, params in cases:
+            results.append(await measure(client, name, path, params))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=1_000_000)
+    parser.add_argument("--output", help="write results as JSON to this path")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DATABASE_URL"] = f"sqlite:///{tmp}/bench_events.db"
+        bootstrap_env(WEBHOOK_WORKER_ENABLED=False)
+        start = time.perf_counter()
+        seed(args.events)
+        seeded = {"name": "seed", "events": args.events, "elapsed_s": round(time.perf_counter() - start, 2)}
+
+        from app.main import app
+        server, app_url = serve_app(app)
+        try:
+            results = asyncio.run(run(app_url))
+        finally:
+            server.should_exit = True
+        report([seeded, *results], args.output)
+
+
+if __name__ == "__main__":
+    main()
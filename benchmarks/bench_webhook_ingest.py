@@ -0,0 +1,121 @@
+"""
+Webhook ack latency under a steady event rate.
+
+Posts synthetic payment.paid events to /api/v1/webhooks/payment-webhooks at a
+fixed arrival rate (open loop, so slow acks do not slow the sender), with
+the inbox workers running in the same process, then waits for the inbox
+to drain.
+
+    python -m benchmarks.bench_webhook_ingest --rate 1000 --seconds 5
+"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+
+from benchmarks.common import WEBHOOK_SECRET, bootstrap_env, report, summarize
+
+
+def make_event(i: int) -> bytes:
+    return json.dumps({
+        "data": {
+            "id": f"evt_bench_{i}",
+            "type": "event",
+            "attributes": {
+                "type": "payment.paid",
+                "livemode": False,
+                "data": {
+                    "id": f"pay_bench_{i}",
+                    "type": "payment",
+                    "attributes": {
+                        "amount": 10000 + i,
+                        "currency": "PHP",
+                        "status": "paid",
+                        "billing": {"email": f"user{i}@example.com", "name": "Bench User"},
+                    },
+                },
+            },
+        }
+    }).encode()
+
+
+async def run(rate: int, seconds: float) -> list[dict]:
+    import httpx
+    from sqlalchemy import func, select
+    from app.core.config import settings
+    from app.core.webhook_signature import sign_payload
+    from app.db.init_db import init_db
+    from app.db.session import AsyncSessionLocal
+    from app.main import app
+    from app.models.webhook_event import WebhookEvent
+
+    init_db()
+    total = int(rate * seconds)
+    bodies = [make_event(i) for i in range(total)]
+    latencies: list[float] = []
+    failures = 0
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            async def send(body: bytes):
+                nonlocal failures
+                start = time.perf_counter()
+                response = await client.post(
+                    "/api/v1/webhooks/payment-webhooks",
+                    content=body,
+                    headers={"content-type": "application/json", "paymongo-signature": sign_payload(WEBHOOK_SECRET, body)},
+                )
+                if response.status_code != 200:
+                    failures += 1
+                latencies.append(time.perf_counter() - start)
+
+            tasks = []
+            start = time.perf_counter()
+            for i, body in enumerate(bodies):
+                delay = start + i / rate - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                tasks.append(asyncio.create_task(send(body)))
+            await asyncio.gather(*tasks)
+            elapsed = time.perf_counter() - start
+
+            drain_start = time.perf_counter()
+            while settings.WEBHOOK_WORKER_ENABLED:
+                async with AsyncSessionLocal() as db:
+                    pending = (await db.execute(
+                        select(func.count()).select_from(WebhookEvent).where(WebhookEvent.status != "done")
+                    )).scalar_one()
+                if not pending:
+                    break
+                await asyncio.sleep(0.1)
+            drain = time.perf_counter() - drain_start
+
+    return [summarize(
+        f"webhook ack @ {rate}/s",
+        latencies,
+        elapsed,
+        target_rate=rate,
+        failures=failures,
+        drain_after_last_ack_s=round(drain, 3),
+    )]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rate", type=int, default=1000, help="events per second")
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--database-url", help="defaults to a throwaway SQLite file")
+    parser.add_argument("--output", help="write results as JSON to this path")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{tmp}/bench_webhooks.db"
+        bootstrap_env(WEBHOOK_POLL_INTERVAL=0.2)
+        report(asyncio.run(run(args.rate, args.seconds)), args.output)
+
+
+if __name__ == "__main__":
+    main()
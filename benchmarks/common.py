@@ -0,0 +1,77 @@
+"""Shared helpers for the benchmark scripts."""
+import json
+import os
+import socket
+import sys
+import threading
+import time
+
+# Webhook secret the benchmarks configure the app with and sign their events with
+WEBHOOK_SECRET = "whsk_bench"
+
+
+def bootstrap_env(**overrides):
+    """Provide the settings the app requires so benchmarks run without a .env file."""
+    defaults = {
+        "DATABASE_URL": "sqlite:///./bench.db",
+        "PAYMONGO_PUBLIC_KEY": "pk_test_bench",
+        "PAYMONGO_SECRET_KEY": "sk_test_bench",
+        "PAYMONGO_TOKEN": "c2tfdGVzdF9iZW5jaDo=",
+        "PAYMONGO_WEBHOOK_SECRETS": json.dumps([WEBHOOK_SECRET]),
+        # Every benchmark client shares one IP; bench_ratelimit measures the limiter itself
+        "RATE_LIMIT_ENABLED": "false",
+    }
+    defaults.update(overrides)
+    for key, value in defaults.items():
+        os.environ.setdefault(key, str(value))
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(name: str, latencies: list[float], elapsed: float, **extra) -> dict:
+    """Latencies and elapsed are in seconds; the summary reports milliseconds."""
+    result = {
+        "name": name,
+        "requests": len(latencies),
+        "elapsed_s": round(elapsed, 4),
+        "rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+    }
+    result.update(extra)
+    return result
+
+
+def report(results: list[dict], output: str | None = None, meta: dict | None = None):
+    """Print results as JSON and optionally save them; `meta` wraps them as {"meta", "results"}."""
+    text = json.dumps(results if meta is None else {"meta": meta, "results": results}, indent=2)
+    if output:
+        with open(output, "w") as fh:
+            fh.write(text + "\n")
+    sys.stdout.write(text + "\n")
+
+
+def serve_app(app) -> tuple[object, str]:
+    """
+    Serve an ASGI app with uvicorn on a background thread and return
+    (server, base_url); set server.should_exit to stop it. Use this rather
+    than httpx's ASGI transport when streaming matters, since the transport
+    buffers whole responses.
+    """
+    import uvicorn
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", access_log=False))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server, f"http://127.0.0.1:{port}"
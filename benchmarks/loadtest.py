@@ -0,0 +1,282 @@
+"""
+End-to-end load test of the service against a local mock PayMongo.
+
+Starts the mock PayMongo server and the app (uvicorn, one process) as child
+processes, seeds users and plans, then runs each scenario with a fixed
+number of concurrent clients:
+
+  login     login storm: POST /auth/login with valid credentials (bcrypt bound)
+  plans     plan catalog reads: 1 in 5 lists the catalog, the rest fetch one plan
+  checkout  checkout burst: POST /checkout/create, each with its own Idempotency-Key
+  webhooks  webhook flood: POST /webhooks/payment-webhooks with unique events
+
+Each scenario reports throughput, p50/p95/p99 latency, status codes and the
+app process's CPU time and RSS. Results are written as JSON together with
+the git commit, so two runs can be diffed:
+
+    python -m benchmarks.loadtest --output before.json
+    python -m benchmarks.loadtest --output after.json --latency 0.05 --error-rate 0.01
+    python -m benchmarks.loadtest --compare before.json after.json
+
+--database-url runs against another database (e.g. PostgreSQL); it must be
+a scratch database, since the app's tables are dropped and recreated.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timezone
+
+import httpx
+
+from benchmarks import mock_paymongo
+from benchmarks.bench_webhook_ingest import make_event
+from benchmarks.common import WEBHOOK_SECRET, bootstrap_env, report, summarize
+
+SCENARIOS = ("login", "plans", "checkout", "webhooks")
+PASSWORD = "bench-password"
+
+
+class ProcessStats:
+    """CPU time and memory of a child process, read from /proc (Linux only; None elsewhere)."""
+
+    def __init__(self, pid: int):
+        self.pid = pid
+        self.ticks = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+
+    def cpu_seconds(self) -> float | None:
+        try:
+            with open(f"/proc/{self.pid}/stat") as fh:
+                fields = fh.read().rsplit(")", 1)[1].split()
+        except OSError:
+            return None
+        # utime and stime are fields 14 and 15 of the full line
+        return (int(fields[11]) + int(fields[12])) / self.ticks
+
+    def memory_mb(self) -> dict:
+        memory = {"rss_mb": None, "peak_rss_mb": None}
+        try:
+            with open(f"/proc/{self.pid}/status") as fh:
+                for line in fh:
+                    if line.startswith("VmRSS:"):
+                        memory["rss_mb"] = round(int(line.split()[1]) / 1024, 1)
+                    elif line.startswith("VmHWM:"):
+                        memory["peak_rss_mb"] = round(int(line.split()[1]) / 1024, 1)
+        except OSError:
+            pass
+        return memory
+
+
+def seed(users: int, plans: int):
+    """Recreate the schema and insert benchmark users and plans."""
+    from sqlalchemy import text
+    from app.core.security import hash_password
+    from app.db.init_db import init_db
+    from app.db.session import Base, SessionLocal, get_engine
+    from app.models.pricing_plan import PricingPlan
+    from app.models.user import User
+
+    engine = get_engine()
+    Base.metadata.drop_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(text("DROP TABLE IF EXISTS alembic_version"))
+    init_db()
+    hashed = hash_password(PASSWORD)
+    with SessionLocal() as db:
+        db.add_all(User(email=f"load{i}@example.com", password=hashed) for i in range(users))
+        db.add_all(
+            PricingPlan(name=f"plan-{i}", price=100 + i, description="Load test plan", billing_cycle="1")
+            for i in range(plans)
+        )
+        db.commit()
+    engine.dispose()
+
+
+def start_app(env: dict, host: str = "127.0.0.1") -> tuple[subprocess.Popen, str]:
+    with socket.socket() as sock:
+        sock.bind((host, 0))
+        port = sock.getsockname()[1]
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", host, "--port", str(port),
+         "--log-level", "warning", "--no-access-log"],
+        env=env,
+        stdout=subprocess.DEVNULL,
+    )
+    url = f"http://{host}:{port}"
+    deadline = time.monotonic() + 30
+    while True:
+        try:
+            if httpx.get(f"{url}/health", timeout=1).status_code == 200:
+                return process, url
+        except httpx.HTTPError:
+            pass
+        if time.monotonic() > deadline or process.poll() is not None:
+            process.terminate()
+            raise RuntimeError("app server did not start")
+        time.sleep(0.1)
+
+
+def scenario_requests(name: str, users: int, plans: int):
+    """Endless generator of (method, path, request kwargs) for a scenario."""
+    counter = itertools.count()
+    if name == "login":
+        for i in counter:
+            yield "POST", "/api/v1/auth/login", {"data": {"username": f"load{i % users}@example.com", "password": PASSWORD}}
+    elif name == "plans":
+        for i in counter:
+            path = "/api/v1/plan/" if i % 5 == 0 else f"/api/v1/plan/{i % plans + 1}"
+            yield "GET", path, {}
+    elif name == "checkout":
+        for i in counter:
+            body = {"amount": 100 + i % 900, "description": f"Load test order {i}", "quantity": 1}
+            yield "POST", "/api/v1/checkout/create", {"json": body, "headers": {"Idempotency-Key": uuid.uuid4().hex}}
+    elif name == "webhooks":
+        from app.core.webhook_signature import sign_payload
+
+        run_id = uuid.uuid4().hex[:8]
+        for i in counter:
+            body = make_event(i).replace(b"evt_bench_", f"evt_{run_id}_".encode())
+            headers = {"content-type": "application/json", "paymongo-signature": sign_payload(WEBHOOK_SECRET, body)}
+            yield "POST", "/api/v1/webhooks/payment-webhooks", {"content": body, "headers": headers}
+    else:
+        raise ValueError(f"unknown scenario {name!r}")
+
+
+async def run_scenario(url: str, name: str, total: int, concurrency: int, stats: ProcessStats, users: int, plans: int) -> dict:
+    # One shared iterator, so the workers together send exactly `total` requests
+    requests = itertools.islice(scenario_requests(name, users, plans), total)
+    latencies: list[float] = []
+    statuses: dict[str, int] = {}
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=60) as client:
+        async def worker():
+            for method, path, kwargs in requests:
+                start = time.perf_counter()
+                try:
+                    status = str((await client.request(method, path, **kwargs)).status_code)
+                except httpx.HTTPError as exc:
+                    status = type(exc).__name__
+                latencies.append(time.perf_counter() - start)
+                statuses[status] = statuses.get(status, 0) + 1
+
+        cpu_before = stats.cpu_seconds()
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+        cpu_after = stats.cpu_seconds()
+
+    cpu = round(cpu_after - cpu_before, 3) if cpu_before is not None and cpu_after is not None else None
+    return summarize(
+        name,
+        latencies,
+        elapsed,
+        concurrency=concurrency,
+        statuses=dict(sorted(statuses.items())),
+        cpu_s=cpu,
+        cpu_pct=round(cpu / elapsed * 100, 1) if cpu is not None and elapsed else None,
+        **stats.memory_mb(),
+    )
+
+
+def git_revision() -> dict:
+    def git(*args) -> str:
+        try:
+            return subprocess.run(["git", *args], capture_output=True, text=True, check=True).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return ""
+    return {"commit": git("rev-parse", "HEAD") or None, "dirty": bool(git("status", "--porcelain", "--untracked-files=no"))}
+
+
+def compare(before_path: str, after_path: str):
+    """Print per-scenario changes between two result files."""
+    with open(before_path) as fh:
+        before = {r["name"]: r for r in json.load(fh)["results"]}
+    with open(after_path) as fh:
+        after = {r["name"]: r for r in json.load(fh)["results"]}
+    rows = []
+    for name, new in after.items():
+        old = before.get(name)
+        if old is None:
+            continue
+        row = {"name": name}
+        for key in ("rps", "p50_ms", "p95_ms", "p99_ms", "cpu_s", "peak_rss_mb"):
+            if old.get(key) is not None and new.get(key) is not None:
+                change = (new[key] - old[key]) / old[key] * 100 if old[key] else 0.0
+                row[key] = f"{old[key]} -> {new[key]} ({change:+.1f}%)"
+        rows.append(row)
+    report(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="comma-separated subset of " + ", ".join(SCENARIOS))
+    parser.add_argument("--requests", type=int, default=2000, help="requests per scenario")
+    parser.add_argument("--login-requests", type=int, default=200, help="requests for the bcrypt-bound login scenario")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--plans", type=int, default=200)
+    parser.add_argument("--database-url", help="scratch database to use; defaults to a throwaway SQLite file")
+    parser.add_argument("--latency", type=float, default=0.02, help="mock PayMongo base latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.01, help="mock PayMongo extra uniform latency in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of mock PayMongo calls answered with 500")
+    parser.add_argument("--slow-rate", type=float, default=0.0, help="fraction of mock PayMongo calls delayed by --slow-latency")
+    parser.add_argument("--slow-latency", type=float, default=1.0)
+    parser.add_argument("--output", help="write results as JSON to this path")
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"), help="diff two result files and exit")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+    scenarios = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    faults = {
+        "latency": args.latency,
+        "jitter": args.jitter,
+        "error_rate": args.error_rate,
+        "slow_rate": args.slow_rate,
+        "slow_latency": args.slow_latency,
+    }
+    with tempfile.TemporaryDirectory() as tmp, mock_paymongo.spawn(**faults) as mock_url:
+        os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{tmp}/loadtest.db"
+        os.environ["PAYMONGO_BASE_URL"] = mock_url
+        bootstrap_env()
+        seed(args.users, args.plans)
+
+        process, url = start_app(dict(os.environ))
+        try:
+            stats = ProcessStats(process.pid)
+            results = []
+            for name in scenarios:
+                total = args.login_requests if name == "login" else args.requests
+                results.append(asyncio.run(
+                    run_scenario(url, name, total, args.concurrency, stats, args.users, args.plans)
+                ))
+        finally:
+            process.terminate()
+            process.wait(timeout=30)
+
+    meta = {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        **git_revision(),
+        "python": platform.python_version(),
+        "database": os.environ["DATABASE_URL"].split(":", 1)[0],
+        "mock_paymongo": faults,
+        "concurrency": args.concurrency,
+    }
+    report(results, args.output, meta=meta)
+
+
+if __name__ == "__main__":
+    main()
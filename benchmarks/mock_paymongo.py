@@ -0,0 +1,329 @@
+"""
+Local stand-in for the PayMongo REST API used by the benchmarks.
+
+Serves the subset of /v1 endpoints the app calls, with configurable latency,
+jitter, error rate and slow-request tail so upstream behaviour can be
+reproduced without network access:
+
+    python -m benchmarks.mock_paymongo --port 8099 --latency 0.05
+
+Faults can be changed while the server runs, e.g. to simulate an outage:
+
+    curl -X POST localhost:8099/__faults -d '{"error_rate": 1.0}'
+"""
+import argparse
+import asyncio
+import contextlib
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+import uuid
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+
+FAULTS = ("latency", "jitter", "error_rate", "slow_rate", "slow_latency")
+
+
+class MockPayMongo:
+    def __init__(
+        self,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        slow_rate: float = 0.0,
+        slow_latency: float = 1.0,
+        seed: int | None = None,
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.slow_rate = slow_rate  # fraction of requests that take slow_latency extra
+        self.slow_latency = slow_latency
+        self.random = random.Random(seed)
+        self.checkout_sessions: dict[str, dict] = {}
+        self.plans: dict[str, dict] = {}
+        self.idempotent_responses: dict[str, dict] = {}  # Idempotency-Key -> first response body
+        self.webhooks: dict[str, dict] = {}
+        self.request_count = 0
+        self.app = Starlette(routes=[
+            Route("/v1/checkout_sessions", self.create_checkout_session, methods=["POST"]),
+            Route("/v1/checkout_sessions/{session_id}", self.retrieve_checkout_session, methods=["GET"]),
+            Route("/v1/checkout_sessions/{session_id}/expire", self.expire_checkout_session, methods=["POST"]),
+            Route("/v1/subscriptions/plans", self.create_plan, methods=["POST"]),
+            Route("/v1/subscriptions/plans", self.list_plans, methods=["GET"]),
+            Route("/v1/subscriptions/plans/{plan_id}", self.retrieve_plan, methods=["GET"]),
+            Route("/v1/subscriptions/plans/{plan_id}", self.update_plan, methods=["PUT"]),
+            Route("/v1/webhooks", self.create_webhook, methods=["POST"]),
+            Route("/v1/webhooks", self.list_webhooks, methods=["GET"]),
+            Route("/v1/webhooks/{webhook_id}", self.webhook_detail, methods=["GET", "POST", "PUT"]),
+            Route("/v1/webhooks/{webhook_id}/enable", self.webhook_detail, methods=["PUT", "POST"]),
+            Route("/__faults", self.faults, methods=["GET", "POST"]),
+        ])
+        self._server: uvicorn.Server | None = None
+        self._thread: threading.Thread | None = None
+        self.url = ""
+
+    # -- fault injection -------------------------------------------------
+
+    async def _delay(self):
+        self.request_count += 1
+        delay = self.latency + (self.random.uniform(0, self.jitter) if self.jitter else 0.0)
+        if self.slow_rate > 0 and self.random.random() < self.slow_rate:
+            delay += self.slow_latency
+        if delay:
+            await asyncio.sleep(delay)
+
+    def _should_fail(self) -> bool:
+        return self.error_rate > 0 and self.random.random() < self.error_rate
+
+    def _error(self):
+        return JSONResponse(
+            {"errors": [{"code": "internal_error", "detail": "Injected failure"}]},
+            status_code=500,
+        )
+
+    async def faults(self, request: Request):
+        """GET shows the current faults; POST a JSON object to change any of them."""
+        if request.method == "POST":
+            changes = await request.json()
+            for name in FAULTS:
+                if name in changes:
+                    setattr(self, name, float(changes[name]))
+        return JSONResponse({name: getattr(self, name) for name in FAULTS} | {"requests": self.request_count})
+
+    def _not_found(self, resource: str):
+        return JSONResponse(
+            {"errors": [{"code": "resource_not_found", "detail": f"No such {resource}"}]},
+            status_code=404,
+        )
+
+    # -- checkout sessions -----------------------------------------------
+
+    async def create_checkout_session(self, request: Request):
+        await self._delay()
+        if self._should_fail():
+            return self._error()
+        body = await request.json()
+        attributes = body["data"]["attributes"]
+        session_id = f"cs_{uuid.uuid4().hex[:24]}"
+        resource = {
+            "id": session_id,
+            "type": "checkout_session",
+            "attributes": {
+                **attributes,
+                "checkout_url": f"https://checkout.paymongo.com/{session_id}",
+                "status": "active",
+                "livemode": False,
+                "payments": [],
+                "created_at": int(time.time()),
+                "updated_at": int(time.time()),
+            },
+        }
+        self.checkout_sessions[session_id] = resource
+        return JSONResponse({"data": resource})
+
+    async def retrieve_checkout_session(self, request: Request):
+        await self._delay()
+        if self._should_fail():
+            return self._error()
+        resource = self.checkout_sessions.get(request.path_params["session_id"])
+        if resource is None:
+            return self._not_found("checkout_session")
+        return JSONResponse({"data": resource})
+
+    async def expire_checkout_session(self, request: Request):
+        await self._delay()
+        if self._should_fail():
+            return self._error()
+        resource = self.checkout_sessions.get(request.path_params["session_id"])
+        if resource is None:
+            return self._not_found("checkout_session")
+        resource["attributes"]["status"] = "expired"
+        return JSONResponse({"data": resource})
+
+    # -- subscription plans ----------------------------------------------
+
+    async def create_plan(self, request: Request):
+        await self._delay()
+        if self._should_fail():
+            return self._error()
+        # A repeated Idempotency-Key gets the first answer back instead of a second plan
+        key = request.headers.get("idempotency-key")
+        if key and key in self.idempotent_responses:
+            return JSONResponse(self.idempotent_responses[key])
+        body = await request.json()
+        plan_id = f"plan_{uuid.uuid4().hex[:24]}"
+        now = int(time.time())
+        resource = {
+            "id": plan_id,
+            "type": "plan",
+            "attributes": {**body["data"]["attributes"], "created_at": now, "updated_at": now},
+        }
+        self.plans[plan_id] = resource
+        if key:
+            self.idempotent_responses[key] = {"data": resource}
+        return JSONResponse({"data": resource})
+
+    async def retrieve_plan(self, request: Request):
+        await self._delay()
+        if self._should_fail():
+            return self._error()
+        resource = self.plans.get(request.path_params["plan_id"])
+        if resource is None:
+            return self._not_found("plan")
+        return JSONResponse({"data": resource})
+
+    async def update_plan(self, request: Request):
+        await self._delay()
+        if self._should_fail():
+            return self._error()
+        resource = self.plans.get(request.path_params["plan_id"])
+        if resource is None:
+            return self._not_found("plan")
+        body = await request.json()
+        resource["attributes"].update(body["data"]["attributes"], updated_at=int(time.time()))
+        return JSONResponse({"data": resource})
+
+    async def list_plans(self, request: Request):
+        """
+        Cursor pagination like PayMongo's: ?limit=&after=<id>, answered with
+        has_more. updated_at[gte]=<unix time> keeps plans changed since then,
+        and plans with no updated_at.
+        """
+        await self._delay()
+        if self._should_fail():
+            return self._error()
+        limit = min(max(int(request.query_params.get("limit", 10)), 1), 100)
+        plans = list(self.plans.values())
+        since = request.query_params.get("updated_at[gte]")
+        if since:
+            plans = [plan for plan in plans if (plan["attributes"].get("updated_at") or int(since)) >= int(since)]
+        after = request.query_params.get("after")
+        if after:
+            ids = [plan["id"] for plan in plans]
+            plans = plans[ids.index(after) + 1:] if after in ids else []
+        return JSONResponse({"data": plans[:limit], "has_more": len(plans) > limit})
+
+    # -- webhooks --------------------------------------------------------
+
+    async def create_webhook(self, request: Request):
+        await self._delay()
+        if self._should_fail():
+            return self._error()
+        body = await request.json()
+        webhook_id = f"hook_{uuid.uuid4().hex[:24]}"
+        resource = {
+            "id": webhook_id,
+            "type": "webhook",
+            "attributes": {**body["data"]["attributes"], "status": "enabled"},
+        }
+        self.webhooks[webhook_id] = resource
+        return JSONResponse({"data": resource})
+
+    async def list_webhooks(self, request: Request):
+        await self._delay()
+        if self._should_fail():
+            return self._error()
+        return JSONResponse({"data": list(self.webhooks.values())})
+
+    async def webhook_detail(self, request: Request):
+        await self._delay()
+        if self._should_fail():
+            return self._error()
+        resource = self.webhooks.get(request.path_params["webhook_id"])
+        if resource is None:
+            return self._not_found("webhook")
+        if request.method == "PUT" and not request.url.path.endswith("/enable"):
+            body = await request.json()
+            resource["attributes"].update(body["data"]["attributes"])
+        return JSONResponse({"data": resource})
+
+    # -- lifecycle -------------------------------------------------------
+
+    def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        """Serve the mock on a background thread and return its /v1 base URL."""
+        config = uvicorn.Config(self.app, host=host, port=port, log_level="warning", access_log=False)
+        self._server = uvicorn.Server(config)
+        self._thread = threading.Thread(target=self._server.run, daemon=True)
+        self._thread.start()
+        while not self._server.started:
+            time.sleep(0.01)
+        bound_port = self._server.servers[0].sockets[0].getsockname()[1]
+        self.url = f"http://{host}:{bound_port}/v1"
+        return self.url
+
+    def stop(self):
+        if self._server is not None:
+            self._server.should_exit = True
+            self._thread.join(timeout=5)
+            self._server = None
+
+
+@contextlib.contextmanager
+def spawn(
+    latency: float = 0.0,
+    jitter: float = 0.0,
+    error_rate: float = 0.0,
+    slow_rate: float = 0.0,
+    slow_latency: float = 1.0,
+    host: str = "127.0.0.1",
+):
+    """
+    Run the mock in a child process so it does not share the benchmark's GIL.
+    Yields the /v1 base URL; faults can be changed through POST /__faults.
+    """
+    with socket.socket() as sock:
+        sock.bind((host, 0))
+        port = sock.getsockname()[1]
+    process = subprocess.Popen([
+        sys.executable, "-m", "benchmarks.mock_paymongo",
+        "--host", host, "--port", str(port),
+        "--latency", str(latency), "--jitter", str(jitter), "--error-rate", str(error_rate),
+        "--slow-rate", str(slow_rate), "--slow-latency", str(slow_latency),
+    ])
+    try:
+        deadline = time.monotonic() + 15
+        while True:
+            try:
+                socket.create_connection((host, port), timeout=0.2).close()
+                break
+            except OSError:
+                if time.monotonic() > deadline or process.poll() is not None:
+                    raise RuntimeError("mock PayMongo server did not start")
+                time.sleep(0.05)
+        yield f"http://{host}:{port}/v1"
+    finally:
+        process.terminate()
+        process.wait(timeout=5)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a local mock PayMongo API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--latency", type=float, default=0.0, help="base latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.0, help="extra uniform latency in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with 500")
+    parser.add_argument("--slow-rate", type=float, default=0.0, help="fraction of requests delayed by --slow-latency")
+    parser.add_argument("--slow-latency", type=float, default=1.0, help="extra latency of slow requests in seconds")
+    args = parser.parse_args()
+    mock = MockPayMongo(
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        slow_rate=args.slow_rate,
+        slow_latency=args.slow_latency,
+    )
+    uvicorn.run(mock.app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+from logging.config import fileConfig
+from alembic import context
+from app.db.init_db import Base  # imports every model, so the metadata is complete
+from app.db.session import get_engine
+
+config = context.config
+target_metadata = Base.metadata
+
+# Only when run from the alembic CLI; the app configures its own logging
+if config.config_file_name is not None and config.attributes.get("connection") is None:
+    fileConfig(config.config_file_name, disable_existing_loggers=False)
+
+
+def configure(**options):
+    context.configure(
+        target_metadata=target_metadata,
+        compare_type=True,
+        # SQLite cannot ALTER most things; batch mode rebuilds the table instead
+        render_as_batch=True,
+        **options,
+    )
+
+
+def run_migrations_offline():
+    from app.core.config import settings
+
+    configure(url=settings.DATABASE_URL, literal_binds=True, dialect_opts={"paramstyle": "named"})
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online():
+    # app.db.init_db passes its own connection (sync, or the async engine's via run_sync)
+    connection = config.attributes.get("connection")
+    if connection is not None:
+        configure(connection=connection)
+        with context.begin_transaction():
+            context.run_migrations()
+        return
+    with get_engine().connect() as connection:
+        configure(connection=connection)
+        with context.begin_transaction():
+            context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
@@ -0,0 +1,169 @@
+"""initial schema
+
+The schema create_all built before migrations were introduced. Databases it
+built are upgraded from here too, keeping the tables they already have.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18 07:51:08.438926
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def create_index_if_missing(name, table, columns, unique=False):
+    if name not in {index["name"] for index in sa.inspect(op.get_bind()).get_indexes(table)}:
+        op.create_index(name, table, columns, unique=unique)
+
+
+def upgrade():
+    # A database create_all built before there were migrations has some of these tables
+    # already (at first only pricing_plans): those are kept and only what is missing is added.
+    tables = set(sa.inspect(op.get_bind()).get_table_names())
+    if 'checkout_sessions' not in tables:
+        op.create_table('checkout_sessions',
+        sa.Column('id', sa.String(), nullable=False),
+        sa.Column('reference_number', sa.String(), nullable=True),
+        sa.Column('status', sa.String(), nullable=False),
+        sa.Column('amount', sa.Integer(), nullable=False),
+        sa.Column('currency', sa.String(), nullable=False),
+        sa.Column('description', sa.String(), nullable=True),
+        sa.Column('checkout_url', sa.String(), nullable=True),
+        sa.Column('payment_intent_id', sa.String(), nullable=True),
+        sa.Column('payload', sa.LargeBinary(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+        )
+    create_index_if_missing('ix_checkout_sessions_created_at_id', 'checkout_sessions', ['created_at', 'id'])
+    create_index_if_missing('ix_checkout_sessions_reference_number', 'checkout_sessions', ['reference_number'])
+    create_index_if_missing('ix_checkout_sessions_status_created_at_id', 'checkout_sessions', ['status', 'created_at', 'id'])
+    if 'invoice_jobs' not in tables:
+        op.create_table('invoice_jobs',
+        sa.Column('id', sa.String(), nullable=False),
+        sa.Column('status', sa.String(), nullable=False),
+        sa.Column('period_start', sa.DateTime(), nullable=False),
+        sa.Column('period_end', sa.DateTime(), nullable=False),
+        sa.Column('total', sa.Integer(), nullable=False),
+        sa.Column('processed', sa.Integer(), nullable=False),
+        sa.Column('csv_path', sa.String(), nullable=True),
+        sa.Column('pdf_dir', sa.String(), nullable=True),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('started_at', sa.DateTime(), nullable=True),
+        sa.Column('finished_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+        )
+    if 'pricing_plans' not in tables:
+        op.create_table('pricing_plans',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(), nullable=True),
+        sa.Column('price', sa.Float(), nullable=False),
+        sa.Column('description', sa.String(), nullable=True),
+        sa.Column('is_active', sa.Boolean(), nullable=True),
+        sa.Column('max_users', sa.Integer(), nullable=False),
+        sa.Column('billing_cycle', sa.String(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+        )
+    create_index_if_missing('ix_pricing_plans_id', 'pricing_plans', ['id'])
+    create_index_if_missing('ix_pricing_plans_name', 'pricing_plans', ['name'], unique=True)
+    if 'processed_events' not in tables:
+        op.create_table('processed_events',
+        sa.Column('event_id', sa.String(), nullable=False),
+        sa.Column('processed_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('event_id')
+        )
+    create_index_if_missing('ix_processed_events_processed_at', 'processed_events', ['processed_at'])
+    if 'users' not in tables:
+        op.create_table('users',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('email', sa.String(), nullable=True),
+        sa.Column('password', sa.String(), nullable=False),
+        sa.Column('is_active', sa.Boolean(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+        )
+    create_index_if_missing('ix_users_email', 'users', ['email'], unique=True)
+    create_index_if_missing('ix_users_id', 'users', ['id'])
+    if 'webhook_events' not in tables:
+        op.create_table('webhook_events',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('event_id', sa.String(), nullable=True),
+        sa.Column('event_type', sa.String(), nullable=False),
+        sa.Column('payload', sa.LargeBinary(), nullable=False),
+        sa.Column('amount', sa.Integer(), nullable=True),
+        sa.Column('status', sa.String(), nullable=False),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('available_at', sa.DateTime(), nullable=False),
+        sa.Column('locked_until', sa.DateTime(), nullable=True),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.Column('received_at', sa.DateTime(), nullable=False),
+        sa.Column('processed_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+        )
+    elif 'amount' not in {column['name'] for column in sa.inspect(op.get_bind()).get_columns('webhook_events')}:
+        # Built before webhook events recorded their amount
+        op.add_column('webhook_events', sa.Column('amount', sa.Integer(), nullable=True))
+    create_index_if_missing('ix_webhook_events_event_id', 'webhook_events', ['event_id'])
+    create_index_if_missing('ix_webhook_events_id', 'webhook_events', ['id'])
+    create_index_if_missing('ix_webhook_events_status_available_at', 'webhook_events', ['status', 'available_at'])
+    create_index_if_missing('ix_webhook_events_type_id', 'webhook_events', ['event_type', 'id'])
+    create_index_if_missing('ix_webhook_events_type_received_at_amount', 'webhook_events', ['event_type', 'received_at', 'amount'])
+    if 'subscriptions' not in tables:
+        op.create_table('subscriptions',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('plan_id', sa.Integer(), nullable=False),
+        sa.Column('status', sa.String(), nullable=False),
+        sa.Column('current_period_start', sa.DateTime(), nullable=False),
+        sa.Column('current_period_end', sa.DateTime(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('canceled_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['plan_id'], ['pricing_plans.id'], ),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('id')
+        )
+    create_index_if_missing('ix_subscriptions_id', 'subscriptions', ['id'])
+    create_index_if_missing('ix_subscriptions_user_id_status', 'subscriptions', ['user_id', 'status'])
+    if 'usage_rollups' not in tables:
+        op.create_table('usage_rollups',
+        sa.Column('subscription_id', sa.Integer(), nullable=False),
+        sa.Column('metric', sa.String(), nullable=False),
+        sa.Column('bucket_start', sa.DateTime(), nullable=False),
+        sa.Column('quantity', sa.BigInteger(), nullable=False),
+        sa.Column('events', sa.Integer(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['subscription_id'], ['subscriptions.id'], ),
+        sa.PrimaryKeyConstraint('subscription_id', 'metric', 'bucket_start')
+        )
+
+
+def downgrade():
+    op.drop_table('usage_rollups')
+    op.drop_index('ix_subscriptions_user_id_status', table_name='subscriptions')
+    op.drop_index(op.f('ix_subscriptions_id'), table_name='subscriptions')
+    op.drop_table('subscriptions')
+    op.drop_index('ix_webhook_events_type_received_at_amount', table_name='webhook_events')
+    op.drop_index('ix_webhook_events_type_id', table_name='webhook_events')
+    op.drop_index('ix_webhook_events_status_available_at', table_name='webhook_events')
+    op.drop_index(op.f('ix_webhook_events_id'), table_name='webhook_events')
+    op.drop_index(op.f('ix_webhook_events_event_id'), table_name='webhook_events')
+    op.drop_table('webhook_events')
+    op.drop_index(op.f('ix_users_id'), table_name='users')
+    op.drop_index(op.f('ix_users_email'), table_name='users')
+    op.drop_table('users')
+    op.drop_index(op.f('ix_processed_events_processed_at'), table_name='processed_events')
+    op.drop_table('processed_events')
+    op.drop_index(op.f('ix_pricing_plans_name'), table_name='pricing_plans')
+    op.drop_index(op.f('ix_pricing_plans_id'), table_name='pricing_plans')
+    op.drop_table('pricing_plans')
+    op.drop_table('invoice_jobs')
+    op.drop_index('ix_checkout_sessions_status_created_at_id', table_name='checkout_sessions')
+    op.drop_index(op.f('ix_checkout_sessions_reference_number'), table_name='checkout_sessions')
+    op.drop_index('ix_checkout_sessions_created_at_id', table_name='checkout_sessions')
+    op.drop_table('checkout_sessions')
@@ -0,0 +1,56 @@
+"""plan outbox and PayMongo plan links
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 07:51:25.005802
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # create_all may have built any of this already, before there were migrations
+    inspector = sa.inspect(op.get_bind())
+    if 'plan_outbox' not in inspector.get_table_names():
+        op.create_table('plan_outbox',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('plan_id', sa.Integer(), nullable=False),
+        sa.Column('operation', sa.String(), nullable=False),
+        sa.Column('payload', sa.LargeBinary(), nullable=False),
+        sa.Column('status', sa.String(), nullable=False),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('available_at', sa.DateTime(), nullable=False),
+        sa.Column('locked_until', sa.DateTime(), nullable=True),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('processed_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['plan_id'], ['pricing_plans.id'], ),
+        sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index(op.f('ix_plan_outbox_id'), 'plan_outbox', ['id'], unique=False)
+        op.create_index(op.f('ix_plan_outbox_plan_id'), 'plan_outbox', ['plan_id'], unique=False)
+        op.create_index('ix_plan_outbox_status_available_at', 'plan_outbox', ['status', 'available_at'], unique=False)
+    if 'paymongo_plan_id' not in {column['name'] for column in inspector.get_columns('pricing_plans')}:
+        with op.batch_alter_table('pricing_plans', schema=None) as batch_op:
+            batch_op.add_column(sa.Column('paymongo_plan_id', sa.String(), nullable=True))
+            # Existing plans are unlinked; the plan reconciler links or re-creates them
+            batch_op.add_column(sa.Column('sync_status', sa.String(), nullable=False, server_default='pending'))
+            batch_op.create_unique_constraint('uq_pricing_plans_paymongo_plan_id', ['paymongo_plan_id'])
+
+
+def downgrade():
+    with op.batch_alter_table('pricing_plans', schema=None) as batch_op:
+        batch_op.drop_constraint('uq_pricing_plans_paymongo_plan_id', type_='unique')
+        batch_op.drop_column('sync_status')
+        batch_op.drop_column('paymongo_plan_id')
+
+    op.drop_index('ix_plan_outbox_status_available_at', table_name='plan_outbox')
+    op.drop_index(op.f('ix_plan_outbox_plan_id'), table_name='plan_outbox')
+    op.drop_index(op.f('ix_plan_outbox_id'), table_name='plan_outbox')
+    op.drop_table('plan_outbox')
@@ -0,0 +1,49 @@
+"""index cleanup and hot-path indexes
+
+Drops the redundant ix_<table>_id indexes that index=True on primary keys
+created (the primary key is already indexed), and adds indexes for the
+invoice job list, plan subscribers and open plan outbox rows.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 07:52:05.628287
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+
+OPEN_OUTBOX_ROWS = sa.text("status IN ('pending', 'processing')")
+
+
+def index_names(table):
+    return {index["name"] for index in sa.inspect(op.get_bind()).get_indexes(table)}
+
+
+def upgrade():
+    # A database create_all built from later models may have these changes already
+    for table in ("users", "pricing_plans", "subscriptions", "webhook_events", "plan_outbox"):
+        if f"ix_{table}_id" in index_names(table):
+            op.drop_index(f"ix_{table}_id", table_name=table)
+    if "ix_invoice_jobs_created_at" not in index_names("invoice_jobs"):
+        op.create_index("ix_invoice_jobs_created_at", "invoice_jobs", ["created_at"])
+    if "ix_subscriptions_plan_id" not in index_names("subscriptions"):
+        op.create_index("ix_subscriptions_plan_id", "subscriptions", ["plan_id"])
+    if "uq_plan_outbox_open_plan_id" not in index_names("plan_outbox"):
+        op.create_index(
+            "uq_plan_outbox_open_plan_id", "plan_outbox", ["plan_id"], unique=True,
+            postgresql_where=OPEN_OUTBOX_ROWS, sqlite_where=OPEN_OUTBOX_ROWS,
+        )
+
+
+def downgrade():
+    op.drop_index("uq_plan_outbox_open_plan_id", table_name="plan_outbox")
+    op.drop_index("ix_subscriptions_plan_id", table_name="subscriptions")
+    op.drop_index("ix_invoice_jobs_created_at", table_name="invoice_jobs")
+    for table in ("users", "pricing_plans", "subscriptions", "webhook_events", "plan_outbox"):
+        op.create_index(f"ix_{table}_id", table, ["id"])
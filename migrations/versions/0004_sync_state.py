@@ -0,0 +1,29 @@
+"""sync state
+
+High-water marks for incremental syncs from PayMongo (the plan catalog).
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 08:05:14.581861
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('sync_state',
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('high_water', sa.Integer(), nullable=True),
+    sa.Column('last_run_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('name')
+    )
+
+
+def downgrade():
+    op.drop_table('sync_state')
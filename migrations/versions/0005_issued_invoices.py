@@ -0,0 +1,35 @@
+"""issued invoices
+
+Invoices issued by invoice jobs, so a later run skips what was billed already.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 09:12:40.318207
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('issued_invoices',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('source', sa.String(), nullable=False),
+    sa.Column('source_id', sa.String(), nullable=False),
+    sa.Column('billed_at', sa.DateTime(), nullable=False),
+    sa.Column('job_id', sa.String(), nullable=False),
+    sa.Column('issued_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('source', 'source_id', 'billed_at', name='uq_issued_invoices_source')
+    )
+    op.create_index('ix_issued_invoices_job_id', 'issued_invoices', ['job_id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_issued_invoices_job_id', table_name='issued_invoices')
+    op.drop_table('issued_invoices')
@@ -0,0 +1,59 @@
+import os
+import tempfile
+
+# Settings are read when app modules are imported, so the environment is set first
+_tmp = tempfile.mkdtemp(prefix="paymongo-fastapi-tests-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_tmp}/test.db")
+os.environ.setdefault("PAYMONGO_PUBLIC_KEY", "pk_test_tests")
+os.environ.setdefault("PAYMONGO_SECRET_KEY", "sk_test_tests")
+os.environ.setdefault("PAYMONGO_TOKEN", "c2tfdGVzdF90ZXN0czo=")
+os.environ.setdefault("PAYMONGO_WEBHOOK_SECRETS", '["whsk_tests"]')
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+os.environ.setdefault("PLAN_SYNC_INTERVAL", "0")
+os.environ.setdefault("PLAN_RECONCILE_INTERVAL", "0")
+
+import pytest
+
+
+@pytest.fixture(scope="session")
+def schema():
+    from app.db.init_db import init_db
+
+    init_db()
+
+
+@pytest.fixture
+async def db(schema):
+    """An empty, migrated database; the async engines are disposed afterwards, as each test has its own loop."""
+    from app.db.session import Base, dispose_engines, get_engine
+
+    with get_engine().begin() as conn:
+        for table in reversed(Base.metadata.sorted_tables):
+            conn.execute(table.delete())
+    yield
+    await dispose_engines()
+
+
+@pytest.fixture(scope="session")
+def mock_paymongo():
+    from benchmarks.mock_paymongo import MockPayMongo
+
+    mock = MockPayMongo()
+    mock.start()
+    yield mock
+    mock.stop()
+
+
+@pytest.fixture
+async def paymongo(mock_paymongo):
+    """A PayMongoClient talking to the mock, which is emptied and cleared of faults first."""
+    from app.core.paymongo import PayMongoClient
+
+    for store in (mock_paymongo.checkout_sessions, mock_paymongo.plans, mock_paymongo.idempotent_responses):
+        store.clear()
+    mock_paymongo.error_rate = 0.0
+    client = PayMongoClient(mock_paymongo.url, "c2tfdGVzdF90ZXN0czo=", http2=False, max_retries=0)
+    await client.start()
+    yield client
+    await client.close()
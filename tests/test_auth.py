@@ -0,0 +1,34 @@
+import httpx
+import pytest
+from fastapi import FastAPI
+from sqlalchemy import func, select
+
+from app.api.v1 import auth
+from app.db.session import get_engine
+from app.models.user import User
+
+
+@pytest.fixture
+async def client(db):
+    app = FastAPI()
+    app.include_router(auth.router, prefix="/api/v1/auth")
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        yield client
+
+
+def user_count() -> int:
+    with get_engine().connect() as conn:
+        return conn.execute(select(func.count()).select_from(User)).scalar_one()
+
+
+async def test_register_creates_user(client):
+    response = await client.post("/api/v1/auth/register", data={"username": "ana@example.com", "password": "secret"})
+    assert response.status_code == 200
+    assert response.json()["user"]["email"] == "ana@example.com"
+    assert user_count() == 1
+
+
+async def test_register_rejects_invalid_email_before_insert(client):
+    response = await client.post("/api/v1/auth/register", data={"username": "ana", "password": "secret"})
+    assert response.status_code == 422
+    assert user_count() == 0
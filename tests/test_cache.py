@@ -0,0 +1,59 @@
+import asyncio
+import fakeredis
+import pytest
+from app.core.cache import RedisCache
+
+
+async def eventually(condition, timeout: float = 2.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition():
+        assert asyncio.get_running_loop().time() < deadline, "condition not met in time"
+        await asyncio.sleep(0.01)
+
+
+@pytest.fixture
+async def workers():
+    """Two workers' caches on one Redis server, listening for invalidations."""
+    server = fakeredis.FakeServer()
+    clients = [fakeredis.FakeAsyncRedis(server=server) for _ in range(2)]
+    caches = [RedisCache("test:plans", ttl=60, client=client, local_ttl=60) for client in clients]
+    for cache in caches:
+        await cache.start()
+    # Wait for both subscriptions, or a message could be sent before anyone listens
+    for _ in range(200):
+        (_, subscribers), = await clients[0].pubsub_numsub(caches[0].channel)
+        if subscribers == 2:
+            break
+        await asyncio.sleep(0.01)
+    yield caches
+    for cache in caches:
+        await cache.close()
+    for client in clients:
+        await client.aclose()
+
+
+async def test_set_evicts_near_cache_on_other_workers(workers):
+    first, second = workers
+    await first.set("1", b"old")
+    assert await second.get("1") == b"old"
+    assert second.local.get("1") == b"old"
+
+    await first.set("1", b"new")
+
+    await eventually(lambda: second.local.get("1") is None)
+    assert await second.get("1") == b"new"
+
+
+async def test_delete_evicts_near_cache_on_other_workers(workers):
+    first, second = workers
+    await first.set("1", b"v1")
+    await first.set("2", b"v2")
+    assert await second.get("1") == b"v1"
+    assert await second.get("2") == b"v2"
+
+    await first.delete("1", "2")
+
+    await eventually(lambda: len(second.local) == 0)
+    assert await second.get("1") is None
+    assert await second.get("2") is None
+
@@ -0,0 +1,83 @@
+import uuid
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from app.api.v1 import checkout
+from app.core.paymongo import get_paymongo
+from app.db.session import AsyncSessionLocal
+from app.models.checkout_session import CheckoutSessionRecord, upsert_checkout_session
+
+
+@pytest.fixture
+def api(db, paymongo):
+    app = FastAPI()
+    app.include_router(checkout.router, prefix="/api/v1/checkout")
+    app.dependency_overrides[get_paymongo] = lambda: paymongo
+
+    def caller(address: str) -> httpx.AsyncClient:
+        transport = httpx.ASGITransport(app=app, client=(address, 50000))
+        return httpx.AsyncClient(transport=transport, base_url="http://test")
+
+    return caller
+
+
+async def create(client: httpx.AsyncClient, key: str) -> httpx.Response:
+    return await client.post(
+        "/api/v1/checkout/create", json={"amount": 100, "name": "Plan"}, headers={"Idempotency-Key": key}
+    )
+
+
+async def test_idempotency_key_replays_for_the_same_caller(api, mock_paymongo):
+    key = uuid.uuid4().hex
+    async with api("10.0.0.1") as alice:
+        first = await create(alice, key)
+        again = await create(alice, key)
+    assert first.status_code == again.status_code == 200
+    assert again.headers["Idempotent-Replayed"] == "true"
+    assert again.json()["response"]["data"]["id"] == first.json()["response"]["data"]["id"]
+    assert len(mock_paymongo.checkout_sessions) == 1
+
+
+async def test_idempotency_key_is_scoped_to_the_caller(api, mock_paymongo):
+    key = uuid.uuid4().hex
+    async with api("10.0.0.1") as alice, api("10.0.0.2") as bob:
+        mine = await create(alice, key)
+        theirs = await create(bob, key)
+    assert theirs.headers["Idempotent-Replayed"] == "false"
+    assert theirs.json()["response"]["data"]["id"] != mine.json()["response"]["data"]["id"]
+    assert len(mock_paymongo.checkout_sessions) == 2
+
+
+def checkout_resource(id: str, status: str, paid: bool = False) -> dict:
+    return {"id": id, "type": "checkout_session", "attributes": {
+        "status": status,
+        "payments": [{"id": "pay_1"}] if paid else [],
+        "line_items": [{"amount": 100, "quantity": 1, "currency": "PHP"}],
+    }}
+
+
+async def stored_status(id: str) -> str:
+    async with AsyncSessionLocal() as session:
+        return (await session.get(CheckoutSessionRecord, id)).status
+
+
+@pytest.mark.parametrize("late", ["active", "expired"])
+async def test_late_snapshots_do_not_downgrade_a_paid_session(db, late):
+    id = f"cs_{uuid.uuid4().hex}"
+    snapshots = [checkout_resource(id, "active"), checkout_resource(id, "active", paid=True), checkout_resource(id, late)]
+    for resource in snapshots:
+        async with AsyncSessionLocal() as session:
+            await upsert_checkout_session(session, resource)
+            await session.commit()
+    assert await stored_status(id) == "paid"
+
+
+async def test_expired_sessions_do_not_reactivate(db):
+    id = f"cs_{uuid.uuid4().hex}"
+    for status in ("expired", "active"):
+        async with AsyncSessionLocal() as session:
+            await upsert_checkout_session(session, checkout_resource(id, status))
+            await session.commit()
+    assert await stored_status(id) == "expired"
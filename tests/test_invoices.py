@@ -0,0 +1,123 @@
+import csv
+import os
+import uuid
+from datetime import datetime
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from app.api.v1 import invoices
+from app.core.config import settings
+from app.core.security import create_access_token
+from app.db.session import get_engine
+from app.models.checkout_session import CheckoutSessionRecord
+from app.models.invoice_job import InvoiceJob
+from app.models.pricing_plan import PricingPlan
+from app.models.subscription import Subscription, billing_cycles
+from app.models.user import User
+from app.workers.invoices import InvoiceGenerator
+
+FEBRUARY = datetime(2026, 2, 1), datetime(2026, 3, 1)
+
+
+def user_token(email: str) -> dict:
+    with get_engine().begin() as conn:
+        conn.execute(User.__table__.insert().values(email=email, password="x", is_active=True))
+    return {"Authorization": f"Bearer {create_access_token({'sub': email})}"}
+
+
+@pytest.fixture
+def operator(monkeypatch) -> str:
+    email = f"ops-{uuid.uuid4().hex[:8]}@example.com"
+    monkeypatch.setattr(settings, "OPERATOR_EMAILS", [email.upper()])
+    return email
+
+
+@pytest.fixture
+async def client(db, operator):
+    app = FastAPI()
+    app.include_router(invoices.router, prefix="/api/v1/invoices")
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        yield client
+
+
+async def test_invoice_routes_require_an_operator(client):
+    customer = user_token(f"customer-{uuid.uuid4().hex[:8]}@example.com")
+    assert (await client.get("/api/v1/invoices/jobs")).status_code == 401
+    assert (await client.get("/api/v1/invoices/jobs", headers=customer)).status_code == 403
+    assert (await client.post("/api/v1/invoices/jobs", json={}, headers=customer)).status_code == 403
+
+
+async def test_operators_can_list_invoice_jobs(client, operator):
+    response = await client.get("/api/v1/invoices/jobs", headers=user_token(operator))
+    assert response.status_code == 200
+    assert response.json() == []
+
+
+def test_billing_cycles_follow_the_creation_day():
+    created = datetime(2025, 10, 31)
+    assert billing_cycles(created, 1, None, *FEBRUARY) == [(datetime(2026, 2, 28), datetime(2026, 3, 31))]
+    assert billing_cycles(created, 3, None, *FEBRUARY) == []
+    assert billing_cycles(created, 1, datetime(2026, 2, 10), *FEBRUARY) == []
+    assert [billed for billed, _ in billing_cycles(created, 1, None, datetime(2026, 1, 1), datetime(2026, 4, 1))] == [
+        datetime(2026, 1, 31), datetime(2026, 2, 28), datetime(2026, 3, 31),
+    ]
+
+
+def subscription(id: int, plan_id: int, created_at: datetime, canceled_at: datetime | None = None) -> dict:
+    return {
+        "id": id, "user_id": 1, "plan_id": plan_id, "status": "canceled" if canceled_at else "active",
+        "current_period_start": created_at, "current_period_end": created_at,
+        "created_at": created_at, "canceled_at": canceled_at,
+    }
+
+
+@pytest.fixture
+def billing_data(db):
+    plans = PricingPlan.__table__
+    with get_engine().begin() as conn:
+        conn.execute(User.__table__.insert().values(id=1, email="ana@example.com", password="x", is_active=True))
+        conn.execute(plans.insert().values(id=1, name="Monthly", price=10.0, billing_cycle="1"))
+        conn.execute(plans.insert().values(id=2, name="Quarterly", price=25.0, billing_cycle="3"))
+        conn.execute(Subscription.__table__.insert(), [
+            subscription(1, plan_id=1, created_at=datetime(2026, 1, 15)),  # renews on February 15
+            subscription(2, plan_id=2, created_at=datetime(2025, 12, 10)),  # next renewal is March 10
+            # Canceled before its February 20 renewal
+            subscription(3, plan_id=1, created_at=datetime(2025, 11, 20), canceled_at=datetime(2026, 2, 1)),
+        ])
+        conn.execute(CheckoutSessionRecord.__table__.insert(), [
+            {"id": "cs_paid", "status": "paid", "amount": 5000, "payload": b"{}", "created_at": datetime(2026, 2, 5), "updated_at": datetime(2026, 2, 5)},
+            {"id": "cs_open", "status": "active", "amount": 5000, "payload": b"{}", "created_at": datetime(2026, 2, 6), "updated_at": datetime(2026, 2, 6)},
+        ])
+
+
+async def run_job(generator: InvoiceGenerator, period: tuple[datetime, datetime]) -> list[dict]:
+    job_id = uuid.uuid4().hex
+    with get_engine().begin() as conn:
+        conn.execute(InvoiceJob.__table__.insert().values(
+            id=job_id, status="pending", period_start=period[0], period_end=period[1], created_at=datetime.utcnow()
+        ))
+    count = await generator.run(job_id, *period)
+    with open(os.path.join(generator.output_dir, job_id, "invoices.csv"), newline="") as fh:
+        rows = list(csv.DictReader(fh))
+    with get_engine().connect() as conn:
+        assert conn.execute(InvoiceJob.__table__.select().where(InvoiceJob.id == job_id)).one().total == count
+    assert len(rows) == count
+    return rows
+
+
+async def test_invoice_runs_bill_renewals_once(billing_data, tmp_path):
+    generator = InvoiceGenerator(output_dir=str(tmp_path), workers=1, pdf_enabled=False)
+    try:
+        rows = await run_job(generator, FEBRUARY)
+        assert [(row["number"], row["period_start"], row["period_end"]) for row in rows] == [
+            ("INV-202602-cs_paid", "2026-02-05", "2026-02-05"),
+            ("INV-202602-SUB-1", "2026-02-15", "2026-03-15"),
+        ]
+        # Everything in February was invoiced already; March brings the renewals due then
+        assert await run_job(generator, FEBRUARY) == []
+        rows = await run_job(generator, (FEBRUARY[0], datetime(2026, 4, 1)))
+        assert [row["number"] for row in rows] == ["INV-202603-SUB-1", "INV-202603-SUB-2"]
+    finally:
+        await generator.shutdown()
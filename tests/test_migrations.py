@@ -0,0 +1,65 @@
+from alembic.autogenerate import compare_metadata
+from alembic.migration import MigrationContext
+from sqlalchemy import Boolean, Column, Float, Integer, MetaData, String, Table, create_engine, inspect, select
+
+from app.db.init_db import migrate
+from app.db.session import Base
+
+
+def baseline_schema(metadata: MetaData) -> Table:
+    """pricing_plans as the first release's init_db created it, the only table it made."""
+    return Table(
+        "pricing_plans", metadata,
+        Column("id", Integer, primary_key=True, index=True),
+        Column("name", String, unique=True, index=True),
+        Column("price", Float, nullable=False),
+        Column("description", String, nullable=True),
+        Column("is_active", Boolean, default=True),
+        Column("max_users", Integer, nullable=False, default=1),
+        Column("billing_cycle", String, nullable=False),
+    )
+
+
+def test_upgrades_a_database_built_by_the_first_release(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path}/baseline.db")
+    metadata = MetaData()
+    plans = baseline_schema(metadata)
+    metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(plans.insert().values(name="Pro", price=99.0, max_users=5, billing_cycle="monthly"))
+
+    with engine.begin() as conn:
+        migrate(conn)
+
+    with engine.connect() as conn:
+        assert set(Base.metadata.tables) <= set(inspect(conn).get_table_names())
+        assert "ix_pricing_plans_id" not in {index["name"] for index in inspect(conn).get_indexes("pricing_plans")}
+        row = conn.execute(select(Base.metadata.tables["pricing_plans"])).one()
+        assert (row.name, row.paymongo_plan_id, row.sync_status) == ("Pro", None, "pending")
+        diff = [change for change in compare_metadata(MigrationContext.configure(conn), Base.metadata)]
+        assert diff == []
+    engine.dispose()
+
+
+def test_upgrade_is_a_no_op_once_at_head(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path}/fresh.db")
+    with engine.begin() as conn:
+        migrate(conn)
+    with engine.begin() as conn:
+        migrate(conn)
+    with engine.connect() as conn:
+        assert compare_metadata(MigrationContext.configure(conn), Base.metadata) == []
+    engine.dispose()
+
+
+def test_upgrades_a_database_built_by_create_all_from_later_models(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path}/create_all.db")
+    before_migrations = [table for name, table in Base.metadata.tables.items() if name not in ("sync_state", "issued_invoices")]
+    Base.metadata.create_all(engine, tables=before_migrations)
+
+    with engine.begin() as conn:
+        migrate(conn)
+
+    with engine.connect() as conn:
+        assert compare_metadata(MigrationContext.configure(conn), Base.metadata) == []
+    engine.dispose()
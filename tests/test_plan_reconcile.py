@@ -0,0 +1,57 @@
+import orjson
+from sqlalchemy import select
+
+from app.db.session import get_engine
+from app.models.plan_outbox import PlanOutbox
+from app.models.pricing_plan import PricingPlan
+from app.workers.plans import PlanOutboxWorker
+
+PAYLOAD = orjson.dumps({"data": {"attributes": {
+    "name": "Pro", "description": "Pro", "amount": 1000, "currency": "PHP", "interval": "monthly", "interval_count": 1,
+}}})
+
+
+def add_plan(paymongo_plan_id: str | None = None) -> int:
+    with get_engine().begin() as conn:
+        return conn.execute(PricingPlan.__table__.insert().values(
+            name="Pro", price=10.0, billing_cycle="1", max_users=1, is_active=True,
+            paymongo_plan_id=paymongo_plan_id, sync_status="synced" if paymongo_plan_id else "pending",
+        )).inserted_primary_key[0]
+
+
+def outbox_rows() -> list:
+    with get_engine().connect() as conn:
+        return conn.execute(select(PlanOutbox.plan_id, PlanOutbox.status)).all()
+
+
+async def test_plan_delivered_during_reconcile_is_not_requeued(db, paymongo, mock_paymongo):
+    worker = PlanOutboxWorker(paymongo, reconcile_interval=None)
+    plan_id = add_plan()
+    list_plans = worker.remote_plans
+
+    async def deliver_after_listing():
+        # The outbox delivers the plan once the list is read, before the local rows are
+        remote = await list_plans()
+        paymongo_plan_id = await worker.deliver(1, PAYLOAD)
+        with get_engine().begin() as conn:
+            conn.execute(PricingPlan.__table__.update().where(PricingPlan.id == plan_id)
+                         .values(paymongo_plan_id=paymongo_plan_id, sync_status="synced"))
+        return remote
+
+    worker.remote_plans = deliver_after_listing
+    counts = await worker.reconcile()
+
+    assert counts["requeued"] == 0
+    assert counts["in_sync"] == 1
+    assert outbox_rows() == []
+    assert len(mock_paymongo.plans) == 1
+
+
+async def test_plan_missing_on_paymongo_is_requeued(db, paymongo):
+    worker = PlanOutboxWorker(paymongo, reconcile_interval=None)
+    plan_id = add_plan(paymongo_plan_id="plan_deleted_upstream")
+
+    counts = await worker.reconcile()
+
+    assert counts["requeued"] == 1
+    assert outbox_rows() == [(plan_id, "pending")]
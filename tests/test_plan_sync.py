@@ -0,0 +1,133 @@
+import time
+
+import pytest
+from sqlalchemy import select
+
+from app.db.session import get_engine
+from app.models.pricing_plan import PricingPlan
+from app.models.sync_state import SyncState
+from app.workers.plan_sync import SYNC_NAME, PlanCatalogSync
+
+HOUR_AGO = int(time.time()) - 3600
+
+
+def remote_plan(mock, plan_id: str, name: str, amount: int, updated_at: int | None = HOUR_AGO):
+    mock.plans[plan_id] = {"id": plan_id, "type": "plan", "attributes": {
+        "name": name, "description": name, "amount": amount, "currency": "PHP",
+        "interval": "monthly", "interval_count": 1, "created_at": updated_at, "updated_at": updated_at,
+    }}
+
+
+def local_plans() -> dict[str, tuple]:
+    with get_engine().connect() as conn:
+        rows = conn.execute(select(PricingPlan.paymongo_plan_id, PricingPlan.name, PricingPlan.price)).all()
+    return {row.paymongo_plan_id: (row.name, row.price) for row in rows}
+
+
+def high_water() -> int | None:
+    with get_engine().connect() as conn:
+        return conn.execute(select(SyncState.high_water).where(SyncState.name == SYNC_NAME)).scalar()
+
+
+@pytest.fixture
+def sync(db, paymongo, mock_paymongo):
+    # Two plans a page, so a run has to follow the cursor
+    for index in range(3):
+        remote_plan(mock_paymongo, f"plan_{index}", f"Plan {index}", 1000 * (index + 1), HOUR_AGO + index)
+    return PlanCatalogSync(paymongo, interval=None, page_size=2)
+
+
+async def test_first_run_pages_through_the_catalog(sync):
+    counts = await sync.run()
+
+    assert counts["fetched"] == 3
+    assert counts["changed"] == 3
+    assert local_plans() == {"plan_0": ("Plan 0", 10.0), "plan_1": ("Plan 1", 20.0), "plan_2": ("Plan 2", 30.0)}
+    assert high_water() == HOUR_AGO + 2
+
+
+async def test_next_run_resumes_from_the_high_water_mark(sync, mock_paymongo):
+    await sync.run()
+    remote_plan(mock_paymongo, "plan_1", "Plan 1", 2500, updated_at=HOUR_AGO + 60)
+    # Changed without a newer updated_at: below the mark, so not fetched again
+    remote_plan(mock_paymongo, "plan_0", "Plan 0 renamed", 1000, updated_at=HOUR_AGO)
+
+    counts = await sync.run()
+
+    # plan_2 sits at the mark itself (updated_at[gte]) and comes back unchanged
+    assert (counts["fetched"], counts["changed"], counts["unchanged"]) == (2, 1, 1)
+    assert local_plans()["plan_1"] == ("Plan 1", 25.0)
+    assert local_plans()["plan_0"] == ("Plan 0", 10.0)
+    assert high_water() == HOUR_AGO + 60
+
+
+async def test_plans_without_updated_at_are_applied(sync, mock_paymongo):
+    await sync.run()
+    remote_plan(mock_paymongo, "plan_3", "Plan 3", 4000, updated_at=None)
+
+    counts = await sync.run()
+
+    assert counts["changed"] == 1
+    assert local_plans()["plan_3"] == ("Plan 3", 40.0)
+    assert high_water() == HOUR_AGO + 2
+
+
+@pytest.fixture
+def plan_writes():
+    """Rows written to pricing_plans, counted by SQLite triggers."""
+    statements = [
+        "CREATE TABLE plan_writes (plan_id INTEGER)",
+        "CREATE TRIGGER plan_inserted AFTER INSERT ON pricing_plans BEGIN INSERT INTO plan_writes VALUES (NEW.id); END",
+        "CREATE TRIGGER plan_updated AFTER UPDATE ON pricing_plans BEGIN INSERT INTO plan_writes VALUES (NEW.id); END",
+    ]
+    with get_engine().begin() as conn:
+        for statement in statements:
+            conn.exec_driver_sql(statement)
+
+    def count() -> int:
+        with get_engine().connect() as conn:
+            return conn.exec_driver_sql("SELECT count(*) FROM plan_writes").scalar()
+
+    yield count
+    with get_engine().begin() as conn:
+        for name in ("TRIGGER plan_inserted", "TRIGGER plan_updated", "TABLE plan_writes"):
+            conn.exec_driver_sql(f"DROP {name}")
+
+
+async def test_unchanged_run_writes_nothing(sync, plan_writes):
+    await sync.run()
+    assert plan_writes() == 3
+
+    counts = await sync.run()
+
+    assert counts["changed"] == 0
+    assert plan_writes() == 3
+    assert high_water() == HOUR_AGO + 2
+
+
+async def test_failed_run_keeps_the_mark(sync, mock_paymongo):
+    await sync.run()
+    remote_plan(mock_paymongo, "plan_1", "Plan 1", 2500, updated_at=HOUR_AGO + 60)
+    mock_paymongo.error_rate = 1.0
+
+    with pytest.raises(RuntimeError):
+        await sync.run()
+
+    assert high_water() == HOUR_AGO + 2
+    assert local_plans()["plan_1"] == ("Plan 1", 20.0)
+
+
+async def test_cli_full_run_ignores_the_mark(sync, paymongo, mock_paymongo, monkeypatch):
+    from app.db import sync_plans
+
+    monkeypatch.setattr(sync_plans, "plan_catalog_sync", sync)
+    monkeypatch.setattr(sync_plans, "paymongo_client", paymongo)
+    await sync.run()
+    remote_plan(mock_paymongo, "plan_0", "Plan 0 renamed", 1000, updated_at=HOUR_AGO)
+
+    assert (await sync_plans.sync_plans())["fetched"] == 1
+    await paymongo.start()  # closed by the CLI on its way out
+    counts = await sync_plans.sync_plans(full=True)
+
+    assert (counts["fetched"], counts["changed"]) == (3, 1)
+    assert local_plans()["plan_0"] == ("Plan 0 renamed", 10.0)
@@ -0,0 +1,31 @@
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from app.api.v1 import plans
+from app.db.session import get_engine
+from app.models.pricing_plan import PricingPlan
+
+
+@pytest.fixture
+async def client(db):
+    app = FastAPI()
+    app.include_router(plans.router, prefix="/api/v1/plan")
+    await plans.invalidate_plan_cache(1, 2)
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        yield client
+
+
+async def test_legacy_billing_cycle_names_are_served_as_months(client):
+    with get_engine().begin() as conn:
+        conn.execute(PricingPlan.__table__.insert(), [
+            {"id": 1, "name": "Monthly", "price": 10.0, "max_users": 1, "billing_cycle": "monthly"},
+            {"id": 2, "name": "Yearly", "price": 100.0, "max_users": 1, "billing_cycle": "yearly"},
+        ])
+
+    listed = await client.get("/api/v1/plan/")
+    assert listed.status_code == 200
+    assert [plan["billing_cycle"] for plan in listed.json()] == [1, 12]
+    single = await client.get("/api/v1/plan/2")
+    assert single.status_code == 200
+    assert single.json()["billing_cycle"] == 12
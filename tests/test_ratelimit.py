@@ -0,0 +1,77 @@
+import asyncio
+
+import fakeredis
+import httpx
+import pytest
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+
+from app.core.config import settings
+from app.core.ratelimit import RateLimitMiddleware, RedisRateLimiter
+
+
+def test_checkout_limit_only_covers_session_creation():
+    middleware = RateLimitMiddleware(None, settings.RATE_LIMITS)
+    assert middleware.match("/api/v1/checkout/create")[0] == "/api/v1/checkout/create"
+    assert middleware.match("/api/v1/checkout/batch")[0] == "/api/v1/checkout/batch"
+    for path in ("/api/v1/checkout/sessions", "/api/v1/checkout/retrieve/cs_1", "/api/v1/checkout/expire/cs_1"):
+        assert middleware.match(path) is None
+
+
+@pytest.fixture
+def server():
+    return fakeredis.FakeServer()
+
+
+@pytest.fixture
+async def limiter(server):
+    client = fakeredis.FakeAsyncRedis(server=server)
+    yield RedisRateLimiter(client, "tests:ratelimit")
+    await client.aclose()
+
+
+async def test_burst_then_retry_after_until_the_next_token(limiter):
+    assert await limiter.hit("client", 1.0, 2) == 0.0
+    assert await limiter.hit("client", 1.0, 2) == 0.0
+    retry_after = await limiter.hit("client", 1.0, 2)
+    assert 0.9 < retry_after <= 1.0
+    # A rejected hit takes nothing, and other keys have their own bucket
+    assert 0.0 < await limiter.hit("client", 1.0, 2) <= retry_after
+    assert await limiter.hit("other", 1.0, 2) == 0.0
+
+
+async def test_bucket_refills_at_the_rate(limiter):
+    assert await limiter.hit("client", 20.0, 1) == 0.0
+    assert await limiter.hit("client", 20.0, 1) > 0.0
+    await asyncio.sleep(0.06)
+    assert await limiter.hit("client", 20.0, 1) == 0.0
+
+
+async def test_bucket_expires_once_it_would_be_full(limiter):
+    await limiter.hit("client", 2.0, 4)
+    # (burst - tokens) / rate = 0.5s, plus a second of slack
+    assert 1000 < await limiter.redis.pttl("tests:ratelimit:client") <= 1500
+
+
+def app_with_limits(limiter) -> httpx.AsyncClient:
+    async def ok(request):
+        return PlainTextResponse("ok")
+
+    app = RateLimitMiddleware(Starlette(routes=[Route("/limited", ok)]), {"/limited": (1.0, 1)}, limiter)
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+
+async def test_middleware_answers_429_with_retry_after(limiter):
+    async with app_with_limits(limiter) as client:
+        assert (await client.get("/limited")).status_code == 200
+        response = await client.get("/limited")
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "1"
+
+
+async def test_middleware_fails_open_when_redis_is_down(limiter, server):
+    server.connected = False
+    async with app_with_limits(limiter) as client:
+        responses = [await client.get("/limited") for _ in range(3)]
+    assert [response.status_code for response in responses] == [200, 200, 200]
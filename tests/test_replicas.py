@@ -0,0 +1,86 @@
+import asyncio
+
+import httpx
+import pytest
+from fastapi import Depends, FastAPI, Request
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app.db import session
+from app.db.replicas import ReadYourWritesMiddleware, ReplicaSet, track_writes
+from app.db.session import AsyncSessionLocal, get_async_read_db, read_session
+from app.models.user import User
+
+
+@pytest.fixture(scope="module")
+def primary():
+    # As get_async_engine() does when DATABASE_REPLICA_URLS is set
+    engine = session.get_async_engine()
+    track_writes(engine.sync_engine)
+    return engine
+
+
+@pytest.fixture
+async def replica(db, primary, monkeypatch, tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/replica.db")
+    monkeypatch.setattr(session, "_replicas", ReplicaSet([engine]))
+    yield engine
+    await engine.dispose()
+
+
+async def test_read_sessions_go_to_a_healthy_replica(replica, primary):
+    async with read_session() as db:
+        assert db.bind is replica
+    async with read_session(primary=True) as db:
+        assert db.bind is primary
+    session.get_replica_set().replicas[0].healthy = False
+    async with read_session() as db:
+        assert db.bind is primary
+
+
+@pytest.fixture
+def client(replica, primary):
+    app = FastAPI()
+
+    def target(db: AsyncSession) -> str:
+        return "replica" if db.bind is replica else "primary"
+
+    @app.get("/read")
+    async def read(db: AsyncSession = Depends(get_async_read_db)):
+        return target(db)
+
+    @app.post("/write")
+    async def write(request: Request):
+        async with AsyncSessionLocal() as db:
+            db.add(User(email=f"{request.client.host}@example.com", password="x"))
+            await db.commit()
+        # Read back within the same request
+        async with read_session() as db:
+            return target(db)
+
+    def middleware(window: float):
+        routed = ReadYourWritesMiddleware(app, window=window)
+
+        def caller(address: str) -> httpx.AsyncClient:
+            transport = httpx.ASGITransport(app=routed, client=(address, 50000))
+            return httpx.AsyncClient(transport=transport, base_url="http://test")
+
+        return caller
+
+    return middleware
+
+
+async def test_a_client_that_wrote_reads_from_the_primary(client):
+    caller = client(window=60)
+    async with caller("10.0.0.1") as writer, caller("10.0.0.2") as reader:
+        assert (await writer.get("/read")).json() == "replica"
+        assert (await writer.post("/write")).json() == "primary"
+        assert (await writer.get("/read")).json() == "primary"
+        # Only the client that wrote is pinned
+        assert (await reader.get("/read")).json() == "replica"
+
+
+async def test_pin_lapses_after_the_window(client):
+    async with client(window=0.05)("10.0.0.1") as writer:
+        assert (await writer.post("/write")).json() == "primary"
+        await asyncio.sleep(0.06)
+        assert (await writer.get("/read")).json() == "replica"
@@ -0,0 +1,69 @@
+import uuid
+from datetime import datetime
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from app.api.v1 import usage
+from app.core.security import create_access_token
+from app.db.session import get_engine
+from app.models.pricing_plan import PricingPlan
+from app.models.subscription import Subscription
+from app.models.user import User
+from app.workers.usage import UsageAggregator
+
+
+@pytest.fixture
+def aggregator(monkeypatch) -> UsageAggregator:
+    aggregator = UsageAggregator()
+    monkeypatch.setattr(usage, "usage_aggregator", aggregator)
+    return aggregator
+
+
+@pytest.fixture
+async def client(db, aggregator):
+    app = FastAPI()
+    app.include_router(usage.router, prefix="/api/v1/usage")
+    email = f"ana-{uuid.uuid4().hex[:8]}@example.com"
+    now = datetime.utcnow()
+    with get_engine().begin() as conn:
+        conn.execute(User.__table__.insert().values(id=1, email=email, password="x", is_active=True))
+        conn.execute(PricingPlan.__table__.insert().values(
+            id=1, name="Team", price=10.0, is_active=True, max_users=2, billing_cycle="1", sync_status="synced",
+        ))
+        conn.execute(Subscription.__table__.insert().values(
+            id=1, user_id=1, plan_id=1, status="active",
+            current_period_start=now, current_period_end=now, created_at=now,
+        ))
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': email})}"}
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app), base_url="http://test", headers=headers
+    ) as client:
+        yield client
+
+
+def seats(*quantities: int) -> list[dict]:
+    return [{"subscription_id": 1, "metric": "seats", "quantity": quantity} for quantity in quantities]
+
+
+async def test_ingest_rejects_seats_over_the_plan_limit(client, aggregator):
+    assert (await client.post("/api/v1/usage/events", json=seats(1, 1))).status_code == 202
+    # Pending sums count before they are flushed
+    response = await client.post("/api/v1/usage/events", json=seats(1))
+    assert response.status_code == 409
+    assert "plan allows 2" in response.json()["detail"]
+
+    await aggregator.flush()
+    assert (await client.post("/api/v1/usage/events", json=seats(1))).status_code == 409
+    # Removing a seat is always accepted, and frees room for the next one
+    assert (await client.post("/api/v1/usage/events", json=seats(-1))).status_code == 202
+    assert (await client.post("/api/v1/usage/events", json=seats(1))).status_code == 202
+    assert (await client.post("/api/v1/usage/events", json=seats(1, -1, 1))).status_code == 409
+
+
+async def test_ingest_does_not_limit_other_metrics(client):
+    events = [{"subscription_id": 1, "metric": "api_calls", "quantity": 100}]
+    response = await client.post("/api/v1/usage/events", json=events)
+    assert response.status_code == 202
+    assert response.json() == {"accepted": 1}